@@ -6,6 +6,7 @@ from enum import IntEnum
 class Property(IntEnum):
     """Enumeration listing all the possible text properties."""
     Default = 0
+    Underlined = 1 << 17
     Reversed = 1 << 18
 
 
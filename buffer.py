@@ -1,5 +1,65 @@
 """Implementation of editor's buffers."""
 
+import os
+import re
+from bisect import bisect_left, bisect_right
+from collections.abc import Sequence
+from contextlib import contextmanager
+from itertools import islice
+from operator import ne
+from sys import getsizeof
+from weakref import ref
+
+from compress import CompressedFile, codec, file_compress
+from history import History
+from lines import BlockList, BlockSequence, CompactLines, text_split
+from words import BoundaryIndex
+
+
+class Snapshot(Sequence):
+    """Class representing a read-only view of a Buffer's text at a given version.
+
+    A Snapshot is a sequence of lines. It shares its storage with the
+    Buffer it was taken from, whose blocks of lines are never modified
+    (see BlockSequence): the buffer only copies its list of blocks before
+    the first modification following the snapshot (see Buffer.snapshot),
+    so the snapshot stays consistent while the buffer changes.
+    Snapshots can therefore be handed to other threads.
+    """
+    def __init__(self, lines, version):
+        """Initialize a Snapshot object.
+
+        Args:
+            lines: Lines shared with the buffer (BlockList or CompactLines object).
+            version: Version of the buffer at the time of the snapshot.
+        """
+        self._lines = lines
+        self._version = version
+
+    @property
+    def version(self):
+        """Version of the buffer at the time of the snapshot (read-only)."""
+        return self._version
+
+    @property
+    def content(self):
+        """String containing the text of the snapshot (read-only)."""
+        return '\n'.join(self._lines)
+
+    @property
+    def end(self):
+        """Coordinates of the last character in the snapshot (read-only)."""
+        return len(self._lines) - 1, len(self._lines[-1])
+
+    def __len__(self):
+        return len(self._lines)
+
+    def __getitem__(self, index):
+        return self._lines[index]
+
+    def __iter__(self):
+        return iter(self._lines)
+
 
 class Buffer:
     """Class representing a text buffer.
@@ -8,8 +68,52 @@ class Buffer:
     zero or more Window objects that display the text.
     If the buffer's content changes in any way, all the windows receive
     notifications about the change.
-    A Buffer can be associated with one file.
+    Other objects (listeners) can be linked to the buffer to be notified
+    of every modification of the text, in terms of inserted and deleted text.
+    A Buffer can be associated with one file. Modifications of a file's
+    buffer are recorded in a Journal, so they can be recovered after a crash.
+    Modifications can also be recorded in a History, to be undone.
+    Ranges of the text can be shown with attributes by overlays, which
+    stay on the same text as it is modified (see OverlayTree).
+    The text can be compared with its file's, only comparing again the
+    lines modified (see FileDiff).
+    Large and compressed (gzip, bz2, xz) files are loaded progressively
+    by a worker thread, and appended to the buffer while the editor is
+    idle. Compressed files are compressed on a background thread when written.
+    A Buffer can follow its file, appending the text appended to it.
+    Otherwise, changes to the file made by other programs are detected
+    and, if the buffer was not modified, reloaded incrementally.
+
+    The lines are stored as strings in a BlockList or, in compact mode, as
+    UTF-8 bytes in a CompactLines object, which uses several times less memory
+    per line. Files larger than compact_size are opened in compact mode,
+    and their line index is kept in line_cache, to load them again without
+    finding their lines.
+
+    Attributes:
+        hash_chunks: Whether to keep hashes of the file's content, to tell
+            apart changes of the file's metadata from changes of its content.
+        compact_size: Size in bytes above which files are opened in compact mode.
+        load_size: Size in bytes above which files are loaded progressively.
+        sort_run_size: Size in bytes of the lines sorted in memory at once by
+            lines_sort in compact mode, above which sorted runs are written to
+            temporary files.
+        rewrite_reset_size: Size in bytes of a range of lines above which, in
+            compact mode, the line operations (lines_sort, lines_unique, lines_filter,
+            lines_columns) stream their result into the storage, and notify the
+            listeners of the range of lines replaced (see _listeners_reset), instead
+            of describing the change with the text of the range: the history keeps
+            the previous lines without decoding them.
+        line_cache: LineIndexCache object shared by the buffers, None to disable
+            the cache, or True for one in the default directory, created on first use.
     """
+    hash_chunk_size = 1 << 20
+    compact_size = 1 << 26
+    load_size = 1 << 20
+    sort_run_size = 1 << 26
+    rewrite_reset_size = 1 << 24
+    line_cache = True
+
     def __init__(self, content='', window=None):
         """Initialize a Buffer object.
 
@@ -17,9 +121,35 @@ class Buffer:
             content: String containing the initial text of the buffer. (default '')
             window: Window object to be linked to the buffer. (default None)
         """
-        self._lines = content.split('\n')
+        self._lines = BlockList(content.split('\n'))
         self._windows = {window} if window else set()
+        self._listeners = list()
         self._file_name = None
+        self._file_stat = None
+        self._file_size = 0
+        self._file_hashes = None
+        self._file_changed = False
+        self._watcher = None
+        self._journal = None
+        self._history = None
+        self._overlays = None
+        self._diff = None
+        self._follower = None
+        self._follow_paused = None
+        self._loader = None
+        self._load_journal = False
+        self._load_version = 0
+        self._load_pristine = False
+        self._writer = None
+        self._file_error = None
+        self.hash_chunks = False
+        self._compact = False
+
+        self._version = 0
+        self._saved_version = 0
+        self._snapshot = None
+        self._memory = (None, 0)
+        self._boundaries = BoundaryIndex()
 
     @property
     def content(self):
@@ -28,28 +158,464 @@ class Buffer:
 
     @content.setter
     def content(self, content):
-        self._lines = content.split('\n')
+        lines = self._lines
+        if self._compact:
+            self._lines_set(CompactLines.from_bytes(content.encode()))
+        else:
+            self._lines_set(content.split('\n'))
+        self._listeners_reset(lines)
+
+    def _lines_set(self, lines):
+        """Replace the whole text of the buffer, without notifying the listeners.
+
+        Args:
+            lines: List of strings (or BlockList, or CompactLines object) containing the
+                new lines, owned by the buffer. Converted to the storage of the current mode.
+        """
+        self._lines_modify(copy=False)
+        if self._compact and not isinstance(lines, CompactLines):
+            lines = CompactLines(lines)
+        elif not self._compact and not isinstance(lines, BlockList):
+            lines = BlockList(lines)
+        self._lines = lines
         self._windows_update()
 
     @property
     def lines(self):
-        """List of strings, one per line in the buffer's text.
-        Does not include newlines.
+        """Sequence of strings, one per line in the buffer's text (a BlockList,
+        or a CompactLines object in compact mode). Does not include newlines.
         """
         return self._lines
 
+    @lines.setter
+    def lines(self, lines):
+        old = self._lines
+        self._lines_set(lines.copy() if isinstance(lines, BlockSequence) else list(lines))
+        self._listeners_reset(old)
+
+    @property
+    def compact(self):
+        """Whether the lines are stored compactly, as UTF-8 bytes."""
+        return self._compact
+
+    @compact.setter
+    def compact(self, compact):
+        compact = bool(compact)
+        if compact != self._compact:
+            # The text does not change: the version and the snapshot stay valid.
+            self._compact = compact
+            self._lines = CompactLines(self._lines) if compact else BlockList(self._lines)
+
+    @property
+    def version(self):
+        """Number incremented at every modification of the buffer (read-only)."""
+        return self._version
+
+    @property
+    def modified(self):
+        """True if the buffer was modified since it was last opened or written (read-only)."""
+        return self._version != self._saved_version
+
+    def snapshot(self):
+        """Take a snapshot of the buffer's text.
+        Taking a snapshot costs O(1). The first modification following it,
+        if the snapshot is still referenced, copies the list of the blocks
+        of lines of the buffer, in O(n / block_size) for n lines, and, like
+        every modification, builds new blocks for the lines it changes
+        (see BlockSequence): the blocks of the other lines stay shared.
+        Must be called from the thread modifying the buffer.
+
+        Returns:
+            Snapshot object of the current version.
+        """
+        snapshot = self._snapshot() if self._snapshot else None
+        if snapshot is None:
+            snapshot = Snapshot(self._lines, self._version)
+            self._snapshot = ref(snapshot)
+        return snapshot
+
+    @contextmanager
+    def batch(self, amend=False):
+        """Context manager making all the modifications inside it a single undoable step.
+
+        Args:
+            amend: Whether the modifications are added to the last undoable
+                step, instead of a new one. (default False)
+        """
+        if self._history:
+            with self._history.group(amend):
+                yield
+        else:
+            yield
+
+    def _lines_modify(self, copy=True):
+        """Prepare the lines for a modification, preserving the live snapshot.
+        Must be called before every change to the buffer's text.
+
+        Args:
+            copy: Whether the modification is made in place, so the lines
+                shared with a snapshot must be copied first. (default True)
+        """
+        self._version += 1
+        if self._snapshot:
+            if copy and self._snapshot():
+                self._lines = self._lines.copy()
+            self._snapshot = None
+
     @property
     def file_name(self):
         return self._file_name
 
-    def file_open(self, file_name):
+    @property
+    def history(self):
+        """History object recording the modifications to undo, or None (read-only)."""
+        return self._history
+
+    def history_enable(self, **kwargs):
+        """Start recording the modifications in a History, if not already recording.
+
+        Args:
+            **kwargs: Arguments for the History constructor.
+
+        Returns:
+            The History object.
+        """
+        if self._history is None:
+            self._history = History(self, **kwargs)
+        return self._history
+
+    @property
+    def overlays(self):
+        """OverlayTree object holding the overlays shown on the text, or None (read-only)."""
+        return self._overlays
+
+    def overlays_enable(self):
+        """Start keeping overlays, if not already keeping them.
+
+        Returns:
+            The OverlayTree object.
+        """
+        if self._overlays is None:
+            # Deferred import: overlays are only needed once requested.
+            from overlay import OverlayTree
+            self._overlays = OverlayTree(self)
+        return self._overlays
+
+    @property
+    def diff(self):
+        """FileDiff object comparing the text with its file's, or None (read-only)."""
+        return self._diff
+
+    def diff_enable(self):
+        """Start comparing the text with its file's, if not already comparing.
+        Without a file, the text is compared with the text when it started.
+
+        Returns:
+            The FileDiff object.
+        """
+        if self._diff is None:
+            # Deferred import: diffs are only needed once requested.
+            from diff import FileDiff
+            self._diff = FileDiff(self)
+            self._diff_rebase()
+        return self._diff
+
+    def _diff_rebase(self):
+        """Compare the text with its file as it is now, once it is loaded."""
+        if self._diff is None or self._loader:
+            return
+        if self.modified and self._file_name is not None:
+            self._diff._base_set(self._file_lines(), modified=True)
+        else:
+            self._diff._base_set(self.snapshot())  # Copied on write (see snapshot).
+
+    @property
+    def journal(self):
+        """Journal object recording the modifications of the buffer, or None (read-only)."""
+        return self._journal
+
+    @property
+    def file_changed(self):
+        """True if the file was changed by another program, and not reloaded
+        because the buffer was modified (read-only).
+        """
+        return self._file_changed
+
+    def _file_read(self, file_name):
+        """Read a file, keeping track of its version.
+
+        Args:
+            file_name: Path of the file to read.
+
+        Returns:
+            List (or CompactLines object, in compact mode) of the lines of the file.
+            None: If hash_chunks is set and the content is the same as last read.
+        """
+        data, self._file_stat, self._file_size = self._file_data(file_name)
+        if self.hash_chunks:
+            hashes = self._chunk_hashes(data)
+            if hashes == self._file_hashes:
+                return None
+            self._file_hashes = hashes
+
+        return self._file_split(data)
+
+    def _chunk_hashes(self, data):
+        """Hash the content of the file in chunks of hash_chunk_size bytes (see hash_chunks).
+
+        Args:
+            data: Bytes of the (uncompressed) content.
+
+        Returns:
+            List of bytes objects, one digest per chunk.
+        """
+        # Deferred import: hashing is only needed if hash_chunks is set.
+        from hashlib import blake2b
+
+        size = self.hash_chunk_size
+        return [blake2b(data[i: i+size], digest_size=16).digest() for i in range(0, len(data), size)]
+
+    def _file_lines(self):
+        """Read the lines of the file, without recording its version (see _file_read)."""
+        return self._file_split(self._file_data(self._file_name)[0])
+
+    @staticmethod
+    def _file_data(file_name):
+        """Read the content of a file, decompressing it if needed.
+
+        Returns:
+            (data, stat, size): The bytes of the text, the os.stat_result of the
+                file, and the number of bytes read from it.
+        """
+        if codec(file_name):
+            stat = os.stat(file_name)
+            return b''.join(CompressedFile(file_name).chunks()), stat, stat.st_size
+        with open(file_name, 'rb') as f:
+            data = f.read()
+            return data, os.fstat(f.fileno()), len(data)
+
+    def _file_split(self, data):
+        """Split the content of a file into the lines of the buffer (see _file_read)."""
+        lines = text_split(data, self._compact)
+        return CompactLines.from_bytes(lines) if self._compact else lines
+
+    @property
+    def loading(self):
+        """True while the buffer's file is being loaded (read-only)."""
+        return self._loader is not None
+
+    @property
+    def load_progress(self):
+        """Fraction of the buffer's file loaded, between 0 and 1 (read-only)."""
+        return self._loader.progress if self._loader else 1.0
+
+    def _lines_load(self, lines, final, first=False):
+        """Append a batch of lines read from the file being loaded. The buffer
+        is not considered modified, and the listeners are not notified.
+
+        Args:
+            lines: List of strings, or in compact mode bytes of lines separated by b'\\n'
+                or (bytes, starts, lengths, offset) with their index (see Loader.get).
+            final: Whether these are the last lines of the file.
+            first: Whether these are the first lines, replacing the buffer's text
+                (or the lines loaded, if the file is read again). (default False)
+        """
+        loader = self._loader
+        if final:
+            self._loader = None
+        if first:
+            if isinstance(lines, tuple):
+                compact = CompactLines()
+                compact.extend_index(*lines)
+                lines = compact
+            elif self._compact:
+                lines = CompactLines.from_bytes(lines, not final)
+            self._lines_set(lines)
+            self._saved_version = self._version
+            self._load_pristine = True
+        else:
+            # Modified since the last batch: the lines are no longer the file as read.
+            self._load_pristine = self._load_pristine and self._version == self._load_version
+            clean = not self.modified
+            line = len(self._lines)
+            self._lines_modify()
+            if isinstance(lines, tuple):
+                self._lines.extend_index(*lines)
+            elif self._compact:
+                self._lines.extend_bytes(lines, not final)
+            else:
+                self._lines.extend(lines)
+            self._windows_lines_insert(line, len(self._lines) - line)
+            if clean:
+                self._saved_version = self._version
+        self._load_version = self._version
+
+        if final:
+            if self.hash_chunks:
+                self._file_hashes = loader.hashes
+            if (self._compact and self._load_pristine and not loader.cached
+                    and not codec(self._file_name) and self._line_cache()):
+                self._line_cache_store(loader)
+            if self._load_journal:
+                self._journal_open()
+            self._diff_rebase()
+
+    def _line_cache(self):
+        """Get the LineIndexCache object of the buffers (see line_cache),
+        creating the default one on first use.
+
+        Returns:
+            LineIndexCache object, or None if the cache is disabled.
+        """
+        if self.line_cache is True:
+            # Deferred import: the cache is only needed for large files.
+            from line_cache import LineIndexCache
+            Buffer.line_cache = LineIndexCache()
+        return self.line_cache
+
+    def _line_cache_store(self, loader):
+        """Save the line index of the file just loaded in the cache, in another thread.
+
+        Args:
+            loader: Loader object which read the file.
+        """
+        # Deferred import: threads are only needed for large files.
+        from threading import Thread
+
+        cache = self.line_cache
+        endings = cache.TRANSLATED if loader.translated else cache.LF
+        # The copy shares the text, which is append-only, and keeps the index unmodified.
+        arguments = self._file_name, loader.stat, self._lines.copy(), endings
+        Thread(target=cache.store, args=arguments, name='cache ' + self._file_name).start()
+
+    def _load_step(self, block=False):
+        """Append to the buffer the batches of lines loaded since the last step.
+        If the loading fails, the buffer keeps the lines loaded (see file_error).
+
+        Args:
+            block: Whether to wait for a batch if none is ready. (default False)
+        """
+        while self._loader:
+            try:
+                batch = self._loader.get(block)
+            except Exception as error:
+                self._loader = None
+                self._file_error = error
+                return
+            if batch is None:
+                return
+            lines, final, first = batch
+            if first and self.modified:  # Read again, but the lines loaded have been edited.
+                self._load_stop()
+                self._file_error = ValueError('line index of {} out of date'.format(self._file_name))
+                return
+            self._lines_load(lines, final, first)
+
+    def _load_finish(self):
+        """Wait for the rest of the file being loaded."""
+        while self._loader:
+            self._load_step(block=True)
+
+    def _load_stop(self):
+        """Abandon the loading of the file."""
+        if self._loader:
+            self._loader.stop()
+            self._loader = None
+
+    def _file_saved(self, version=None):
+        """Record that the buffer's text is the same as its file's.
+
+        Args:
+            version: Version of the buffer written. (default None: current version)
+        """
+        self._saved_version = self._version if (version is None) else version
+        self._file_changed = False
+        self._diff_rebase()
+        if self._watcher:
+            self._watcher.close()
+        # Deferred import: inotify support is only needed when the editor is idle.
+        from watch import FileWatcher
+        self._watcher = FileWatcher(self._file_name, self._file_stat)
+
+    def file_open(self, file_name, journal=True):
         """Open a file in the buffer.
+        If a journal of the file exists, the modifications it contains are recovered.
+        Large and compressed files are loaded progressively: only their first
+        lines are loaded before returning. A file that does not exist, in an
+        existing directory, is opened empty, and created when the buffer is written.
 
         Args:
             file_name: Path of the file to open.
+            journal: Whether to record the modifications in a journal. (default True)
         """
+        self.follow_stop()
+        self._load_stop()
+        self._write_wait()
         self._file_name = file_name
-        self.content = open(file_name, 'r').read()
+        self._file_hashes = None
+        try:
+            size = os.path.getsize(file_name)
+        except FileNotFoundError:
+            if not os.path.isdir(os.path.dirname(os.path.abspath(file_name))):
+                raise
+            size = None
+        if size is not None and size > self.compact_size:
+            self.compact = True
+        if self._journal:
+            self._journal.close()
+            self._journal = None
+
+        self._file_error = None
+        self._load_journal = False
+        if size is None:
+            self._file_stat = None
+            self._file_size = 0
+            self._lines_set([''])
+        elif codec(file_name) or size > self.load_size:
+            # Deferred import: threads are only needed for large files.
+            from loader import Loader
+            cache = self._line_cache() if self._compact and not codec(file_name) else None
+            self._loader = Loader(file_name, self._compact, self.hash_chunk_size if self.hash_chunks else None, cache)
+            self._file_stat = self._loader.stat
+            self._file_size = self._file_stat.st_size
+            self._lines_load(*self._loader.get(block=True))
+        else:
+            self._lines_set(self._file_read(file_name))
+        self._file_saved()
+        if self._history:
+            self._history.clear()
+        if self._overlays:
+            self._overlays.clear()
+        if journal and self._loader:
+            self._load_journal = True
+        elif journal:
+            self._journal_open()
+
+    def _journal_open(self):
+        """Start recording the modifications in a journal, recovering the existing one.
+        If the buffer was modified while its file was loading, the existing
+        journal does not apply: it is kept aside, and the whole text is recorded.
+        """
+        # Deferred import: the journal is only needed for files.
+        from journal import Journal
+        self._journal = Journal(self, self._file_name)
+        if not self.modified:
+            self._journal.recover()
+        else:
+            self._journal.set_aside()
+            self._journal._text_reset(None)
+
+    def _journal_failed(self, journal, error):
+        """Stop using a journal which could not be written, reporting the error
+        (see file_error). Called by the journal.
+
+        Args:
+            journal: Journal object which failed.
+            error: OSError raised writing it.
+        """
+        if journal is self._journal:
+            self._journal = None
+            self._file_error = error
 
     def file_write(self, file_name=None):
         """Write the buffer in a file. Set the path as the buffer path
@@ -62,7 +628,221 @@ class Buffer:
             file_name = self._file_name
         elif self._file_name is None:
             self._file_name = file_name
-        open(file_name, 'w').write(self.content)
+            from journal import Journal  # Deferred import (see _journal_open).
+            self._journal = Journal(self, file_name)
+        self._load_finish()
+        self._write_wait()
+        content = self.content
+
+        if codec(file_name):
+            # Compressing is slow: the file is written by another thread, and
+            # the buffer is marked as saved when it finishes (see _idle).
+            data = content.encode()
+            writer = file_compress(file_name, data, background=True)
+            if file_name == self._file_name:
+                self._writer = writer, data if self.hash_chunks else None, self._version
+            else:
+                self._writer = writer, None, None
+            return
+        with open(file_name, 'w') as f:
+            f.write(content)
+        if file_name == self._file_name:
+            self._file_written(content.encode() if self.hash_chunks else None, self._version)
+
+    def _file_written(self, data, version):
+        """Record that the buffer's text has been written to its file.
+
+        Args:
+            data: Bytes of the (uncompressed) text written, or None if hash_chunks is not set.
+            version: Version of the buffer written.
+        """
+        self._file_stat = os.stat(self._file_name)
+        self._file_size = self._file_stat.st_size
+        if self.hash_chunks:
+            self._file_hashes = self._chunk_hashes(data)
+        self._file_saved(version)
+        if self._journal:
+            self._journal.reset()
+            if self.modified:  # Modified while being written.
+                self._journal._text_reset(None)
+
+    @property
+    def writing(self):
+        """True while the buffer's file (or a copy of the buffer) is being written
+        by another thread (read-only).
+        """
+        return self._writer is not None
+
+    @property
+    def file_error(self):
+        """Exception raised while loading or writing the file in another thread,
+        or writing its journal, or None (read-only).
+        """
+        return self._file_error
+
+    def _write_wait(self, block=True):
+        """Complete the write of the file in another thread, if it has finished.
+        An error is reported (see file_error) whether the file is the buffer's or a copy.
+
+        Args:
+            block: Whether to wait for the write to finish. (default True)
+        """
+        if self._writer is None or (not block and self._writer[0].is_alive()):
+            return
+        writer, data, version = self._writer
+        writer.join()
+        self._writer = None
+        self._file_error = writer.error
+        if writer.error is None and version is not None:
+            self._file_written(data, version)
+
+    def reload(self):
+        """Read the buffer's file again, applying to the buffer only the lines
+        that differ. Windows keep their cursors on the same lines, and
+        the reload can be undone in one step.
+
+        Returns:
+            Number of changed regions (hunks).
+        """
+        # Deferred import: difflib is only needed when files change.
+        from diff import lines_diff
+
+        lines = self._file_read(self._file_name)
+        hunks = lines_diff(self._lines, lines) if (lines is not None) else []
+        with self.batch():
+            for (start, end, new_start, new_end) in reversed(hunks):
+                self.lines_replace(start, end, lines[new_start: new_end])
+        self._file_saved()
+        if self._journal:
+            self._journal.reset()
+        return len(hunks)
+
+    def _file_check(self):
+        """Check whether the file has been changed by another program,
+        and reload it if the buffer was not modified.
+        """
+        if not self._watcher.check():
+            return
+        if self._watcher.stat is None:  # Deleted: the buffer is now the only copy.
+            self._file_changed = True
+        elif self.modified:
+            self._file_changed = True
+        else:
+            self.reload()
+
+    def memory_usage(self):
+        """Return the approximate number of bytes used by the buffer's text and history.
+        The result is cached until the next modification.
+        """
+        version, size = self._memory
+        if version != self._version:
+            size = getsizeof(self._lines)
+            if not self._compact:
+                size += sum(map(getsizeof, self._lines))
+            self._memory = self._version, size
+        return size + (self._history.memory if self._history else 0)
+
+    def close(self):
+        """Release the resources associated with the buffer's file
+        (journal, file watching), after completing its writing. The buffer's
+        text is kept, without what remained to be loaded.
+        """
+        self.follow_stop()
+        self._load_stop()
+        self._write_wait()
+        if self._watcher:
+            self._watcher.close()
+            self._watcher = None
+        if self._journal:
+            self._journal.close()
+            self._journal = None
+
+    @property
+    def following(self):
+        """True if the buffer is following its file (read-only)."""
+        return self._follower is not None
+
+    def follow(self, max_lines=None):
+        """Start following the buffer's file: text appended to the file
+        is appended to the buffer, checking for changes when the editor is idle.
+        The journal, the undo history and the diff are disabled while following.
+        The history (emptied), the diff and the journal (emptied) are enabled again by follow_stop.
+
+        Args:
+            max_lines: Maximum number of lines to keep, discarding the oldest ones.
+                (default None: no limit)
+
+        Raises:
+            ValueError: If the file is compressed.
+        """
+        # Deferred import: inotify support is only needed in follow mode.
+        from follow import Follower
+
+        if codec(self._file_name):
+            raise ValueError('compressed files cannot be followed')
+        self._load_finish()
+        self.follow_stop()
+        if self._watcher:
+            self._watcher.close()
+            self._watcher = None
+        journal = self._journal is not None
+        if journal:
+            self._journal.close()
+            self._journal = None
+        if self._history:
+            self.listener_unlink(self._history)
+        if self._diff:
+            self.listener_unlink(self._diff)
+        self._follow_paused = self._history, self._diff, journal
+        self._history = self._diff = None
+        self._follower = Follower(self, self._file_name, self._file_size, self._file_stat, max_lines)
+        self._follower._trim()
+
+    def follow_stop(self):
+        """Stop following the buffer's file, enabling again the history and
+        the diff disabled by follow (unless enabled again since), the journal
+        (emptied) and the detection of the changes to the file.
+        """
+        if self._follower:
+            follower = self._follower
+            follower.close()
+            self._follower = None
+            history, diff, journal = self._follow_paused
+            self._follow_paused = None
+            self._file_stat = follower.stat
+            self._file_size = follower.offset
+            self._file_saved(self._saved_version)
+            if journal and self._journal is None:
+                # Deferred import: the journal is only needed for files.
+                from journal import Journal
+                self._journal = Journal(self, self._file_name)
+                self._journal.reset()  # It recorded the text before following.
+                if self.modified:
+                    self._journal._text_reset(None)
+            if history and self._history is None:
+                history.clear()  # The text it recorded has been replaced.
+                self._history = history
+                self.listener_link(history)
+            if diff and self._diff is None:
+                self._diff = diff
+                self.listener_link(diff)
+                self._diff_rebase()
+
+    def _idle(self):
+        """Perform the housekeeping deferred while the editor is busy."""
+        if self._loader:
+            self._load_step()
+            return
+        if self._writer:
+            self._write_wait(block=False)
+        if self._journal:
+            self._journal.sync()
+        if self._diff:
+            self._diff._idle()
+        if self._follower:
+            self._follower.poll()
+        elif self._watcher and not self._writer:
+            self._file_check()
 
     @property
     def windows(self):
@@ -71,6 +851,9 @@ class Buffer:
 
     def window_link(self, window):
         """Link a window to the buffer.
+        Other objects following the lines of the buffer can be linked the same
+        way, implementing the methods _update, _line_update, _lines_insert,
+        _lines_delete and _lines_change of Window.
 
         Args:
             window: Window object to be linked.
@@ -86,6 +869,64 @@ class Buffer:
         """
         self._windows.discard(window)
 
+    def listener_link(self, listener):
+        """Link a listener to the buffer.
+        Listeners must implement the methods _text_insert, _text_delete
+        and _text_reset, with the same arguments of the _listeners_* methods.
+        Insertions and deletions are notified to the listeners before the
+        windows, which can show the state they keep (see OverlayTree).
+
+        Args:
+            listener: Object to be notified of the modifications.
+        """
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def listener_unlink(self, listener):
+        """Unlink a listener from the buffer.
+
+        Args:
+            listener: Object to unlink.
+        """
+        try:
+            self._listeners.remove(listener)
+        except ValueError:
+            pass
+
+    def _listeners_insert(self, line, column, text):
+        """Notify all the linked listeners that text has been inserted.
+
+        Args:
+            line: Index of the line where the text has been inserted.
+            column: Index of the column where the text has been inserted.
+            text: Inserted text, possibly containing newlines.
+        """
+        for listener in self._listeners:
+            listener._text_insert(line, column, text)
+
+    def _listeners_delete(self, line, column, text):
+        """Notify all the linked listeners that text has been deleted.
+
+        Args:
+            line: Index of the line where the text has been deleted.
+            column: Index of the column where the text has been deleted.
+            text: Deleted text, possibly containing newlines.
+        """
+        for listener in self._listeners:
+            listener._text_delete(line, column, text)
+
+    def _listeners_reset(self, lines, range=None):
+        """Notify all the linked listeners that the whole text has been replaced.
+
+        Args:
+            lines: List of the lines before the replacement.
+            range: (start, end, count) if only the lines from start to end were
+                replaced, by count lines, the others being the same.
+                (default None: all the lines may differ)
+        """
+        for listener in self._listeners:
+            listener._text_reset(lines, range)
+
     def _windows_update(self):
         """Update the content of the linked windows."""
         for window in self._windows:
@@ -107,7 +948,7 @@ class Buffer:
             line: Index of the inserted line.
         """
         for window in self._windows:
-            window._line_insert(line)
+            window._lines_insert(line, 1)
 
     def _windows_line_delete(self, line):
         """Notify all the linked windows that a line has been deleted.
@@ -116,7 +957,51 @@ class Buffer:
             line: Index of the deleted line.
         """
         for window in self._windows:
-            window._line_delete(line)
+            window._lines_delete(line, 1)
+
+    def _windows_lines_insert(self, line, count):
+        """Notify all the linked windows that consecutive lines have been inserted.
+
+        Args:
+            line: Index of the first inserted line.
+            count: Number of inserted lines.
+        """
+        for window in self._windows:
+            window._lines_insert(line, count)
+
+    def _windows_lines_delete(self, line, count):
+        """Notify all the linked windows that consecutive lines have been deleted.
+
+        Args:
+            line: Index of the first deleted line.
+            count: Number of deleted lines.
+        """
+        for window in self._windows:
+            window._lines_delete(line, count)
+
+    def _windows_lines_change(self, changes):
+        """Notify all the linked windows that ranges of lines have been replaced,
+        with a single notification for all of them.
+
+        Args:
+            changes: List of (line, old_count, new_count) tuples, sorted: the
+                old_count lines from line have been replaced by new_count lines.
+                The index of each range accounts for the previous ones, as if
+                they had been notified one after the other.
+        """
+        for window in self._windows:
+            window._lines_change(changes)
+
+    def _windows_lines_redraw(self, line, count):
+        """Notify all the linked windows that consecutive lines must be drawn
+        again, as the way they are shown changed (not their text).
+
+        Args:
+            line: Index of the first line to draw.
+            count: Number of lines to draw.
+        """
+        for window in self._windows:
+            window._lines_redraw(line, count)
 
     @property
     def end(self):
@@ -183,6 +1068,87 @@ class Buffer:
         elif line+1 < len(self._lines):
             return line + 1, 0
 
+    def word_after(self, line, column, subword=False):
+        """Get the coordinates of the end of the word containing or following
+        the given character (see BoundaryIndex for the definition of words).
+
+        Args:
+            line: Index of the character's line.
+            column: Index of the character's column.
+            subword: Whether to split words into subwords. (default False)
+
+        Returns:
+            (line, column): Coordinates following the last character of the word.
+            None: If there are no words after the given character.
+        """
+        while line < len(self._lines):
+            _, ends = self._boundaries.spans(self._lines, line, subword)
+            i = bisect_right(ends, column)
+            if i < len(ends):
+                return line, ends[i]
+            line, column = line + 1, -1
+
+    def word_before(self, line, column, subword=False):
+        """Get the coordinates of the beginning of the word containing or
+        preceding the given character (see BoundaryIndex for the definition of words).
+
+        Args:
+            line: Index of the character's line.
+            column: Index of the character's column.
+            subword: Whether to split words into subwords. (default False)
+
+        Returns:
+            (line, column): Coordinates of the first character of the word.
+            None: If there are no words before the given character.
+        """
+        while line >= 0:
+            starts, _ = self._boundaries.spans(self._lines, line, subword)
+            i = bisect_left(starts, column)
+            if i > 0:
+                return line, starts[i-1]
+            line -= 1
+            column = len(self._lines[line]) if line >= 0 else 0
+
+    def _blank(self, line):
+        """Return True if a line contains only whitespace, False otherwise."""
+        text = self._lines[line]
+        return not text or text.isspace()
+
+    def paragraph_after(self, line):
+        """Get the coordinates of the end of the paragraph containing or
+        following the given line. Paragraphs are separated by blank lines.
+
+        Args:
+            line: Index of the line.
+
+        Returns:
+            (line, column): Beginning of the blank line following the paragraph,
+                or end of the buffer.
+        """
+        last = len(self._lines) - 1
+        while line < last and self._blank(line):
+            line += 1
+        while line < last and not self._blank(line):
+            line += 1
+        return (line, 0) if self._blank(line) else self.end
+
+    def paragraph_before(self, line):
+        """Get the coordinates of the beginning of the paragraph containing or
+        preceding the given line. Paragraphs are separated by blank lines.
+
+        Args:
+            line: Index of the line.
+
+        Returns:
+            (line, column): Beginning of the blank line preceding the paragraph,
+                or of the buffer.
+        """
+        while line > 0 and self._blank(line):
+            line -= 1
+        while line > 0 and not self._blank(line):
+            line -= 1
+        return line, 0
+
     def char_insert(self, char, line, column):
         """Insert a character at the given position, moving the other characters accordingly.
 
@@ -191,7 +1157,9 @@ class Buffer:
             line: Index of the line where to insert the character.
             column: Index of the line where to insert the character.
         """
+        self._lines_modify()
         self._lines[line] = self._lines[line][:column] + char + self._lines[line][column:]
+        self._listeners_insert(line, column, char)
         self._windows_line_update(line)
 
     def char_delete(self, line, column):
@@ -202,12 +1170,16 @@ class Buffer:
             line: Index of the line where to delete a character.
             column: Index of the line where to delete a character.
         """
+        self._lines_modify()
         if column == len(self._lines[line]):
             self._lines[line: line+2] = [self._lines[line] + self._lines[line+1]]
+            self._listeners_delete(line, column, '\n')
             self._windows_line_update(line)
             self._windows_line_delete(line+1)
         else:
+            char = self._lines[line][column]
             self._lines[line] = self._lines[line][:column] + self._lines[line][column+1:]
+            self._listeners_delete(line, column, char)
             self._windows_line_update(line)
 
     def line_break(self, line, column):
@@ -217,6 +1189,493 @@ class Buffer:
             line: Index of the line to break.
             column: Index of the column where to break the line.
         """
+        self._lines_modify()
         self._lines[line: line+1] = [self._lines[line][:column], self._lines[line][column:]]
+        self._listeners_insert(line, column, '\n')
         self._windows_line_update(line)
         self._windows_line_insert(line+1)
+
+    def text_end(self, line, column, text):
+        """Get the coordinates of the end of a text, if placed at the given position.
+
+        Args:
+            line: Index of the text's first line.
+            column: Index of the text's first column.
+            text: String, possibly containing newlines.
+
+        Returns:
+            (line, column): Coordinates following the last character of the text.
+        """
+        newlines = text.count('\n')
+        if newlines:
+            return line + newlines, len(text) - text.rfind('\n') - 1
+        return line, column + len(text)
+
+    def text_insert(self, text, line, column):
+        """Insert a text at the given position, moving the other characters accordingly.
+        The text can contain newlines, in which case new lines are inserted.
+
+        Args:
+            text: String to insert.
+            line: Index of the line where to insert the text.
+            column: Index of the column where to insert the text.
+
+        Returns:
+            (line, column): Coordinates following the last inserted character.
+        """
+        self._lines_modify()
+        current = self._lines[line]
+        parts = text.split('\n')
+        end = line + len(parts) - 1, len(parts[-1]) + (column if len(parts) == 1 else 0)
+        parts[0] = current[:column] + parts[0]
+        parts[-1] += current[column:]
+        self._lines[line: line+1] = parts
+
+        self._listeners_insert(line, column, text)
+        self._windows_line_update(line)
+        if end[0] > line:
+            self._windows_lines_insert(line+1, end[0] - line)
+        return end
+
+    def text_delete(self, line, column, end_line, end_column):
+        """Delete the text between two positions, joining the lines accordingly.
+
+        Args:
+            line: Index of the line of the first character to delete.
+            column: Index of the column of the first character to delete.
+            end_line: Index of the line following the last character to delete.
+            end_column: Index of the column following the last character to delete.
+
+        Returns:
+            String containing the deleted text.
+        """
+        first, last = self._lines[line], self._lines[end_line]
+        if line == end_line:
+            text = first[column: end_column]
+        else:
+            text = '\n'.join([first[column:], *self._lines[line+1: end_line], last[:end_column]])
+        if not text:
+            return text
+
+        self._lines_modify()
+        self._lines[line: end_line+1] = [first[:column] + last[end_column:]]
+
+        self._listeners_delete(line, column, text)
+        self._windows_line_update(line)
+        if end_line > line:
+            self._windows_lines_delete(line+1, end_line - line)
+        return text
+
+    def text_edit(self, edits):
+        """Replace several ranges of text at once, in a single pass over them.
+        Edits touching the same lines are combined into a single rewrite of
+        the lines. The windows receive a single notification for all the
+        changed lines (see _windows_lines_change), and the listeners a
+        deletion and an insertion per edit, from the last one to the first,
+        as a single undoable step.
+
+        Args:
+            edits: List of (line, column, end_line, end_column, text) tuples,
+                sorted and not overlapping: the text from (line, column) to
+                (end_line, end_column) is replaced with text, which can
+                contain newlines.
+
+        Returns:
+            List of the coordinates following the text of each edit, after the modifications.
+        """
+        if not edits:
+            return []
+        lines = self._lines
+        runs, changes, ends, deleted = [], [], [], []
+        shift = 0  # Lines added by the previous runs.
+        i = 0
+        while i < len(edits):
+            # A run of edits rewrites the lines from the first one's to the last one's end.
+            start = line = edits[i][0]
+            column = 0
+            new_lines, parts, length = [], [], 0
+            while i < len(edits) and edits[i][0] == line:
+                _, edit_column, end_line, end_column, text = edits[i]
+                if end_line == line:
+                    deleted.append(lines[line][edit_column: end_column])
+                else:
+                    deleted.append('\n'.join([lines[line][edit_column:], *lines[line+1: end_line],
+                                              lines[end_line][:end_column]]))
+                parts.append(lines[line][column: edit_column])
+                length += edit_column - column
+                *complete, last = text.split('\n')
+                if complete:
+                    parts.append(complete[0])
+                    new_lines.append(''.join(parts))
+                    new_lines += complete[1:]
+                    parts, length = [], 0
+                parts.append(last)
+                length += len(last)
+                ends.append((start + shift + len(new_lines), length))
+                line, column = end_line, end_column
+                i += 1
+            parts.append(lines[line][column:])
+            new_lines.append(''.join(parts))
+            runs.append((start, line + 1, new_lines))
+            changes.append((start + shift, line + 1 - start, len(new_lines)))
+            shift += len(new_lines) - (line + 1 - start)
+
+        self._lines_modify()
+        if len(runs) * lines.block_size > len(lines):  # Rebuild the blocks once, instead of once per run.
+            self._lines.replace_ranges(runs)
+        else:
+            for start, end, new_lines in reversed(runs):  # The indices of the previous runs stay valid.
+                self._lines[start: end] = new_lines
+
+        with self.batch():
+            # From the last edit, so the positions of the others are unchanged.
+            for (line, column, _, _, text), old in zip(reversed(edits), reversed(deleted)):
+                if old:
+                    self._listeners_delete(line, column, old)
+                if text:
+                    self._listeners_insert(line, column, text)
+        self._windows_lines_change(changes)
+        return ends
+
+    def replace(self, pattern, repl, range=None):
+        """Replace the matches of a regular expression, like re.sub, in a single
+        modification of the buffer (see text_edit). The matches can span several
+        lines, and only the lines containing them are rewritten.
+
+        The lines of a few matches are found from their offsets. Many matches
+        are replaced by re.subn, and the lines compared with its result: if
+        their number changed, the lines from the first to the last differing
+        one are replaced.
+
+        Args:
+            pattern: Regular expression (string or compiled pattern).
+            repl: Replacement string (with backreferences, as in re.sub), or
+                function taking a match object and returning the replacement.
+            range: (start, end) indices of the first line and of the line following
+                the last one where to replace. (default None: the whole buffer)
+
+        Returns:
+            Number of matches replaced.
+        """
+        regex = re.compile(pattern)
+        start, end = range if range else (0, len(self._lines))
+        if start >= end:
+            return 0
+        old = self._lines[start: end]
+        text = '\n'.join(old)
+
+        few = len(old) // 8  # Beyond one match every 8 lines, comparing all the lines is faster.
+        matches = list(islice(regex.finditer(text), few + 1))
+        if len(matches) <= few:
+            if callable(repl):
+                expand = repl
+            elif '\\' in repl:
+                expand = lambda match: match.expand(repl)
+            else:
+                expand = lambda match: repl
+            self.text_edit(self._replace_runs(text, start, matches, expand))
+            return len(matches)
+
+        del matches
+        new_text, n_matches = regex.subn(repl, text)
+        new = new_text.split('\n')
+        del new_text
+        if len(new) == len(old):
+            edits = []
+            changed = [line for line, differs in enumerate(map(ne, old, new)) if differs]
+            run_start = changed[0] if changed else 0  # First line of the current run of changed lines.
+            for line, following in zip(changed, changed[1:] + [-1]):
+                if following != line + 1:
+                    edits.append((start + run_start, 0, start + line, len(old[line]),
+                                  '\n'.join(new[run_start: line + 1])))
+                    run_start = following
+        else:
+            size = min(len(old), len(new)) - 1  # Lines kept around the edit, leaving it one line of each.
+            first = next((line for line, differs in enumerate(islice(map(ne, old, new), size)) if differs), size)
+            size -= first
+            suffix = next((line for line, differs in enumerate(islice(map(ne, reversed(old), reversed(new)), size))
+                           if differs), size)
+            last = len(old) - 1 - suffix
+            edits = [(start + first, 0, start + last, len(old[last]), '\n'.join(new[first: len(new) - suffix]))]
+        self.text_edit(edits)
+        return n_matches
+
+    @staticmethod
+    def _replace_runs(text, start, matches, expand):
+        """Get the edits replacing matches of a regular expression (see replace).
+        The matches on consecutive lines form a run, replaced with a single edit
+        of whole lines: the lines are only counted at the bounds of the runs.
+
+        Args:
+            text: String containing the lines where to replace.
+            start: Index of the first line in text.
+            matches: Sorted match objects in text.
+            expand: Function taking a match object and returning its replacement.
+
+        Returns:
+            List of edits (see text_edit).
+        """
+        runs = []  # (offset of the first line, offset of the end of the last line, new text) tuples.
+        pieces = []  # Text of the current run, up to the end of its last match.
+        run_start = run_end = limit = -1  # limit: offset of the end of the line following the run.
+        position = 0  # Offset following the last match.
+        for m in matches:
+            match_start, match_end = m.span()
+            if match_start > limit:
+                if pieces:
+                    pieces.append(text[position: run_end])
+                    runs.append((run_start, run_end, ''.join(pieces)))
+                run_start = text.rfind('\n', 0, match_start) + 1
+                pieces = [text[run_start: match_start]]
+            else:
+                pieces.append(text[position: match_start])
+            pieces.append(expand(m))
+            position = match_end
+            if match_end > run_end:
+                run_end = text.find('\n', match_end)
+                run_end = len(text) if run_end < 0 else run_end
+                limit = text.find('\n', run_end + 1)
+                limit = len(text) if limit < 0 else limit
+        if pieces:
+            pieces.append(text[position: run_end])
+            runs.append((run_start, run_end, ''.join(pieces)))
+
+        edits = []
+        line, offset = start, 0  # Line starting at offset in text.
+        for run_start, run_end, replacement in runs:
+            line += text.count('\n', offset, run_start)
+            end_line = line + text.count('\n', run_start, run_end)
+            offset = text.rfind('\n', 0, run_end) + 1
+            edits.append((line, 0, end_line, run_end - offset, replacement))
+            line = end_line
+        return edits
+
+    def lines_replace(self, start, end, lines):
+        """Replace a range of lines with other lines.
+        Windows receive a single notification for the lines replaced
+        (see _windows_lines_change).
+
+        Args:
+            start: Index of the first line to replace.
+            end: Index following the last line to replace.
+            lines: List of strings (without newlines) replacing the lines.
+        """
+        total = len(self._lines)
+        old = self._lines[start: end]
+        if start == 0 and end == total and not lines:
+            lines = ['']  # A buffer always has at least one line.
+        if not old and not lines:
+            return
+
+        self._lines_modify()
+        self._lines[start: end] = lines
+
+        # Describe the replacement to the listeners as a deletion followed by an insertion.
+        deleted, inserted = '\n'.join(old), '\n'.join(lines)
+        if old and lines:
+            position = start, 0
+        elif end < total:
+            position = start, 0
+            deleted, inserted = (deleted + '\n') if old else '', (inserted + '\n') if lines else ''
+        else:
+            position = start-1, len(self._lines[start-1])
+            deleted, inserted = ('\n' + deleted) if old else '', ('\n' + inserted) if lines else ''
+        with self.batch():
+            if deleted:
+                self._listeners_delete(*position, deleted)
+            if inserted:
+                self._listeners_insert(*position, inserted)
+
+        self._windows_lines_change([(start, len(old), len(lines))])
+
+    def _lines_range(self, range):
+        """Get the lines of a range, and its bounds.
+        In compact mode, the lines of a range larger than rewrite_reset_size
+        are decoded one at a time, as they are iterated.
+
+        Args:
+            range: (start, end) indices of the first line and of the line following
+                the last one, or None for the whole buffer.
+
+        Returns:
+            (start, end, lines): Bounds of the range, and list of its lines
+            (an iterator, for a large range in compact mode).
+        """
+        start, end = range if range else (0, len(self._lines))
+        if self._compact and self._lines.size(start, end) > self.rewrite_reset_size:
+            return start, end, self._lines.iter_range(start, end)
+        return start, end, self._lines[start: end]
+
+    def _lines_rewrite(self, start, end, old, new):
+        """Replace a range of lines with the result of an operation on them,
+        as a single modification, unless it is the same.
+        If old is an iterator (see _lines_range), the new lines are encoded
+        into the storage as they are produced, and the listeners are notified
+        of the range of lines replaced (see _lines_swap), rather than of the
+        text of the range.
+
+        Args:
+            start: Index of the first line of the range.
+            end: Index following the last line of the range.
+            old: List (or iterator) of the lines of the range.
+            new: Iterable of the lines replacing them, consumed once.
+
+        Returns:
+            Number of lines removed.
+        """
+        if isinstance(old, list):
+            new = list(new)
+            if new != old:
+                self.lines_replace(start, end, new)
+            return len(old) - len(new)
+
+        lines = self._lines
+        data = lines.data
+        size = len(data)
+        starts, lengths = lines.index_range(start, end)
+        rewritten = lines.copy()  # Shares the storage: the new lines are appended to it.
+        rewritten[start: end] = new
+        padded = not rewritten
+        if padded:
+            rewritten.append('')  # A buffer always has at least one line.
+        count = len(rewritten) - len(lines) + end - start
+        new_data = rewritten.data
+        new_starts, new_lengths = rewritten.index_range(start, start + count)
+        same = (count == end - start and new_lengths == lengths
+                and all(data[i: i + n] == new_data[j: j + n] for i, j, n in zip(starts, new_starts, lengths)))
+        if same or new_data is not data:
+            del data[size:]  # Referenced by no lines, if unchanged or compacted to a new storage.
+        if same:
+            return int(padded)
+
+        self._lines_swap(rewritten, start, end, count)
+        return end - start - count + padded
+
+    def _lines_swap(self, lines, start, end, count):
+        """Replace the lines with others differing only in a range, notifying the
+        listeners and the windows of that range only (see _listeners_reset).
+
+        Args:
+            lines: BlockList or CompactLines object containing the new lines, owned
+                by the buffer. Converted to the storage of the current mode.
+            start: Index of the first line replaced.
+            end: Index following the last line replaced.
+            count: Number of lines replacing them.
+        """
+        old = self._lines
+        self._lines_modify(copy=False)
+        if self._compact != isinstance(lines, CompactLines):
+            lines = CompactLines(lines) if self._compact else BlockList(lines)
+        self._lines = lines
+        self._listeners_reset(old, (start, end, count))
+        self._windows_lines_change([(start, end - start, count)])
+
+    def lines_sort(self, key=None, numeric=False, reverse=False, unique=False, range=None):
+        """Sort a range of lines, as a single modification of the buffer.
+        The sort is stable. In compact mode, where the lines sorted are decoded,
+        the lines are sorted in runs of sort_run_size bytes written to temporary
+        files, and merged (see sorting.lines_sort). Otherwise, the lines are
+        already in memory, and only their references are sorted.
+
+        Args:
+            key: Function taking a line and returning its sort key. (default None: the line)
+            numeric: Whether to compare the numbers the keys start with, as sort -n
+                does (see sorting.number_key). (default False)
+            reverse: Whether to sort in decreasing order. (default False)
+            unique: Whether to keep only the first of the lines with the same key. (default False)
+            range: (start, end) indices of the first line and of the line following
+                the last one to sort. (default None: the whole buffer)
+
+        Returns:
+            Number of lines removed.
+        """
+        # Deferred import: sorting runs in temporary files needs tempfile, which is slow to load.
+        import sorting
+
+        start, end, old = self._lines_range(range)
+        if numeric:
+            number_key = sorting.number_key
+            key = (lambda line, key=key: number_key(key(line))) if key else number_key
+        new = sorting.lines_sort(old, key, reverse, unique, self.sort_run_size if self._compact else None)
+        return self._lines_rewrite(start, end, old, new)
+
+    def lines_unique(self, key=None, range=None):
+        """Remove the lines repeating a previous line of a range, as a single
+        modification of the buffer. The lines are not reordered: the keys seen
+        are kept in memory (see lines_sort, with unique set, otherwise).
+
+        Args:
+            key: Function taking a line and returning the key compared. (default None: the line)
+            range: (start, end) indices of the first line and of the line following
+                the last one. (default None: the whole buffer)
+
+        Returns:
+            Number of lines removed.
+        """
+        start, end, old = self._lines_range(range)
+
+        def unique(lines):
+            seen = set()
+            for line in lines:
+                line_key = key(line) if key else line
+                if line_key not in seen:
+                    seen.add(line_key)
+                    yield line
+
+        new = unique(old)
+        return self._lines_rewrite(start, end, old, new)
+
+    def lines_filter(self, pattern, keep=True, range=None):
+        """Keep (or remove) the lines of a range containing a match of a regular
+        expression, as a single modification of the buffer.
+
+        Args:
+            pattern: Regular expression (string or compiled pattern), searched in each line.
+            keep: Whether to keep the matching lines, or to remove them. (default True)
+            range: (start, end) indices of the first line and of the line following
+                the last one. (default None: the whole buffer)
+
+        Returns:
+            Number of lines removed.
+        """
+        search = re.compile(pattern).search
+        start, end, old = self._lines_range(range)
+        if keep:
+            new = (line for line in old if search(line))
+        else:
+            new = (line for line in old if not search(line))
+        return self._lines_rewrite(start, end, old, new)
+
+    def lines_columns(self, columns, separator=None, range=None):
+        """Keep some of the fields of the lines of a range, as cut does,
+        as a single modification of the buffer.
+
+        Args:
+            columns: List of the indices of the fields to keep, in the order
+                to keep them (negative ones count from the end of the line).
+                The fields missing from a line are skipped.
+            separator: String separating the fields. (default None: runs of
+                blanks, and the fields kept are separated by a space)
+            range: (start, end) indices of the first line and of the line following
+                the last one. (default None: the whole buffer)
+
+        Returns:
+            Number of lines changed.
+        """
+        joiner = ' ' if separator is None else separator
+        start, end, old = self._lines_range(range)
+        changed = 0
+
+        def fields_keep(lines):
+            nonlocal changed
+            for line in lines:
+                fields = line.split(separator)
+                n_fields = len(fields)
+                kept = joiner.join([fields[column] for column in columns if -n_fields <= column < n_fields])
+                if kept != line:
+                    changed += 1
+                yield kept
+
+        new = fields_keep(old)
+        self._lines_rewrite(start, end, old, new)
+        return changed
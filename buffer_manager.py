@@ -0,0 +1,159 @@
+"""Registry of the buffers opened in the editor."""
+
+import os
+
+from buffer import Buffer
+
+
+class BufferManager:
+    """Class keeping track of the buffers associated with files.
+
+    Opening a file already open returns the existing Buffer, so a file
+    is loaded only once however many windows display it. Buffers are
+    identified by the canonical path of their file, and by its device and
+    inode, and reference counted. A file replaced by another one (e.g. by
+    an atomic save) keeps its buffer, which takes the new inode. Files which
+    do not exist yet are only identified by their path.
+
+    Unreferenced buffers are kept, to be reopened instantly, as long as
+    the memory used by all the buffers stays within the budget: beyond it,
+    the largest unreferenced and unmodified buffers are freed.
+
+    Attributes:
+        memory_budget: Maximum approximate number of bytes used by the buffers.
+    """
+    def __init__(self, memory_budget=1 << 30):
+        """Initialize a BufferManager object.
+
+        Args:
+            memory_budget: Maximum approximate number of bytes used by the buffers.
+                (default 1 GiB)
+        """
+        self.memory_budget = memory_budget
+        self._paths = dict()       # Canonical path -> Buffer.
+        self._inodes = dict()      # (device, inode) -> Buffer.
+        self._keys = dict()        # Buffer -> (canonical path, (device, inode)).
+        self._references = dict()  # Buffer -> number of references.
+
+    @staticmethod
+    def _key(file_name):
+        """Return the keys identifying a file, whatever the path used to reach it.
+
+        Returns:
+            (path, inode): Canonical path of the file, and its (device, inode)
+                tuple, or None if the file does not exist yet.
+        """
+        path = os.path.realpath(file_name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return path, None
+        return path, (stat.st_dev, stat.st_ino)
+
+    def _key_set(self, buffer, key):
+        """Identify a buffer by new keys (see _key), forgetting its previous ones."""
+        self._key_del(buffer)
+        path, inode = key
+        self._paths[path] = buffer
+        if inode is not None:
+            self._inodes[inode] = buffer
+        self._keys[buffer] = key
+
+    def _key_del(self, buffer):
+        """Forget the keys identifying a buffer."""
+        key = self._keys.pop(buffer, None)
+        if key is not None:
+            path, inode = key
+            if self._paths.get(path) is buffer:
+                del self._paths[path]
+            if inode is not None and self._inodes.get(inode) is buffer:
+                del self._inodes[inode]
+
+    def open(self, file_name):
+        """Get a reference to the buffer of a file, opening it if needed.
+
+        Args:
+            file_name: Path of the file.
+
+        Returns:
+            Buffer object associated with the file.
+
+        Raises:
+            OSError: If the file exists but cannot be opened.
+        """
+        key = path, inode = self._key(file_name)
+        buffer = self._paths.get(path) or (inode and self._inodes.get(inode))
+        if buffer is not None:  # Reopening uses no more memory: nothing to evict.
+            if path in self._paths and self._keys[buffer] != key:  # Created, or replaced by another file.
+                self._key_set(buffer, key)
+            self._references[buffer] += 1
+            return buffer
+        buffer = Buffer()
+        buffer.file_open(file_name)
+        self._key_set(buffer, key)
+        self._references[buffer] = 1
+        self.evict()
+        return buffer
+
+    def acquire(self, buffer):
+        """Add a reference to a buffer managed by the BufferManager.
+
+        Args:
+            buffer: Buffer object.
+        """
+        if buffer in self._references:
+            self._references[buffer] += 1
+
+    def release(self, buffer):
+        """Remove a reference to a buffer. Buffers not managed by the BufferManager are ignored.
+
+        Args:
+            buffer: Buffer object.
+        """
+        if self._references.get(buffer):
+            self._references[buffer] -= 1
+            self.evict()
+
+    def references(self, buffer):
+        """Return the number of references to a buffer."""
+        return self._references.get(buffer, 0)
+
+    def buffers(self):
+        """List the managed buffers.
+
+        Returns:
+            List of (file name, references, modified, bytes used) tuples.
+        """
+        return [(buffer.file_name, self._references[buffer], buffer.modified, buffer.memory_usage())
+                for buffer in self._references]
+
+    def __iter__(self):
+        return iter(list(self._references))
+
+    def _free(self, buffer):
+        """Forget an unreferenced buffer and release its resources."""
+        self._key_del(buffer)
+        del self._references[buffer]
+        buffer.close()
+
+    def evict(self):
+        """Free unreferenced, unmodified buffers (largest first) until the memory budget is respected.
+
+        Returns:
+            Number of buffers freed.
+        """
+        usage = {buffer: buffer.memory_usage() for buffer in self._references}
+        total = sum(usage.values())
+        if total <= self.memory_budget:
+            return 0
+
+        candidates = [b for b in usage if not self._references[b] and not b.modified]
+        candidates.sort(key=usage.get, reverse=True)
+        freed = 0
+        for buffer in candidates:
+            if total <= self.memory_budget:
+                break
+            total -= usage[buffer]
+            self._free(buffer)
+            freed += 1
+        return freed
@@ -0,0 +1,119 @@
+"""Thin client of the editor server, drawing its windows on the terminal."""
+
+import curses
+import os
+import selectors
+import sys
+
+from remote import attributes_decode
+
+
+class Client:
+    """Class representing a client attached to the editor server (see Server).
+
+    The client holds no buffer: it draws the windows of its editor, as
+    described by the messages of the server, on its own UI, and sends
+    it the keys pressed. It stops when the server closes the connection.
+
+    Messages from the server:
+        ['create', id, line, column, n_lines, n_columns]: Create a window.
+        ['destroy', id]: Destroy a window.
+        ['resize', id, line, column, n_lines, n_columns]: Move and resize a window.
+        ['attributes', id, colors, properties]: Set the default attributes of a window.
+        ['line', id, row, content, runs, cells]: Update a row of a window
+            (see attributes_encode for the runs).
+        ['insert', id, row, count]: Insert empty rows in a window.
+        ['delete', id, row, count]: Delete rows of a window.
+        ['cursor', id, line, column, shown, wrap]: Move the cursor of a window.
+        ['clear']: Clear the screen before the windows are rearranged.
+        ['refresh']: Show the changes on the screen.
+    """
+    def __init__(self, ui, connection):
+        """Initialize a Client object.
+
+        Args:
+            ui: UI object representing the user interface.
+            connection: Connection object to the server.
+        """
+        self._ui = ui
+        self._connection = connection
+        self._windows = dict()  # Window id -> UIWindow object.
+        self._focused = None    # UIWindow object showing the cursor, reading the keys.
+
+    def attach(self, file_name=None):
+        """Attach to the server, opening a file.
+
+        Args:
+            file_name: Path of the file to open. (default None: no file)
+        """
+        self._connection.send(['hello', self._ui.max_lines, self._ui.max_columns,
+                               os.path.abspath(file_name) if file_name else None])
+
+    def run(self):
+        """Draw the windows and send the keys, until the server closes the connection."""
+        selector = selectors.DefaultSelector()
+        selector.register(sys.stdin, selectors.EVENT_READ)
+        selector.register(self._connection, selectors.EVENT_READ | selectors.EVENT_WRITE)
+        while True:
+            for key, mask in selector.select():
+                if key.fileobj is sys.stdin:
+                    self._keys_send()
+                elif mask & selectors.EVENT_READ:
+                    messages = self._connection.receive()
+                    if messages is None:
+                        return
+                    for message in messages:
+                        self._message_handle(message)
+            done = self._connection.flush()
+            selector.modify(self._connection, selectors.EVENT_READ | (0 if done else selectors.EVENT_WRITE))
+
+    def _keys_send(self):
+        """Send the keys pressed. The UI may read several keys from the
+        terminal at once: they are all sent before waiting again.
+        """
+        window = self._focused if self._focused else next(iter(self._windows.values()), None)
+        if window is None:
+            return
+        key = window.key_get(0)
+        while key is not None:
+            if key.key == curses.KEY_RESIZE:
+                curses.update_lines_cols()
+                self._connection.send(['size', self._ui.max_lines, self._ui.max_columns])
+            self._connection.send(['key', key.key, key.ctrl, key.meta])
+            key = window.key_get(0)
+
+    def _message_handle(self, message):
+        """Apply a message from the server (see the messages above)."""
+        kind, arguments = message[0], message[1:]
+        if kind == 'refresh':
+            self._ui.refresh()
+        elif kind == 'clear':
+            self._ui.resize()
+        elif kind == 'create':
+            window_id, *position = arguments
+            self._windows[window_id] = self._ui.window_create(*position)
+        else:
+            window = self._windows[arguments[0]]
+            if kind == 'line':
+                row, content, runs, cells = arguments[1:]
+                window.line_update(row, content, attributes_decode(runs), cells)
+            elif kind == 'insert':
+                window.lines_insert(*arguments[1:])
+            elif kind == 'delete':
+                window.lines_delete(*arguments[1:])
+            elif kind == 'cursor':
+                line, column, shown, window.wrap = arguments[1:]
+                window.cursor = line, column
+                if shown:
+                    window.cursor_show()
+                    self._focused = window
+                else:
+                    window.cursor_hide()
+            elif kind == 'attributes':
+                window.attributes_set(*arguments[1:])
+            elif kind == 'resize':
+                window.resize(*arguments[1:])
+            elif kind == 'destroy':
+                self._ui.window_destroy(self._windows.pop(arguments[0]))
+                if window is self._focused:
+                    self._focused = None
@@ -24,7 +24,7 @@ class CommandWindow(TextWindow):
         self._scope.update(self._build_scope(lambda: self._editor))
         # self._scope.update(self._build_scope(lambda: self))
 
-        self.key_bindings[Key('C-j')] = lambda: [self.evaluate(), self._editor.command_window_toggle()]
+        self.key_bindings.bind(Key('C-j'), lambda: [self.evaluate(), self._editor.command_window_toggle()])
 
     def _build_scope(self, get_instance):
         """Build a scope (dictionary) with wrappers of the public methods and properties
@@ -0,0 +1,226 @@
+"""Completion of words from the text of the open buffers."""
+
+import re
+from collections import Counter
+from heapq import nsmallest
+
+
+class _Node:
+    """Node of the prefix trie of a Completion."""
+    __slots__ = ('children', 'count', 'best')
+
+    def __init__(self):
+        self.children = None  # Character -> _Node, None if there are none.
+        self.count = 0        # Occurrences of the word ending at the node.
+        self.best = None      # Most frequent words below the node, None if not computed.
+
+
+class _BufferWords:
+    """Class counting the words of a buffer in a Completion, as its lines change.
+
+    It is linked to the buffer like a window, so it is notified of the
+    lines updated, inserted, deleted and replaced. It keeps a copy of the
+    list of lines (sharing the strings with the buffer) to know the words
+    that a notified change replaced.
+    """
+    def __init__(self, completion, buffer):
+        """Initialize a _BufferWords object, counting the current words of the buffer.
+
+        Args:
+            completion: Completion object where to count the words.
+            buffer: Buffer object to follow.
+        """
+        self._completion = completion
+        self._buffer = buffer
+        self._lines = []
+        buffer.window_link(self)  # Calls _update.
+
+    def unlink(self):
+        """Stop following the buffer, uncounting its words."""
+        self._buffer.window_unlink(self)
+        self._completion._lines_count(self._lines, -1)
+        self._lines = []
+
+    def _update(self):
+        """Count the words of the whole text again, after it has been replaced."""
+        self._completion._lines_count(self._lines, -1)
+        self._lines = list(self._buffer.lines)
+        self._completion._lines_count(self._lines, 1)
+
+    def _line_update(self, line):
+        """Count the changes to the words of an updated line."""
+        old, new = self._lines[line], self._buffer.lines[line]
+        if old != new:
+            self._lines[line] = new
+            self._completion._line_replace(old, new)
+
+    def _lines_insert(self, line, count):
+        """Count the words of inserted lines."""
+        lines = self._buffer.lines[line: line + count]
+        self._lines[line: line] = lines
+        self._completion._lines_count(lines, 1)
+
+    def _lines_delete(self, line, count):
+        """Uncount the words of deleted lines."""
+        lines = self._lines[line: line + count]
+        del self._lines[line: line + count]
+        self._completion._lines_count(lines, -1)
+
+    def _lines_redraw(self, line, count):
+        """Nothing to count: the text of the lines is unchanged."""
+
+    def _lines_change(self, changes):
+        """Count the changes to the words of replaced ranges of lines."""
+        lines = self._buffer.lines
+        for line, old, new in changes:  # Replaced in order, as the index of each accounts for the previous ones.
+            replaced, added = self._lines[line: line + old], lines[line: line + new]
+            self._lines[line: line + old] = added
+            self._completion._line_replace('\n'.join(replaced), '\n'.join(added))
+
+
+class Completion:
+    """Class completing words with the most frequent ones in a set of buffers.
+
+    The words are counted in a prefix trie. Each node keeps the most
+    frequent words starting with its prefix, merged from its children's
+    when first needed: changing the count of a word only invalidates the
+    nodes of its prefixes, so completing costs a walk down the trie and
+    a merge per node changed since the last completion.
+
+    The counts follow the buffers incrementally, from their notifications
+    of lines updated, inserted and deleted: only the words of the changed
+    lines are counted again. Compact buffers (see Buffer.compact) are not
+    followed, as that requires a copy of their lines as strings.
+
+    Words are identifiers: a letter or underscore followed by letters, digits
+    or underscores, at least two characters long.
+
+    Attributes:
+        max_results: Maximum number of completions returned.
+        max_length: Maximum length of the words counted.
+    """
+    _word = re.compile(r'[^\W\d]\w+')
+
+    def __init__(self, max_results=16, max_length=64):
+        """Initialize a Completion object, following no buffers.
+
+        Args:
+            max_results: Maximum number of completions returned. (default 16)
+            max_length: Maximum length of the words counted. (default 64)
+        """
+        self.max_results = max_results
+        self.max_length = max_length
+        self._root = _Node()
+        self._followers = dict()  # Buffer -> _BufferWords.
+
+    def buffers_set(self, buffers):
+        """Set the buffers whose words are completed.
+        The words of the buffers not followed yet are counted, and those
+        of the buffers not in the set anymore are uncounted.
+
+        Args:
+            buffers: Iterable of Buffer objects.
+        """
+        buffers = {buffer for buffer in buffers if not buffer.compact}
+        for buffer in set(self._followers) - buffers:
+            self._followers.pop(buffer).unlink()
+        for buffer in buffers - set(self._followers):
+            self._followers[buffer] = _BufferWords(self, buffer)
+
+    def complete(self, prefix, k=10):
+        """Find the most frequent words starting with a prefix.
+
+        Args:
+            prefix: String the words start with.
+            k: Maximum number of words, up to max_results. (default 10)
+
+        Returns:
+            List of words longer than prefix, the most frequent first
+            (in alphabetical order for the same frequency).
+        """
+        node = self._root
+        for char in prefix:
+            node = node.children.get(char) if node.children else None
+            if node is None:
+                return []
+        return [word for (_, word) in self._best(node, prefix) if word != prefix][:min(k, self.max_results)]
+
+    def _best(self, node, prefix):
+        """Get the most frequent words below a node, merging them from its children if needed.
+
+        Args:
+            node: _Node object.
+            prefix: String leading to the node.
+
+        Returns:
+            List of up to max_results + 1 (-count, word) tuples, sorted.
+        """
+        if node.best is None:
+            best = [(-node.count, prefix)] if node.count else []
+            if node.children:
+                for char, child in node.children.items():
+                    best.extend(self._best(child, prefix + char))
+            node.best = nsmallest(self.max_results + 1, best)
+        return node.best
+
+    def _word_add(self, word, delta):
+        """Change the count of a word, invalidating the nodes of its prefixes.
+
+        Args:
+            word: String.
+            delta: Number of occurrences added (negative if removed).
+        """
+        node = self._root
+        path = [node]
+        for char in word:
+            node.best = None
+            if node.children is None:
+                node.children = dict()
+            child = node.children.get(char)
+            if child is None:
+                child = node.children[char] = _Node()
+            node = child
+            path.append(node)
+        node.best = None
+        node.count += delta
+
+        # Remove the nodes left without words.
+        for i in range(len(word), 0, -1):
+            node = path[i]
+            if node.count or node.children:
+                break
+            parent = path[i-1]
+            del parent.children[word[i-1]]
+            if not parent.children:
+                parent.children = None
+
+    def _words_add(self, counts, sign):
+        """Add or remove the counts of words.
+
+        Args:
+            counts: Counter of words.
+            sign: 1 to add the counts, -1 to remove them.
+        """
+        for word, count in counts.items():
+            if count and len(word) <= self.max_length:
+                self._word_add(word, sign * count)
+
+    def _lines_count(self, lines, sign):
+        """Add or remove the counts of the words of lines.
+
+        Args:
+            lines: Sequence of strings.
+            sign: 1 to add the counts, -1 to remove them.
+        """
+        self._words_add(Counter(self._word.findall('\n'.join(lines))), sign)
+
+    def _line_replace(self, old, new):
+        """Update the counts of the words of a line replaced by another.
+
+        Args:
+            old: String of the replaced line.
+            new: String of the new line.
+        """
+        counts = Counter(self._word.findall(new))
+        counts.subtract(self._word.findall(old))
+        self._words_add(counts, 1)
@@ -0,0 +1,188 @@
+"""Streaming access to compressed files."""
+
+import os
+from bisect import bisect_right
+
+_codecs = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz', '.lzma': 'xz'}
+
+
+def codec(file_name):
+    """Return the compression format of a file from its extension.
+
+    Args:
+        file_name: Path of the file.
+
+    Returns:
+        'gzip', 'bz2' or 'xz'.
+        None: If the file is not compressed.
+    """
+    return _codecs.get(os.path.splitext(file_name)[1].lower())
+
+
+def _module(codec):
+    """Import the module implementing a compression format.
+    Deferred: each one loads a native library, and most files are not compressed.
+    """
+    if codec == 'gzip':
+        import zlib
+        return zlib
+    if codec == 'bz2':
+        import bz2
+        return bz2
+    import lzma
+    return lzma
+
+
+def _decompressor(codec):
+    """Return a new decompressor object for a compression format."""
+    module = _module(codec)
+    if codec == 'gzip':
+        return module.decompressobj(wbits=module.MAX_WBITS | 16)
+    if codec == 'bz2':
+        return module.BZ2Decompressor()
+    return module.LZMADecompressor()
+
+
+def _compressor(codec):
+    """Return a new compressor object for a compression format."""
+    module = _module(codec)
+    if codec == 'gzip':
+        return module.compressobj(wbits=module.MAX_WBITS | 16)
+    if codec == 'bz2':
+        return module.BZ2Compressor()
+    return module.LZMACompressor()
+
+
+class CompressedFile:
+    """Class representing a compressed file, decompressed in streaming chunks.
+
+    While decompressing, the state of the decompressor is saved at regular
+    intervals (checkpoints), so reading from an offset already reached
+    resumes from the nearest checkpoint instead of the start of the file.
+    Checkpoints require copying the decompressor, which only zlib
+    supports: bz2 and xz files are always decompressed from the start.
+    Concatenated streams (e.g. appended gzip members) are supported.
+
+    Attributes:
+        codec: Compression format ('gzip', 'bz2' or 'xz').
+        position: Number of compressed bytes read by the running decompression.
+    """
+    read_size = 1 << 18  # Compressed bytes decompressed at a time.
+    checkpoint_interval = 1 << 24  # Decompressed bytes between checkpoints.
+
+    def __init__(self, file_name, codec_name=None):
+        """Initialize a CompressedFile object.
+
+        Args:
+            file_name: Path of the file.
+            codec_name: Compression format. (default None: guess from the extension)
+        """
+        self.codec = codec_name if codec_name else codec(file_name)
+        self.position = 0
+        self._file_name = file_name
+        self._checkpoints = [(0, 0, None)]  # (Compressed offset, decompressed offset, decompressor).
+
+    @property
+    def checkpoints(self):
+        """List of (compressed offset, decompressed offset) of the checkpoints (read-only)."""
+        return [checkpoint[:2] for checkpoint in self._checkpoints]
+
+    def chunks(self, offset=0):
+        """Decompress the file from an offset, one chunk at a time.
+
+        Args:
+            offset: Offset in the decompressed data where to start. (default 0)
+
+        Yields:
+            bytes objects with consecutive parts of the decompressed data.
+
+        Raises:
+            EOFError: If the file ends in the middle of a compressed stream.
+        """
+        outputs = [checkpoint[1] for checkpoint in self._checkpoints]
+        position, output, state = self._checkpoints[bisect_right(outputs, offset) - 1]
+        decompressor = state.copy() if state else _decompressor(self.codec)
+        ended = position == 0  # An empty file is an empty stream.
+
+        with open(self._file_name, 'rb') as f:
+            f.seek(position)
+            while True:
+                data = f.read(self.read_size)
+                if not data:
+                    break
+                position += len(data)
+                self.position = position
+                parts = []
+                while data:
+                    parts.append(decompressor.decompress(data))
+                    ended = decompressor.eof
+                    data = decompressor.unused_data if ended else b''
+                    if data:
+                        decompressor = _decompressor(self.codec)
+                chunk = b''.join(parts)
+
+                start = output
+                output += len(chunk)
+                if (self.codec == 'gzip' and not ended
+                        and output - self._checkpoints[-1][1] >= self.checkpoint_interval):
+                    self._checkpoints.append((position, output, decompressor.copy()))
+                if output > offset:
+                    yield chunk[max(offset - start, 0):]
+
+        if not ended:
+            raise EOFError('compressed file ended before the end-of-stream marker was reached')
+
+    def read(self, offset, size):
+        """Read part of the decompressed data.
+
+        Args:
+            offset: Offset in the decompressed data.
+            size: Maximum number of bytes to read.
+
+        Returns:
+            bytes object (shorter than size at the end of the data).
+        """
+        parts, length = [], 0
+        for chunk in self.chunks(offset):
+            parts.append(chunk)
+            length += len(chunk)
+            if length >= size:
+                break
+        return b''.join(parts)[:size]
+
+
+def file_compress(file_name, data, codec_name=None, background=False):
+    """Compress data into a file, in chunks.
+
+    Args:
+        file_name: Path of the file.
+        data: bytes object to compress.
+        codec_name: Compression format. (default None: guess from the extension)
+        background: Whether to write the file in a new thread. (default False)
+
+    Returns:
+        The started Thread object writing the file, if background is set.
+        Its error attribute holds the exception raised, if any.
+    """
+    codec_name = codec_name if codec_name else codec(file_name)
+    if background:
+        # Deferred import: threads are only needed to write compressed files.
+        from threading import Thread
+
+        def run():
+            try:
+                file_compress(file_name, data, codec_name)
+            except Exception as error:
+                thread.error = error
+        thread = Thread(target=run, name='compress ' + file_name)
+        thread.error = None
+        thread.start()
+        return thread
+
+    compressor = _compressor(codec_name)
+    size = CompressedFile.read_size * 4
+    view = memoryview(data)
+    with open(file_name, 'wb') as f:
+        for i in range(0, len(view), size):
+            f.write(compressor.compress(view[i: i + size]))
+        f.write(compressor.flush())
@@ -0,0 +1,220 @@
+"""Computation of the differences between sequences of lines, and between buffers and their files."""
+
+from bisect import bisect_left, bisect_right
+from enum import IntEnum
+
+
+def lines_diff(old, new):
+    """Compute the hunks transforming a sequence of lines into another.
+    The common prefix and suffix are skipped before running the
+    (quadratic in the worst case) matching on what remains.
+
+    Args:
+        old: Sequence of strings.
+        new: Sequence of strings.
+
+    Returns:
+        List of (start, end, new_start, new_end) tuples, in increasing order:
+        old[start:end] must be replaced with new[new_start:new_end].
+    """
+    prefix = 0
+    limit = min(len(old), len(new))
+    while prefix < limit and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    limit -= prefix
+    while suffix < limit and old[-1-suffix] == new[-1-suffix]:
+        suffix += 1
+
+    old_middle = old[prefix: len(old)-suffix]
+    new_middle = new[prefix: len(new)-suffix]
+    if not old_middle or not new_middle:
+        if old_middle or new_middle:
+            return [(prefix, prefix + len(old_middle), prefix, prefix + len(new_middle))]
+        return []
+
+    # Deferred import: difflib is only needed for the lines between the common prefix and suffix.
+    from difflib import SequenceMatcher
+
+    matcher = SequenceMatcher(None, old_middle, new_middle, autojunk=False)
+    return [(prefix+i1, prefix+i2, prefix+j1, prefix+j2)
+            for (tag, i1, i2, j1, j2) in matcher.get_opcodes() if tag != 'equal']
+
+
+class LineChange(IntEnum):
+    """Enumeration listing the changes of a line compared to the file (see FileDiff.line_change)."""
+    Unchanged = 0
+    Added = 1
+    Modified = 2
+    Deleted = 3  # Unchanged, following deleted lines.
+
+
+class FileDiff:
+    """Class representing the differences between a buffer and its file.
+
+    The diff is a listener of the buffer. It keeps the regions of lines
+    modified since the file was read or written, with the range of lines
+    of the file each of them replaces: the lines between them are the
+    same. Only the regions are compared with the file, when their
+    differences are needed, and again after they are modified. When the
+    editor is idle, the lines of the regions modified are drawn again
+    with their changes.
+    """
+    def __init__(self, buffer):
+        """Initialize a FileDiff object and link it to the buffer.
+
+        Args:
+            buffer: Buffer object to compare with its file.
+        """
+        self._buffer = buffer
+        self._base = None   # Lines of the file, None until it is loaded.
+        self._starts = []   # First line of each region.
+        self._ends = []     # Line following each region.
+        self._bases = []    # (start, end) range of the lines of the file replaced by each region.
+        self._hunks = []    # Differences of each region (see lines_diff), None until compared.
+        self._drawn = []    # Whether the changes shown for the lines of each region are up to date.
+
+        buffer.listener_link(self)
+
+    def _base_set(self, lines, modified=False):
+        """Compare the buffer with other lines of the file.
+
+        Args:
+            lines: Sequence of strings containing the file's text.
+            modified: Whether the buffer's text differs from the file's. (default False)
+        """
+        had_regions = bool(self._starts)
+        self._base = lines
+        self._starts, self._ends, self._bases, self._hunks, self._drawn = [], [], [], [], []
+        if modified:
+            self._text_reset(None)
+        elif had_regions:
+            self._buffer._windows_lines_redraw(0, len(self._buffer.lines))
+
+    def hunks(self):
+        """Compute the differences between the file and the buffer.
+
+        Returns:
+            List of (start, end, new_start, new_end) tuples, in increasing order:
+            lines start to end of the file were replaced with lines
+            new_start to new_end of the buffer (see lines_diff).
+        """
+        hunks = []
+        for k, (start, (base_start, _)) in enumerate(zip(self._starts, self._bases)):
+            hunks += [(base_start + i1, base_start + i2, start + j1, start + j2)
+                      for (i1, i2, j1, j2) in self._region_hunks(k)]
+        return hunks
+
+    def line_change(self, line):
+        """Get the change of a line compared to the file. The lines modified
+        since the editor was last idle are not compared yet: they are
+        reported as modified.
+
+        Args:
+            line: Index of the line.
+
+        Returns:
+            LineChange value.
+        """
+        k = bisect_right(self._starts, line) - 1
+        if k < 0 or line > self._ends[k]:
+            return LineChange.Unchanged
+        line -= self._starts[k]
+        hunks = self._hunks[k]
+        if hunks is None:
+            return LineChange.Modified if line < self._ends[k] - self._starts[k] else LineChange.Unchanged
+        change = LineChange.Unchanged
+        for i1, i2, j1, j2 in hunks:
+            if j1 <= line < j2:
+                return LineChange.Modified if i1 < i2 else LineChange.Added
+            if j1 == j2 == line:
+                change = LineChange.Deleted
+        return change
+
+    def _region_hunks(self, k):
+        """Get the differences of a region, relative to its first lines, comparing it if needed."""
+        hunks = self._hunks[k]
+        if hunks is None:
+            base_start, base_end = self._bases[k]
+            hunks = lines_diff(self._base[base_start: base_end], self._buffer.lines[self._starts[k]: self._ends[k]])
+            self._hunks[k] = hunks
+        return hunks
+
+    def _region_trim(self, k):
+        """Reduce a region to its differences, removing it if there are none."""
+        hunks = self._region_hunks(k)
+        if not hunks:
+            for regions in (self._starts, self._ends, self._bases, self._hunks, self._drawn):
+                del regions[k]
+            return
+        # The lines before the first difference and after the last one are the same.
+        i, j = hunks[0][0], hunks[0][2]
+        start, base_start = self._starts[k], self._bases[k][0]
+        self._starts[k], self._ends[k] = start + j, start + hunks[-1][3]
+        self._bases[k] = base_start + i, base_start + hunks[-1][1]
+        self._hunks[k] = [(i1 - i, i2 - i, j1 - j, j2 - j) for (i1, i2, j1, j2) in hunks]
+
+    def _idle(self):
+        """Compare the regions modified, and draw their lines again (see Buffer._idle)."""
+        n_lines = len(self._buffer.lines)
+        for k in reversed(range(len(self._starts))):  # Regions removed leave the indices before unchanged.
+            if not self._drawn[k]:
+                self._drawn[k] = True
+                start, end = self._starts[k], self._ends[k]
+                self._region_trim(k)
+                # The line following the region shows whether lines were deleted.
+                self._buffer._windows_lines_redraw(start, min(end + 1, n_lines) - start)
+
+    def _lines_edit(self, line, old, new):
+        """Mark a range of replaced lines as modified, merging the regions it touches.
+
+        Args:
+            line: Index of the first line replaced.
+            old: Number of lines replaced.
+            new: Number of lines replacing them.
+        """
+        if self._base is None:
+            return
+        starts, ends, bases = self._starts, self._ends, self._bases
+        end = line + old
+        i = bisect_left(ends, line)     # First region touching the range...
+        j = bisect_right(starts, end)   # ...and first one following it.
+        # The lines between the regions are the same as in the file, shifted.
+        offset = bases[i-1][1] - ends[i-1] if i else 0
+        if i < j and starts[i] <= line:
+            start, base_start = starts[i], bases[i][0]
+        else:
+            start, base_start = line, line + offset
+        if i < j:
+            offset = bases[j-1][1] - ends[j-1]
+        if i < j and ends[j-1] >= end:
+            stop, base_stop = ends[j-1], bases[j-1][1]
+        else:
+            stop, base_stop = end, end + offset
+        shift = new - old
+        starts[i:j] = [start]
+        ends[i:j] = [stop + shift]
+        bases[i:j] = [(base_start, base_stop)]
+        self._hunks[i:j] = [None]
+        self._drawn[i:j] = [False]
+        if shift:
+            starts[i+1:] = [start + shift for start in starts[i+1:]]
+            ends[i+1:] = [end + shift for end in ends[i+1:]]
+
+    def _text_insert(self, line, column, text):
+        """Mark the lines of inserted text as modified. See Buffer._listeners_insert."""
+        self._lines_edit(line, 1, 1 + text.count('\n'))
+
+    def _text_delete(self, line, column, text):
+        """Mark the line of deleted text as modified. See Buffer._listeners_delete."""
+        self._lines_edit(line, 1 + text.count('\n'), 1)
+
+    def _text_reset(self, lines, range=None):
+        """Mark all the lines (or those of the range replaced) as modified. See Buffer._listeners_reset."""
+        if range is not None:
+            start, end, count = range
+            self._lines_edit(start, end - start, count)
+        elif self._base is not None:
+            self._starts, self._ends = [0], [len(self._buffer.lines)]
+            self._bases = [(0, len(self._base))]
+            self._hunks, self._drawn = [None], [False]
@@ -1,8 +1,14 @@
 """Generic editor functionalities."""
 
+import re
+from contextlib import ExitStack
+from time import perf_counter
+
 from buffer import Buffer
-from command_window import CommandWindow
+from buffer_manager import BufferManager
 from key import Key
+from keymap import Keymap
+from layout import Layout
 from status_window import StatusWindow
 from text_window import TextWindow
 
@@ -11,47 +17,260 @@ class Editor:
     """Class representing the whole editor.
 
     Editor has exactly one StatusWindow and one CommandWindow. It can
-    contain one or more TextWindow.
+    contain one or more TextWindow, arranged by splitting the screen.
+    Buffers of files are managed by a BufferManager, which can be shared
+    by several editors.
+    Sequences of keys can be recorded as a macro, and replayed in bulk:
+    as a single undoable modification, drawing the windows only once.
+    C-x e replays it once, C-x E prompts for a count or a pattern.
+
+    Attributes:
+        idle_timeout: Seconds without keypresses after which the editor
+            is considered idle and performs its housekeeping.
+        load_timeout: Seconds between the batches of lines appended to
+            buffers whose files are being loaded.
     """
 
-    def __init__(self, ui):
+    def __init__(self, ui, buffer_manager=None):
         """Initialize an Editor object.
 
         Args:
             ui: UI object representing the user interface.
+            buffer_manager: BufferManager object. (default None: create a new one)
         """
         self._ui = ui
+        self.buffer_manager = buffer_manager if buffer_manager else BufferManager()
+
+        self.idle_timeout = 1.0
+        self.load_timeout = 0.02
+
+        self.key_bindings = Keymap({
+            Key('M-q'): self.quit,
+            Key('M-x'): self.command_window_toggle,
+            Key('RESIZE'): self._resize,
+            'C-x 2': self.window_split,
+            'C-x 3': lambda: self.window_split(side_by_side=True),
+            'C-x 0': self.window_close,
+            'C-x o': self.window_next,
+            'C-x (': self.macro_record,
+            'C-x )': self.macro_stop,
+            'C-x e': self.macro_replay,
+            'C-x S-e': lambda: self.command_prompt('macro_replay('),
+        })
 
         self._windows = list()
         self._window_welcome()
+        self._window_current = self._windows[0]
         self.window_focused = self._windows[0]  # Call setter.
+        self._layout = Layout(self._window_current)
 
         self._status_window = StatusWindow(self)
-        self._command_window = CommandWindow(self)
+        self._command_window = None  # Created on first use.
+        self._completion = None  # Created on first use.
 
-        self.key_bindings = {
-            Key('M-q'): quit,
-            Key('M-x'): self.command_window_toggle,
-        }
+        self._macro = None            # Keys of the last recorded macro.
+        self._macro_recording = None  # Keys recorded so far, while recording.
+        self._macro_sequence = []     # Keys of the sequence being typed, while recording.
+        self._macro_replaying = False
+        self._macro_report = None     # (iterations, seconds) of the last replay, until the next keypress.
+        self._message = None          # Text reported to the user, until the next keypress.
+
+    def _render(self):
+        """Draw the current state of the windows on the screen."""
+        self._status_window.update()
+        self._ui.refresh()
+
+    def _run(self, rendered=False):
+        """Start the execution loop.
 
-    def _run(self):
-        """Start the execution loop."""
+        Args:
+            rendered: Whether the windows have just been drawn (see _render),
+                so they are not drawn again before the first key. (default False)
+        """
         while True:
-            self._status_window.update()
-            self._ui.refresh()
-            self.key_handle(self._window_focused._ui_window.key_get())
+            if not rendered:
+                self._render()
+            rendered = False
+            loading = any(buffer.loading for buffer in self.buffer_manager)
+            key = self._window_focused._ui_window.key_get(self.load_timeout if loading else self.idle_timeout)
+            if key is None:
+                self._idle()
+            else:
+                self.key_handle(key)
+
+    def _idle(self):
+        """Perform the housekeeping deferred while the user is typing."""
+        buffers = self._buffers_open()
+        for buffer in buffers:
+            buffer._idle()
+        if self._completion:
+            self._completion.buffers_set(buffers)
+
+    def _buffers_open(self):
+        """Return the set of the buffers shown in the windows or managed by the BufferManager."""
+        return {window.buffer for window in self._windows}.union(self.buffer_manager)
+
+    def complete(self, prefix, k=10):
+        """Find the most frequent words of the open buffers starting with a prefix.
+        The words are counted when first completing, then kept up to date
+        as the buffers change (see Completion).
+
+        Args:
+            prefix: String the words start with.
+            k: Maximum number of words. (default 10)
+
+        Returns:
+            List of words longer than prefix, the most frequent first.
+        """
+        if self._completion is None:
+            # Deferred import: completion is only needed once requested.
+            from completion import Completion
+            self._completion = Completion()
+        self._completion.buffers_set(self._buffers_open())
+        return self._completion.complete(prefix, k)
+
+    @property
+    def macro_recording(self):
+        """Whether a macro is being recorded (read-only)."""
+        return self._macro_recording is not None
+
+    @property
+    def macro_report(self):
+        """(iterations, seconds) of the last macro replay, until the next keypress, or None (read-only)."""
+        return self._macro_report
+
+    @property
+    def message(self):
+        """Text reported to the user until the next keypress, or None (read-only)."""
+        return self._message
+
+    def message_show(self, text):
+        """Report a text to the user in the status window, until the next keypress.
+
+        Args:
+            text: String to show.
+        """
+        self._message = text
+
+    def macro_record(self):
+        """Start recording the keys typed as a macro."""
+        self._macro_recording = []
+        self._macro_sequence = []
+
+    def macro_stop(self):
+        """Stop recording the macro. The keys stopping it are not recorded."""
+        if self._macro_recording is not None:
+            self._macro = self._macro_recording
+            self._macro_recording = None
+            self._macro_sequence = []
+
+    def macro_replay(self, count=1, pattern=None):
+        """Replay the last recorded macro in the current window.
+        All the replays are a single undoable modification of its buffer,
+        and the windows are only drawn at the end.
+
+        Args:
+            count: Number of times to replay the macro. (default 1)
+            pattern: Regular expression. If given, the macro is replayed once
+                from the beginning of each line matching it, instead of count
+                times. (default None)
+
+        Returns:
+            Number of times the macro was replayed.
+        """
+        if not self._macro or self._macro_recording is not None or self._macro_replaying:
+            return 0
+        window = self._window_current
+        focused = self._window_focused
+        self.window_focused = window
+        self._macro_replaying = True
+        start = perf_counter()
+        try:
+            with ExitStack() as stack:
+                stack.enter_context(window.buffer.batch())
+                for w in self._windows:
+                    stack.enter_context(w.drawing_suspended())
+                if pattern is None:
+                    iterations = count
+                    for _ in range(count):
+                        self._macro_play()
+                else:
+                    regex = re.compile(pattern)
+                    lines = [i for i, text in enumerate(window.buffer.lines) if regex.search(text)]
+                    iterations = len(lines)
+                    for line in reversed(lines):  # Bottom up, so the lines left are not moved by the replays.
+                        window.cursor = line, 0
+                        self._macro_play()
+        finally:
+            self._macro_replaying = False
+            self.window_focused = focused
+        self._macro_report = iterations, perf_counter() - start
+        return iterations
+
+    def _macro_play(self):
+        """Handle the keys of the macro once."""
+        for key in self._macro:
+            self.key_handle(key)
+
+    def file_open(self, file_name, window=None):
+        """Open a file in a window, sharing its buffer if it is already open.
+
+        Args:
+            file_name: Path of the file to open.
+            window: TextWindow object where to show the file. (default None: current window)
+        """
+        window = window if window else self.window_current
+        buffer = self.buffer_manager.open(file_name)
+        previous = window.buffer
+        window.buffer = buffer
+        self.buffer_manager.release(previous)
+
+    def buffers(self):
+        """List the buffers of the open files.
+
+        Returns:
+            List of (file name, references, modified, bytes used) tuples.
+        """
+        return self.buffer_manager.buffers()
+
+    def close(self):
+        """Close the windows showing buffers, releasing the buffers of the files (see BufferManager)."""
+        for window in list(self._windows):
+            self.window_remove(window)
+
+    def quit(self):
+        """Quit the editor, writing the pending journal records first."""
+        self._idle()
+        raise SystemExit
 
     def command_window_toggle(self):
         """Switch the focus to and from the command window."""
+        if self._command_window is None:
+            # Deferred import: building the command scope needs inspect, which is slow to load.
+            from command_window import CommandWindow
+            self._command_window = CommandWindow(self)
+
         if self.window_focused is self._command_window:
             self.window_focused = self.window_current
         else:
             self.window_focused = self._command_window
 
+    def command_prompt(self, text):
+        """Move the focus to the command window, showing the start of a command
+        for the user to complete (e.g. with its arguments) and evaluate.
+
+        Args:
+            text: Start of the command.
+        """
+        if self.window_focused is not self._command_window:
+            self.command_window_toggle()
+        self._command_window.buffer.content = text
+        self._command_window.cursor_end()
+
     @property
     def window_current(self):
         """TextWindow currently being edited (read-only)."""
-        return self._windows[0]
+        return self._window_current
 
     @property
     def window_focused(self):
@@ -85,7 +304,58 @@ class Editor:
         try:
             self._windows.remove(window)
         except ValueError:
-            pass
+            return
+        window.buffer.window_unlink(window)
+        self.buffer_manager.release(window.buffer)
+
+    def window_split(self, side_by_side=False):
+        """Split the current window in two, showing the same buffer.
+        The new window becomes the current one.
+
+        Args:
+            side_by_side: Whether to split horizontally. (default False: one above the other)
+        """
+        current = self._window_current
+        window = TextWindow(self, 0, 0, 1, 1, current.buffer)
+        self.buffer_manager.acquire(current.buffer)
+        self.window_add(window)
+        self._layout.split(current, window, side_by_side)
+        self._resize()
+        window.cursor = current.cursor
+        self._window_select(window)
+
+    def window_close(self):
+        """Close the current window, unless it is the only one."""
+        window = self._window_current
+        if len(self._layout.windows()) == 1:
+            return
+        self.window_next()
+        self._layout.remove(window)
+        self.window_remove(window)
+        self._ui.window_destroy(window._ui_window)
+        self._resize()
+
+    def window_next(self):
+        """Make the next window in the layout the current one."""
+        windows = self._layout.windows()
+        self._window_select(windows[(windows.index(self._window_current) + 1) % len(windows)])
+
+    def _window_select(self, window):
+        """Make a TextWindow the current one, moving the focus to it
+        unless the command window has it.
+        """
+        self._window_current = window
+        if self.window_focused is not self._command_window:
+            self.window_focused = window
+
+    def _resize(self):
+        """Arrange the windows according to the layout and the size of the screen."""
+        self._ui.resize()
+        max_lines, max_columns = self._ui.max_lines, self._ui.max_columns
+        self._layout.arrange(0, 0, max_lines-2, max_columns)
+        self._status_window.resize(max_lines-2, 0, 1, max_columns)
+        if self._command_window:
+            self._command_window.resize(max_lines-1, 0, 1, max_columns)
 
     def _window_welcome(self):
         """Create and show the welcome window."""
@@ -99,11 +369,19 @@ class Editor:
         Gives priority to lower levels in the hierarchy, i.e.
         window keybindings are checked before global ones.
 
+        While recording a macro, the keys are recorded once the sequence
+        they belong to is complete.
+
         Args:
             key: Key object representing the keys pressed.
         """
+        self._macro_report = None
+        self._message = None
+        if self._macro_recording is not None:
+            self._macro_sequence.append(key)
         if not self._window_focused.key_handle(key):
-            try:
-                self.key_bindings[key]()
-            except KeyError:
-                pass
+            self.key_bindings.key_handle(key)
+        if self._macro_recording is not None and not (self._window_focused.key_bindings.pending
+                                                      or self.key_bindings.pending):
+            self._macro_recording.extend(self._macro_sequence)
+            self._macro_sequence = []
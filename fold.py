@@ -0,0 +1,376 @@
+"""Folding of lines: the blocks of indented lines, and the lines hidden by folds."""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+_blank = 0xffff  # Indentation of blank lines, above any other.
+
+
+def line_indent(text, tab_size=8):
+    """Get the indentation of a line, in screen columns.
+
+    Args:
+        text: String containing the line.
+        tab_size: Number of columns between tab stops. (default 8)
+
+    Returns:
+        Number of screen columns before the first non-blank character.
+        None: If the line is blank.
+    """
+    stripped = text.lstrip(' \t')
+    if not stripped:
+        return None
+    indent = len(text) - len(stripped)
+    if '\t' in text[:indent]:
+        indent = len(text[:indent].expandtabs(tab_size))
+    return indent
+
+
+class IndentIndex:
+    """Class representing the indentation of the lines of a buffer, giving
+    the blocks that can be folded: a block is made of the lines following
+    a line (its header) that are more indented, or blank.
+
+    The indentation of every line is measured when first needed, and kept
+    in an array of two bytes per line. The owner of the index forwards the
+    notifications of the buffer, with its lines: only the lines changed are
+    measured again.
+
+    Attributes:
+        tab_size: Number of columns between tab stops.
+    """
+    def __init__(self, tab_size=8):
+        """Initialize an IndentIndex object.
+
+        Args:
+            tab_size: Number of columns between tab stops. (default 8)
+        """
+        self.tab_size = tab_size
+        self._indents = None  # array('H') of the indentations, _blank for blank lines.
+
+    def _measure(self, lines, start, end):
+        """Get the array of the indentations of a range of lines."""
+        tab_size = self.tab_size
+        indents = array('H')
+        for line in range(start, end):
+            indent = line_indent(lines[line], tab_size)
+            indents.append(_blank if indent is None else min(indent, _blank - 1))
+        return indents
+
+    def _get(self, lines):
+        """Get the indentations of the lines, measuring them if needed."""
+        if self._indents is None:
+            self._indents = self._measure(lines, 0, len(lines))
+        return self._indents
+
+    def clear(self):
+        """Forget the indentations, measured again when needed."""
+        self._indents = None
+
+    def line_update(self, lines, line):
+        """Measure again the indentation of an updated line.
+
+        Args:
+            lines: Sequence of strings, after the update.
+            line: Index of the line.
+        """
+        if self._indents is not None:
+            self._indents[line: line + 1] = self._measure(lines, line, line + 1)
+
+    def lines_insert(self, lines, line, count):
+        """Measure the indentation of inserted lines, renumbering the following ones.
+
+        Args:
+            lines: Sequence of strings, after the insertion.
+            line: Index of the first line inserted.
+            count: Number of lines inserted.
+        """
+        if self._indents is not None:
+            self._indents[line: line] = self._measure(lines, line, line + count)
+
+    def lines_delete(self, lines, line, count):
+        """Forget the indentation of deleted lines, renumbering the following ones.
+
+        Args:
+            lines: Sequence of strings, after the deletion.
+            line: Index of the first line deleted.
+            count: Number of lines deleted.
+        """
+        if self._indents is not None:
+            del self._indents[line: line + count]
+
+    def lines_change(self, lines, changes):
+        """Measure the indentation of the lines replacing ranges of lines.
+
+        Args:
+            lines: Sequence of strings, after the changes.
+            changes: List of (line, old_count, new_count) tuples (see Buffer._windows_lines_change).
+        """
+        if self._indents is not None:
+            for line, old, new in changes:
+                self._indents[line: line + old] = self._measure(lines, line, line + new)
+
+    def block_end(self, lines, line):
+        """Find the end of the block of a header: the blank lines ending it are not part of it.
+
+        Args:
+            lines: Sequence of strings.
+            line: Index of the header.
+
+        Returns:
+            Index following the last line of the block (line + 1 if it is empty).
+        """
+        indents = self._get(lines)
+        header = indents[line]
+        last = line
+        for i in range(line + 1, len(indents)):
+            indent = indents[i]
+            if indent <= header:
+                break
+            if indent != _blank:
+                last = i
+        return last + 1
+
+    def block_start(self, lines, line):
+        """Find the header of the innermost block containing a line.
+
+        Args:
+            lines: Sequence of strings.
+            line: Index of the line (a blank line is part of the block of the line above it).
+
+        Returns:
+            Index of the header.
+            None: If the line is not in a block.
+        """
+        indents = self._get(lines)
+        while line >= 0 and indents[line] == _blank:
+            line -= 1
+        if line < 0:
+            return None
+        indent = indents[line]
+        for i in range(line - 1, -1, -1):
+            if indents[i] < indent:
+                return i
+        return None
+
+    def blocks(self, lines, depth):
+        """Find the blocks whose header is inside depth other blocks.
+
+        Args:
+            lines: Sequence of strings.
+            depth: Number of blocks containing the headers (0 for the outermost ones).
+
+        Returns:
+            List of (start, end) tuples: the ranges of lines of the blocks, sorted.
+        """
+        found = []
+        headers = []  # (indentation, line) of the lines whose block is not ended yet.
+        last = -1     # Last non-blank line.
+        for line, indent in enumerate(self._get(lines)):
+            if indent == _blank:
+                continue
+            while headers and headers[-1][0] >= indent:
+                header = headers.pop()[1]
+                if len(headers) == depth and header < last:
+                    found.append((header + 1, last + 1))
+            headers.append((indent, line))
+            last = line
+        while headers:
+            header = headers.pop()[1]
+            if len(headers) == depth and header < last:
+                found.append((header + 1, last + 1))
+        found.sort()
+        return found
+
+
+class Folds:
+    """Class representing the lines hidden by the folds of a window.
+
+    A fold hides a range of lines, following a visible line (its header).
+    The folds are disjoint, and stored sorted with the number of lines
+    hidden before each of them: the line shown at a given position, and
+    the position of a line among the visible ones, are found by binary
+    search, in O(log n) for n folds. Inserting or deleting lines renumbers
+    the following folds, in O(n).
+
+    Lines inserted inside a fold are hidden, and those inserted right
+    after its header are not. Deleting the header of a fold makes the
+    line above it the header.
+    """
+    def __init__(self):
+        """Initialize a Folds object, without folds."""
+        self._starts = []   # First hidden line of each fold.
+        self._ends = []     # Line following the last hidden line of each fold.
+        self._hidden = [0]  # Number of lines hidden before each fold, then in all of them.
+        self._shown = []    # Number of visible lines before each fold.
+
+    def __len__(self):
+        return len(self._starts)
+
+    @property
+    def ranges(self):
+        """List of (start, end) tuples: the ranges of lines hidden, sorted.
+        Setting it merges the ranges overlapping or following each other,
+        and shows the first line if one of them starts with it.
+        """
+        return list(zip(self._starts, self._ends))
+
+    @ranges.setter
+    def ranges(self, ranges):
+        starts, ends = [], []
+        for start, end in sorted(ranges):
+            start = max(start, 1)
+            if start >= end:
+                continue
+            if ends and start <= ends[-1]:
+                ends[-1] = max(ends[-1], end)
+            else:
+                starts.append(start)
+                ends.append(end)
+        self._starts, self._ends = starts, ends
+        self._index()
+
+    def _index(self):
+        """Count the lines hidden and shown before each fold."""
+        self._hidden = list(accumulate((end - start for start, end in zip(self._starts, self._ends)), initial=0))
+        self._shown = [start - hidden for start, hidden in zip(self._starts, self._hidden)]
+
+    def _fold(self, line):
+        """Get the index of the fold hiding a line, or None."""
+        k = bisect_right(self._starts, line) - 1
+        if k >= 0 and line < self._ends[k]:
+            return k
+        return None
+
+    def fold(self, start, end):
+        """Hide a range of lines. The folds inside it are merged into it.
+
+        Args:
+            start: Index of the first line to hide.
+            end: Index following the last line to hide.
+        """
+        self.ranges = [*self.ranges, (start, end)]
+
+    def unfold(self, line):
+        """Show the lines of the fold hiding a line.
+
+        Args:
+            line: Index of the line.
+
+        Returns:
+            (start, end): Range of the lines shown.
+            None: If the line is not hidden.
+        """
+        k = self._fold(line)
+        if k is None:
+            return None
+        start, end = self._starts.pop(k), self._ends.pop(k)
+        self._index()
+        return start, end
+
+    def hidden(self, line):
+        """Check whether a line is hidden by a fold.
+
+        Args:
+            line: Index of the line.
+
+        Returns:
+            True if the line is hidden, False otherwise.
+        """
+        return bool(self._starts) and self._fold(line) is not None
+
+    def visible(self, line):
+        """Get the line shown in place of a line: itself, or the header of the fold hiding it."""
+        k = self._fold(line)
+        return line if k is None else self._starts[k] - 1
+
+    def next(self, line):
+        """Get the visible line following a line (possibly the number of lines of the buffer)."""
+        line += 1
+        k = self._fold(line)
+        return line if k is None else self._ends[k]
+
+    def previous(self, line):
+        """Get the visible line preceding a line (-1 if there are none)."""
+        line -= 1
+        k = self._fold(line)
+        return line if k is None else self._starts[k] - 1
+
+    def index(self, line):
+        """Get the position of a line among the visible lines.
+
+        Args:
+            line: Index of the line.
+
+        Returns:
+            Number of visible lines preceding the line.
+        """
+        k = bisect_right(self._starts, line)
+        if k and line < self._ends[k-1]:
+            return self._shown[k-1]
+        return line - self._hidden[k]
+
+    def line(self, index):
+        """Get the visible line at a position (see index).
+
+        Args:
+            index: Number of visible lines preceding the line.
+
+        Returns:
+            Index of the line.
+        """
+        return index + self._hidden[bisect_right(self._shown, index)]
+
+    def lines_insert(self, line, count):
+        """Renumber the folds following inserted lines.
+
+        Args:
+            line: Index of the first line inserted.
+            count: Number of lines inserted.
+        """
+        starts, ends = self._starts, self._ends
+        if not starts:
+            return
+        k = bisect_left(starts, line)
+        starts[k:] = [start + count for start in starts[k:]]
+        ends[k:] = [end + count for end in ends[k:]]
+        if k and ends[k-1] > line:  # Inserted inside a fold: hidden.
+            ends[k-1] += count
+            self._hidden[k:] = [hidden + count for hidden in self._hidden[k:]]
+        else:
+            self._shown[k:] = [shown + count for shown in self._shown[k:]]
+
+    def lines_delete(self, line, count):
+        """Renumber the folds following deleted lines, removing the folds deleted.
+
+        Args:
+            line: Index of the first line deleted.
+            count: Number of lines deleted.
+        """
+        if not self._ends or self._ends[-1] <= line:
+            return
+        stop = line + count
+
+        def renumber(position):
+            if position <= line:
+                return position
+            return line if position <= stop else position - count
+
+        self.ranges = [(renumber(start), renumber(end)) for start, end in self.ranges]
+
+    def lines_change(self, changes):
+        """Renumber the folds after ranges of lines have been replaced.
+        The lines replacing hidden lines are hidden.
+
+        Args:
+            changes: List of (line, old_count, new_count) tuples (see Buffer._windows_lines_change).
+        """
+        if not self._starts:
+            return
+        for line, old, new in changes:
+            common = min(old, new)
+            if new > old:
+                self.lines_insert(line + common, new - old)
+            elif old > new:
+                self.lines_delete(line + common, old - new)
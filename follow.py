@@ -0,0 +1,127 @@
+"""Incremental reloading of growing files."""
+
+import codecs
+
+from watch import FileWatcher
+
+
+class Follower:
+    """Class keeping a Buffer in sync with a file that grows (e.g. a log).
+
+    When the file changes, only the bytes appended since the last check
+    are read, and appended to the buffer as new lines in a single batch.
+    Windows whose cursor is on the last line keep following the end of
+    the buffer. If the file is truncated or replaced, it is read again
+    from the beginning.
+
+    Attributes:
+        max_lines: Maximum number of lines kept in the buffer: the oldest
+            ones are discarded, as in a ring buffer. None for no limit.
+    """
+    def __init__(self, buffer, file_name, offset, stat=None, max_lines=None):
+        """Initialize a Follower object.
+
+        Args:
+            buffer: Buffer object to keep in sync.
+            file_name: Path of the file to follow.
+            offset: Number of bytes of the file already in the buffer.
+            stat: os.stat_result of the file when offset bytes were read. (default None: now)
+            max_lines: Maximum number of lines kept in the buffer. (default None: no limit)
+        """
+        self.max_lines = max_lines
+
+        self._buffer = buffer
+        self._file_name = file_name
+        self._offset = offset
+        self._watcher = FileWatcher(file_name, stat)
+        self._inode = self._watcher.stat and self._watcher.stat.st_ino
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._carriage_return = False
+
+    @property
+    def offset(self):
+        """Number of bytes of the file read (read-only)."""
+        return self._offset
+
+    @property
+    def stat(self):
+        """os.stat_result of the file when it was last read, or None if missing (read-only)."""
+        return self._watcher.stat
+
+    def _decode(self, data):
+        """Decode a chunk of the file, translating newlines as in text mode.
+
+        Args:
+            data: Bytes read from the file.
+
+        Returns:
+            Decoded string.
+        """
+        text = self._decoder.decode(data)
+        if self._carriage_return:
+            text = '\r' + text
+        self._carriage_return = text.endswith('\r')  # Could be followed by \n in the next chunk.
+        if self._carriage_return:
+            text = text[:-1]
+        if '\r' in text:
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+        return text
+
+    def poll(self):
+        """Check the file for changes and bring the buffer up to date.
+
+        Returns:
+            Number of lines added to the buffer.
+        """
+        if not self._watcher.check():
+            return 0
+        stat = self._watcher.stat
+        if stat is None:  # Deleted: wait for it to be created again.
+            return 0
+
+        reload = stat.st_ino != self._inode or stat.st_size < self._offset
+        if reload:
+            self._inode = stat.st_ino
+            self._offset = 0
+            self._decoder.reset()
+            self._carriage_return = False
+
+        with open(self._file_name, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read()
+        self._offset += len(data)
+        text = self._decode(data)
+
+        buffer = self._buffer
+        saved = not buffer.modified
+        lines = len(buffer.lines)
+        pinned = [w for w in buffer.windows if hasattr(w, 'cursor_end') and w.cursor[0] == lines-1]
+        if reload:
+            buffer.content = text
+            added = len(buffer.lines)
+        elif text:
+            buffer.text_insert(text, *buffer.end)
+            added = len(buffer.lines) - lines
+        else:
+            return 0
+
+        self._trim()
+        if saved:  # The text appended is the file's: it does not modify the buffer.
+            buffer._saved_version = buffer._version
+        for window in pinned:
+            window.cursor_end()
+        return added
+
+    def _trim(self):
+        """Discard the oldest lines of the buffer exceeding max_lines."""
+        buffer = self._buffer
+        excess = len(buffer.lines) - self.max_lines if self.max_lines else 0
+        if excess > 0:
+            saved = not buffer.modified
+            buffer.text_delete(0, 0, excess, 0)
+            if saved:
+                buffer._saved_version = buffer._version
+
+    def close(self):
+        """Stop following the file."""
+        self._watcher.close()
@@ -0,0 +1,258 @@
+"""Undo and redo of buffer modifications."""
+
+from collections import deque
+from contextlib import contextmanager
+from sys import getsizeof
+
+from lines import CompactLines
+
+
+class History:
+    """Class representing the undo/redo history of a Buffer.
+
+    The history is a listener of the buffer. Every modification is stored
+    as a delta (kind, line, column, text, size): the inserted or deleted
+    text, its position and the memory it uses, from which both the modification and its inverse can be
+    applied. Consecutive single-character insertions or deletions are
+    coalesced into word-sized deltas.
+
+    Deltas are organized in groups, each one undone and redone as a single step.
+    The memory used by the history is bounded: when it exceeds max_memory,
+    the oldest groups are forgotten (the most recent one is always kept).
+
+    Attributes:
+        max_memory: Maximum approximate number of bytes used by the history.
+        coalesce_limit: Maximum number of characters coalesced in a delta.
+    """
+    INSERT, DELETE, RESET = range(3)
+
+    _delta_size = 120  # Approximate size of a delta without its text, in bytes.
+
+    def __init__(self, buffer, max_memory=1 << 26, coalesce_limit=64):
+        """Initialize a History object and link it to the buffer.
+
+        Args:
+            buffer: Buffer object whose modifications are recorded.
+            max_memory: Maximum approximate number of bytes used. (default 64 MiB)
+            coalesce_limit: Maximum number of characters coalesced in a delta. (default 64)
+        """
+        self.max_memory = max_memory
+        self.coalesce_limit = coalesce_limit
+
+        self._buffer = buffer
+        self._undo = deque()
+        self._redo = list()
+        self._memory = 0
+        self._coalesce = False
+        self._group_depth = 0
+        self._group_new = False
+        self._applying = False
+
+        buffer.listener_link(self)
+
+    @property
+    def memory(self):
+        """Approximate number of bytes used by the history (read-only)."""
+        return self._memory
+
+    def can_undo(self):
+        """Return True if there are modifications to undo, False otherwise."""
+        return bool(self._undo)
+
+    def can_redo(self):
+        """Return True if there are modifications to redo, False otherwise."""
+        return bool(self._redo)
+
+    def clear(self):
+        """Forget all the recorded modifications."""
+        self._undo.clear()
+        self._redo.clear()
+        self._memory = 0
+        self._coalesce = False
+
+    @contextmanager
+    def group(self, amend=False):
+        """Context manager grouping all the modifications made inside it
+        in a single undoable step. Can be nested.
+
+        Args:
+            amend: Whether the modifications are added to the last group,
+                instead of a new one. (default False)
+        """
+        if self._group_depth == 0:
+            self._group_new = not (amend and self._undo)
+            self._coalesce = False  # The group's first delta must not merge into the previous group.
+        self._group_depth += 1
+        try:
+            yield
+        finally:
+            self._group_depth -= 1
+            self._coalesce = False
+
+    def _size(self, kind, text):
+        """Return the approximate number of bytes used by a delta.
+
+        Args:
+            kind: Kind of the delta.
+            text: Text of the delta (BlockList, or CompactLines object, whose
+                size includes the lines, for RESET deltas).
+        """
+        if kind == self.RESET and not isinstance(text, CompactLines):
+            return self._delta_size + getsizeof(text) + sum(map(getsizeof, text))
+        return self._delta_size + getsizeof(text)
+
+    def _forget(self, group):
+        """Subtract the memory used by a forgotten group from the total."""
+        self._memory -= sum(delta[4] for delta in group)
+
+    def _text_insert(self, line, column, text):
+        """Record the insertion of text. See Buffer._listeners_insert."""
+        if not self._applying:
+            self._record(self.INSERT, line, column, text)
+
+    def _text_delete(self, line, column, text):
+        """Record the deletion of text. See Buffer._listeners_delete."""
+        if not self._applying:
+            self._record(self.DELETE, line, column, text)
+
+    def _text_reset(self, lines, range=None):
+        """Record the replacement of the whole text. See Buffer._listeners_reset."""
+        if not self._applying:
+            if range is None:
+                self._record(self.RESET, 0, None, lines)
+            else:
+                start, end, count = range
+                self._record(self.RESET, start, count, lines)
+
+    def _record(self, kind, line, column, text):
+        """Add a delta to the history, coalescing it with the previous one if possible.
+
+        Args:
+            kind: Kind of modification (INSERT, DELETE or RESET).
+            line: Index of the line where the modification took place.
+            column: Index of the column where the modification took place (for RESET,
+                number of lines replacing the range of lines starting at line, or None
+                if the whole text was replaced).
+            text: Inserted or deleted text (all the lines replaced for RESET).
+        """
+        for group in self._redo:
+            self._forget(group)
+        self._redo.clear()
+
+        single = kind != self.RESET and len(text) == 1 and text != '\n'
+        if single and self._coalesce and self._coalesce_into(self._undo[-1][-1], kind, line, column, text):
+            return
+        self._coalesce = single and not self._group_depth
+
+        delta = [kind, line, column, text, self._size(kind, text)]
+        if self._group_depth and not self._group_new:
+            self._undo[-1].append(delta)
+        else:
+            self._undo.append([delta])
+            self._group_new = False
+        self._memory += delta[4]
+        self._trim()
+
+    def _coalesce_into(self, last, kind, line, column, char):
+        """Try to merge a single-character delta into the previous delta.
+        Characters are merged until a word boundary (whitespace followed by
+        a non-whitespace character) or the coalesce limit is reached.
+
+        Args:
+            last: Previous delta, modified in place.
+            kind, line, column, char: New single-character modification.
+
+        Returns:
+            True if the delta has been merged, False otherwise.
+        """
+        if last[0] != kind or last[1] != line or len(last[3]) >= self.coalesce_limit:
+            return False
+
+        if kind == self.INSERT and column == last[2] + len(last[3]):
+            boundary, text, column = last[3][-1], last[3] + char, last[2]
+        elif kind == self.DELETE and column == last[2]:      # Deleting forward.
+            boundary, text = last[3][-1], last[3] + char
+        elif kind == self.DELETE and column + 1 == last[2]:  # Deleting backward.
+            boundary, text = last[3][0], char + last[3]
+        else:
+            return False
+        if boundary.isspace() and not char.isspace():
+            return False
+
+        size = self._size(kind, text)
+        self._memory += size - last[4]
+        last[2:] = column, text, size
+        return True
+
+    def _trim(self):
+        """Forget the oldest groups until the memory limit is respected."""
+        while self._memory > self.max_memory and len(self._undo) > 1:
+            self._forget(self._undo.popleft())
+
+    def _apply(self, delta, inverse):
+        """Apply a delta (or its inverse) to the buffer.
+
+        Args:
+            delta: Delta to apply. RESET deltas are updated with the replaced lines.
+            inverse: Whether to apply the inverse of the modification.
+
+        Returns:
+            (line, column): Position where the modification took place.
+        """
+        kind, line, column, text, size = delta
+        if kind == self.RESET:
+            lines = self._buffer.lines
+            if column is None:
+                self._buffer.lines = text
+            else:
+                count = column + len(text) - len(lines)  # Number of lines of text replacing the range.
+                self._buffer._lines_swap(text.copy(), line, line + column, count)
+                delta[2] = count
+            delta[3:] = lines, self._size(kind, lines)
+            self._memory += delta[4] - size
+            return line, 0
+        if (kind == self.INSERT) == inverse:
+            end = self._buffer.text_end(line, column, text)
+            self._buffer.text_delete(line, column, *end)
+            return line, column
+        return self._buffer.text_insert(text, line, column)
+
+    def undo(self):
+        """Undo the most recent group of modifications.
+
+        Returns:
+            (line, column): Position of the undone modification.
+            None: If there is nothing to undo.
+        """
+        if not self._undo:
+            return None
+        group = self._undo.pop()
+        self._applying = True
+        try:
+            for delta in reversed(group):
+                position = self._apply(delta, inverse=True)
+        finally:
+            self._applying = False
+        self._redo.append(group)
+        self._coalesce = False
+        return position
+
+    def redo(self):
+        """Redo the most recently undone group of modifications.
+
+        Returns:
+            (line, column): Position after the redone modification.
+            None: If there is nothing to redo.
+        """
+        if not self._redo:
+            return None
+        group = self._redo.pop()
+        self._applying = True
+        try:
+            for delta in group:
+                position = self._apply(delta, inverse=False)
+        finally:
+            self._applying = False
+        self._undo.append(group)
+        self._coalesce = False
+        return position
@@ -0,0 +1,262 @@
+"""Crash-recovery journal of the modifications of a buffer."""
+
+import os
+import struct
+
+from lines import CompactLines
+
+
+class Journal:
+    """Class representing the append-only journal of the modifications of a Buffer.
+
+    The journal is a binary file stored next to the buffer's file. It starts
+    with a header identifying the version of the file it applies to, followed
+    by one compact record per modification. Records are accumulated in memory
+    and written to the file in large blocks; sync() makes them durable and is
+    meant to be called when the editor is idle.
+
+    Replaying the journal over the file it applies to recovers the unsaved
+    modifications, in time proportional to their number.
+
+    If the journal cannot be written (e.g. the directory is read-only, or
+    the disk is full), it stops recording and the buffer is told the error
+    (see Buffer.file_error): the editing goes on without crash recovery.
+
+    Attributes:
+        flush_size: Number of bytes after which the records are written
+            to the file without waiting for sync().
+    """
+    MAGIC = b'YGJ2'
+    INSERT, DELETE, CONTENT, LINES = range(4)
+
+    _header = struct.Struct('<4sQQ')   # Magic, size and modification time of the file.
+    _record = struct.Struct('<BII')    # Kind, line, column (first and following replaced lines for LINES).
+    _length = struct.Struct('<Q')      # Length of the text (INSERT, CONTENT, LINES) or characters deleted (DELETE).
+
+    flush_size = 1 << 16
+
+    def __init__(self, buffer, file_name):
+        """Initialize a Journal object and link it to the buffer.
+
+        Args:
+            buffer: Buffer object whose modifications are recorded.
+            file_name: Path of the file the buffer's text was read from.
+        """
+        self._buffer = buffer
+        self._file_name = file_name
+        self._path = self.path(file_name)
+        self._file = None
+        self._pending = bytearray()
+        self._replaying = False
+        self._failed = False
+        self._base = self._identity()
+
+        buffer.listener_link(self)
+
+    @staticmethod
+    def path(file_name):
+        """Get the path of the journal of a file.
+
+        Args:
+            file_name: Path of the file.
+
+        Returns:
+            Path of the hidden journal file in the same directory.
+        """
+        directory, name = os.path.split(os.path.abspath(file_name))
+        return os.path.join(directory, '.{}.yj'.format(name))
+
+    def _identity(self):
+        """Return a tuple identifying the current version of the file on disk."""
+        try:
+            stat = os.stat(self._file_name)
+            return stat.st_size, stat.st_mtime_ns
+        except FileNotFoundError:
+            return 0, 0
+
+    def _text_insert(self, line, column, text):
+        """Record the insertion of text. See Buffer._listeners_insert."""
+        if not self._replaying:
+            data = text.encode()
+            self._append(self._record.pack(self.INSERT, line, column) + self._length.pack(len(data)) + data)
+
+    def _text_delete(self, line, column, text):
+        """Record the deletion of text. See Buffer._listeners_delete."""
+        if not self._replaying:
+            self._append(self._record.pack(self.DELETE, line, column) + self._length.pack(len(text)))
+
+    def _text_reset(self, lines, range=None):
+        """Record the replacement of the whole text, or only of the lines of
+        the range replaced, each followed by a newline. See Buffer._listeners_reset.
+        """
+        if not self._replaying:
+            lines = self._buffer.lines
+            if range is None:
+                record = self._record.pack(self.CONTENT, 0, 0)
+                data = lines.to_bytes() if isinstance(lines, CompactLines) else self._buffer.content.encode()
+            else:
+                start, end, count = range
+                record = self._record.pack(self.LINES, start, end)
+                if isinstance(lines, CompactLines):
+                    data = lines.to_bytes(start, start + count) + b'\n' if count else b''
+                else:
+                    data = ''.join([line + '\n' for line in lines[start: start + count]]).encode()
+            self._append(record + self._length.pack(len(data)))
+            self._append(data)
+
+    def _append(self, record):
+        """Append a record, writing the pending ones if they are too many.
+
+        Args:
+            record: Bytes of the record.
+        """
+        if self._failed:
+            return
+        self._pending += record
+        if len(self._pending) >= self.flush_size:
+            self._write()
+
+    def _write(self):
+        """Write the pending records to the journal file.
+
+        Returns:
+            True if the records were written, False if the journal failed (see _fail).
+        """
+        try:
+            if self._file is None:
+                self._file = open(self._path, 'wb')
+                self._file.write(self._header.pack(self.MAGIC, *self._base))
+            self._file.write(self._pending)
+        except OSError as error:
+            self._fail(error)
+            return False
+        self._pending.clear()
+        return True
+
+    def sync(self):
+        """Write the pending records and make them durable."""
+        if self._pending and self._write():
+            try:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            except OSError as error:
+                self._fail(error)
+
+    def _fail(self, error):
+        """Stop recording after an error writing the journal, and report it to the buffer.
+
+        Args:
+            error: OSError raised.
+        """
+        self._failed = True
+        self._pending.clear()
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+        self._buffer.listener_unlink(self)
+        self._buffer._journal_failed(self, error)
+
+    def reset(self):
+        """Discard the journal, as the buffer has been saved to its file."""
+        self._pending.clear()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        try:
+            os.remove(self._path)
+        except OSError:
+            pass
+        self._base = self._identity()
+
+    def close(self):
+        """Write the pending records, close the journal and unlink it from the buffer."""
+        self.sync()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._buffer.listener_unlink(self)
+
+    def set_aside(self):
+        """Keep the journal file (if any) aside with a '~' suffix, without replaying it."""
+        try:
+            os.replace(self._path, self._path + '~')
+        except OSError:
+            pass
+
+    def recover(self):
+        """Replay the journal file (if any) over the buffer.
+        A journal referring to a different version of the file is not
+        replayed, and is kept aside with a '~' suffix.
+
+        Returns:
+            Number of modifications recovered.
+        """
+        try:
+            with open(self._path, 'rb') as journal:
+                data = journal.read()
+        except OSError:
+            return 0
+
+        header = self._header.unpack_from(data) if len(data) >= self._header.size else None
+        if header != (self.MAGIC, *self._base):
+            self.set_aside()
+            return 0
+
+        offset = self._header.size
+        records = 0
+        self._replaying = True
+        try:
+            # A record truncated by a crash is ignored.
+            while offset + self._record.size + self._length.size <= len(data):
+                kind, line, column = self._record.unpack_from(data, offset)
+                length, = self._length.unpack_from(data, offset + self._record.size)
+                start = offset + self._record.size + self._length.size
+                end = start if (kind == self.DELETE) else start + length
+                if end > len(data):
+                    break
+                if kind == self.DELETE:
+                    self._replay_delete(line, column, length)
+                elif kind == self.INSERT:
+                    self._replay_insert(line, column, data[start: end].decode())
+                elif kind == self.LINES:
+                    self._buffer.lines_replace(line, column, data[start: end].decode().split('\n')[:-1])
+                else:
+                    self._buffer.content = data[start: end].decode()
+                offset = end
+                records += 1
+        finally:
+            self._replaying = False
+
+        # Keep appending to the recovered journal.
+        if records:
+            self._pending += data[self._header.size: offset]
+            self._write()
+        return records
+
+    def _replay_insert(self, line, column, text):
+        """Insert text in the buffer.
+
+        Args:
+            line: Index of the line where to insert the text.
+            column: Index of the column where to insert the text.
+            text: Text to insert.
+        """
+        self._buffer.text_insert(text, line, column)
+
+    def _replay_delete(self, line, column, count):
+        """Delete characters from the buffer.
+
+        Args:
+            line: Index of the line where to delete the characters.
+            column: Index of the column where to delete the characters.
+            count: Number of characters to delete, newlines included.
+        """
+        lines = self._buffer.lines
+        end_line, end_column = line, column + count
+        while end_column > len(lines[end_line]):
+            end_column -= len(lines[end_line]) + 1
+            end_line += 1
+        self._buffer.text_delete(line, column, end_line, end_column)
@@ -10,14 +10,22 @@ class Key:
 
     Attributes:
         keys: Dictionary that maps key names to codes.
+        key: Integer code of the key.
+        ctrl: True if the Ctrl modifier is pressed.
+        meta: True if the Meta modifier is pressed.
     """
 
-    keys = {k[4:]: eval('curses.'+k) for k in dir(curses) if k[:4] == 'KEY_'}
+    keys = {k[4:]: v for (k, v) in vars(curses).items() if k[:4] == 'KEY_'}
     keys['DEL'] = ascii.DEL
     keys['TAB'] = ascii.TAB
 
-    def __init__(self, key, ctrl=None, meta=None):
-        """Initialize a Key object.
+    _interned = dict()
+
+    def __new__(cls, key, ctrl=None, meta=None):
+        """Get the Key object representing a keypress.
+
+        Key objects are interned: equal keypresses always return the same object,
+        so keys are compared and hashed by identity.
 
         Args:
             key: The integer ASCII value of the character corresponding to the keypress.
@@ -29,16 +37,26 @@ class Key:
         """
         # key is a string:
         try:
-            self.ctrl = 'C-' in key
-            self.meta = 'M-' in key
+            ctrl = 'C-' in key
+            meta = 'M-' in key
             key = key.upper() if ('S-' in key) else key
             key = key.split('-')[-1]
-            self.key = Key.keys[key] if (key in Key.keys) else ord(key)
+            key = Key.keys[key] if (key in Key.keys) else ord(key)
         # key is an integer:
         except TypeError:
+            ctrl = bool(ctrl)
+            meta = bool(meta)
+
+        code = key << 2 | ctrl << 1 | meta
+        try:
+            return cls._interned[code]
+        except KeyError:
+            self = super().__new__(cls)
             self.key = key
             self.ctrl = ctrl
             self.meta = meta
+            cls._interned[code] = self
+            return self
 
     def is_printable(self):
         """Return True if the key corresponds to a printable character, False otherwise."""
@@ -48,10 +66,5 @@ class Key:
         """Return the character corresponding to the pressed key."""
         return chr(self.key)
 
-    def __eq__(self, o):
-        """Check whether two keys are equal."""
-        return self.meta == o.meta and self.ctrl == o.ctrl and self.key == o.key
-
-    def __hash__(self):
-        """Return a hash value uniquely identifying a Key object."""
-        return self.key << 2 | self.ctrl << 1 | self.meta
+    def __repr__(self):
+        return 'Key({!r}, {}, {})'.format(self.key, self.ctrl, self.meta)
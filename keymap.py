@@ -0,0 +1,210 @@
+"""Key bindings organized as prefix tries of key sequences."""
+
+from time import monotonic
+from weakref import WeakSet
+
+from key import Key
+
+
+class Keymap:
+    """Class representing a set of key bindings.
+
+    Bindings map sequences of one or more keys (e.g. 'C-x C-s') to commands.
+    They are stored in a prefix trie whose nodes are dictionaries keyed by
+    Key objects: inner values are dictionaries (prefixes), leaves are commands.
+
+    A Keymap can inherit the bindings of a parent Keymap, its own bindings
+    taking priority. Own and inherited bindings are merged into a single trie
+    which is rebuilt only when some binding changes, so dispatching a keypress
+    costs one dictionary lookup regardless of the number of bindings.
+
+    Attributes:
+        timeout: Seconds after which a pending prefix is discarded.
+    """
+    def __init__(self, bindings=None, parent=None, timeout=1.0):
+        """Initialize a Keymap object.
+
+        Args:
+            bindings: Dictionary mapping key sequences to commands. (default None)
+            parent: Keymap object whose bindings are inherited. (default None)
+            timeout: Seconds after which a pending prefix is discarded. (default 1.0)
+        """
+        self.timeout = timeout
+        self._trie = {}
+        self._merged = None
+        self._children = WeakSet()
+        self._pending = None
+        self._deadline = 0
+
+        self._parent = parent
+        if parent is not None:
+            parent._children.add(self)
+
+        for keys, command in (bindings or {}).items():
+            self.bind(keys, command)
+
+    @staticmethod
+    def _sequence(keys):
+        """Convert a key sequence to a tuple of Key objects.
+
+        Args:
+            keys: Key object, string of space-separated keys (e.g. 'C-x C-s'),
+                or iterable of Key objects and key strings.
+
+        Returns:
+            Tuple of Key objects.
+        """
+        if isinstance(keys, Key):
+            return (keys,)
+        if isinstance(keys, str):
+            keys = keys.split()
+        sequence = tuple(k if isinstance(k, Key) else Key(k) for k in keys)
+        if not sequence:
+            raise ValueError('empty key sequence')
+        return sequence
+
+    @property
+    def parent(self):
+        """Keymap object whose bindings are inherited (read-only)."""
+        return self._parent
+
+    @property
+    def pending(self):
+        """True if a prefix has been typed and the sequence is incomplete (read-only)."""
+        return self._pending is not None and monotonic() < self._deadline
+
+    def bind(self, keys, command):
+        """Bind a key sequence to a command.
+        Replaces any binding for the sequence or for one of its prefixes.
+
+        Args:
+            keys: Key sequence (see Keymap._sequence for the accepted formats).
+            command: Function to call, with no arguments.
+        """
+        *prefix, last = self._sequence(keys)
+        node = self._trie
+        for key in prefix:
+            child = node.get(key)
+            if not isinstance(child, dict):
+                child = node[key] = {}
+            node = child
+        node[last] = command
+        self._invalidate()
+
+    def unbind(self, keys):
+        """Remove the binding of a key sequence, along with the prefixes left empty.
+
+        Args:
+            keys: Key sequence (see Keymap._sequence for the accepted formats).
+
+        Raises:
+            KeyError: If the sequence is not bound in this keymap.
+        """
+        *prefix, last = self._sequence(keys)
+        path = [self._trie]
+        for key in prefix:
+            node = path[-1][key]
+            if not isinstance(node, dict):  # The sequence extends a bound one.
+                raise KeyError(keys)
+            path.append(node)
+        del path[-1][last]
+        for node, key in zip(reversed(path[:-1]), reversed(prefix)):
+            if node[key]:
+                break
+            del node[key]
+        self._invalidate()
+
+    def lookup(self, keys):
+        """Get the command bound to a key sequence, including inherited bindings.
+
+        Args:
+            keys: Key sequence (see Keymap._sequence for the accepted formats).
+
+        Returns:
+            The bound command, or a dictionary if the sequence is a prefix.
+
+        Raises:
+            KeyError: If the sequence is not bound.
+        """
+        node = self._root()
+        for key in self._sequence(keys):
+            if not isinstance(node, dict):  # The sequence extends a bound one.
+                raise KeyError(keys)
+            node = node[key]
+        return node
+
+    def __getitem__(self, keys):
+        return self.lookup(keys)
+
+    def __setitem__(self, keys, command):
+        self.bind(keys, command)
+
+    def __delitem__(self, keys):
+        self.unbind(keys)
+
+    def __contains__(self, keys):
+        try:
+            self.lookup(keys)
+            return True
+        except KeyError:
+            return False
+
+    def _invalidate(self):
+        """Discard the merged trie of this keymap and of the ones inheriting from it."""
+        self._merged = None
+        self._pending = None
+        for child in self._children:
+            child._invalidate()
+
+    def _root(self):
+        """Return the root of the trie merging own and inherited bindings."""
+        if self._merged is None:
+            inherited = self._parent._root() if self._parent else {}
+            self._merged = self._merge(self._trie, inherited)
+        return self._merged
+
+    @classmethod
+    def _merge(cls, own, inherited):
+        """Merge two trie nodes, giving priority to own.
+
+        Args:
+            own: Trie node containing the own bindings.
+            inherited: Trie node containing the inherited bindings.
+
+        Returns:
+            New trie node containing both.
+        """
+        merged = dict(inherited)
+        for key, target in own.items():
+            if isinstance(target, dict):
+                base = merged.get(key)
+                merged[key] = cls._merge(target, base if isinstance(base, dict) else {})
+            else:
+                merged[key] = target
+        return merged
+
+    def key_handle(self, key):
+        """Try to handle the given keypress.
+        If the key completes a sequence, run the bound command. If it extends
+        a prefix, wait for the next key. Keys breaking a pending sequence
+        are discarded.
+
+        Args:
+            key: Key object representing the keys pressed.
+
+        Returns:
+            True if handled, False otherwise.
+        """
+        pending = self._pending is not None and monotonic() < self._deadline
+        node = self._pending if pending else (self._merged or self._root())
+        self._pending = None
+
+        target = node.get(key)
+        if target is None:
+            return pending
+        if type(target) is dict:
+            self._pending = target
+            self._deadline = monotonic() + self.timeout
+        else:
+            target()
+        return True
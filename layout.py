@@ -0,0 +1,105 @@
+"""Arrangement of the text windows on the screen."""
+
+
+class Layout:
+    """Class representing a tree of split windows.
+
+    A Layout is either a leaf, holding a single window, or a split,
+    whose children share its area: stacked one above the other, or
+    side by side (separated by a blank column).
+
+    Attributes:
+        window: Window shown by a leaf (None for splits).
+        children: List of child Layout objects of a split.
+        side_by_side: Whether the children of a split are arranged horizontally.
+    """
+    def __init__(self, window=None, parent=None):
+        """Initialize a Layout object.
+
+        Args:
+            window: Window shown by the layout. (default None: empty split)
+            parent: Layout containing this one. (default None: root)
+        """
+        self.window = window
+        self.children = list()
+        self.side_by_side = False
+        self._parent = parent
+
+    def windows(self):
+        """List the windows in the layout, from top-left to bottom-right."""
+        if self.window:
+            return [self.window]
+        return [window for child in self.children for window in child.windows()]
+
+    def find(self, window):
+        """Return the leaf showing a window, or None if it is not in the layout."""
+        if self.window is window:
+            return self
+        for child in self.children:
+            leaf = child.find(window)
+            if leaf:
+                return leaf
+        return None
+
+    def split(self, window, new_window, side_by_side=False):
+        """Split the area of a window, placing a new window after it.
+        The layout must be arranged again afterwards.
+
+        Args:
+            window: Window in the layout to be split.
+            new_window: Window to be added.
+            side_by_side: Whether to split horizontally. (default False: one above the other)
+        """
+        leaf = self.find(window)
+        parent = leaf._parent
+        if parent and parent.side_by_side == side_by_side:
+            parent.children.insert(parent.children.index(leaf) + 1, Layout(new_window, parent))
+        else:
+            # Turn the leaf into a split of the old and the new window.
+            leaf.children = [Layout(window, leaf), Layout(new_window, leaf)]
+            leaf.side_by_side = side_by_side
+            leaf.window = None
+
+    def remove(self, window):
+        """Remove a window, giving its area to its siblings.
+        The layout must be arranged again afterwards.
+
+        Args:
+            window: Window in the layout to be removed (not the last one).
+        """
+        leaf = self.find(window)
+        parent = leaf._parent
+        parent.children.remove(leaf)
+        if len(parent.children) == 1:
+            # A split with a single child is replaced by the child.
+            child = parent.children[0]
+            parent.window, parent.children, parent.side_by_side = child.window, child.children, child.side_by_side
+            for grandchild in parent.children:
+                grandchild._parent = parent
+
+    def arrange(self, line, column, n_lines, n_columns):
+        """Assign an area of the screen to the layout, resizing its windows.
+        Space is divided as equally as possible between the children.
+
+        Args:
+            line: Index of the vertical position of the area.
+            column: Index of the horizontal position of the area.
+            n_lines: Height of the area.
+            n_columns: Width of the area.
+        """
+        if self.window:
+            self.window.resize(line, column, max(n_lines, 1), max(n_columns, 1))
+            return
+
+        n = len(self.children)
+        if self.side_by_side:
+            space = n_columns - (n-1)  # One blank column between windows.
+            for i, child in enumerate(self.children):
+                size = space // n + (i < space % n)
+                child.arrange(line, column, n_lines, size)
+                column += size + 1
+        else:
+            for i, child in enumerate(self.children):
+                size = n_lines // n + (i < n_lines % n)
+                child.arrange(line, column, size, n_columns)
+                line += size
@@ -0,0 +1,176 @@
+"""Persistent cache of the line indexes of large files."""
+
+import os
+import struct
+from array import array
+from hashlib import blake2b
+
+
+class LineIndexCache:
+    """Class representing a directory of sidecar files caching line indexes.
+
+    Finding the lines of a multi-gigabyte file is much slower than reading
+    it. The index of a file stored compactly (see CompactLines) is saved
+    in the cache, keyed by the file's path, and reused when the file is
+    reopened unchanged: the file is still loaded progressively (see Loader),
+    but with no newline scan or UTF-8 validation.
+
+    A cached index is valid if the file's size and modification time are
+    the same, and so is a hash of samples of its content. An index found
+    not to match the content while loading it is removed. The cache is
+    bounded in size: the least recently used indexes are removed first.
+
+    Attributes:
+        directory: Path of the cache directory.
+        max_size: Maximum total size of the cached indexes, in bytes.
+        min_size: Minimum size of the files whose index is cached, in bytes.
+    """
+    MAGIC = b'YGL2'
+    LF, TRANSLATED = range(2)  # Line endings: \n only, or \r\n and \r translated to \n.
+
+    # Magic, size and modification time of the file, sample hash, line endings, number of lines.
+    _header = struct.Struct('<4sQQ16sBQ')
+    _sample_size = 1 << 16
+
+    def __init__(self, directory=None, max_size=1 << 30, min_size=1 << 26):
+        """Initialize a LineIndexCache object.
+
+        Args:
+            directory: Path of the cache directory. (default None: yugen/lines
+                in $XDG_CACHE_HOME or ~/.cache)
+            max_size: Maximum total size of the cached indexes, in bytes. (default 1 GiB)
+            min_size: Minimum size of the files whose index is cached, in bytes. (default 64 MiB)
+        """
+        if directory is None:
+            cache = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+            directory = os.path.join(cache, 'yugen', 'lines')
+        self.directory = directory
+        self.max_size = max_size
+        self.min_size = min_size
+
+    def _path(self, file_name):
+        """Return the path of the cached index of a file."""
+        key = blake2b(os.fsencode(os.path.realpath(file_name)), digest_size=16).hexdigest()
+        return os.path.join(self.directory, key + '.idx')
+
+    def _sample_hash(self, f, size):
+        """Hash samples of the beginning, the middle and the end of a file.
+
+        Args:
+            f: File object open in binary mode.
+            size: Size of the file.
+
+        Returns:
+            bytes object of the digest.
+        """
+        digest = blake2b(digest_size=16)
+        for offset in {0, max(size // 2 - self._sample_size // 2, 0), max(size - self._sample_size, 0)}:
+            f.seek(offset)
+            digest.update(f.read(self._sample_size))
+        return digest.digest()
+
+    def load(self, file_name, stat):
+        """Read the cached index of a file.
+
+        Args:
+            file_name: Path of the file.
+            stat: os.stat_result of the file.
+
+        Returns:
+            (starts, lengths, endings): Offsets and lengths of the lines in
+                the text of the file (with newlines translated if endings is
+                TRANSLATED), as in CompactLines.index, and the line endings.
+            None: If the index of this version of the file is not cached.
+        """
+        path = self._path(file_name)
+        try:
+            cache = open(path, 'rb')
+        except OSError:
+            return None
+
+        with cache, open(file_name, 'rb') as f:
+            header = cache.read(self._header.size)
+            if len(header) < self._header.size:
+                return None
+            magic, size, mtime, sample, endings, n_lines = self._header.unpack(header)
+            if (magic, size, mtime) != (self.MAGIC, stat.st_size, stat.st_mtime_ns):
+                return None
+            if sample != self._sample_hash(f, size):
+                return None
+            starts, lengths = array('Q'), array('I')
+            try:
+                starts.fromfile(cache, n_lines)
+                lengths.fromfile(cache, n_lines)
+            except EOFError:
+                return None
+
+        try:
+            os.utime(path)  # Most recently used.
+        except OSError:
+            pass
+        return starts, lengths, endings
+
+    def invalidate(self, file_name):
+        """Remove the cached index of a file, found out of date.
+        Errors are ignored, the cache being optional.
+
+        Args:
+            file_name: Path of the file.
+        """
+        try:
+            os.remove(self._path(file_name))
+        except OSError:
+            pass
+
+    def store(self, file_name, stat, lines, endings):
+        """Save the index of a file in the cache, then remove the least
+        recently used indexes exceeding max_size. Files smaller than
+        min_size are not cached.
+
+        Args:
+            file_name: Path of the file.
+            stat: os.stat_result of the file when it was read.
+            lines: CompactLines object holding the text of the file as read
+                (with newlines translated), unmodified.
+            endings: LF or TRANSLATED.
+
+        Returns:
+            Whether the index was saved. Errors are ignored, the cache being optional.
+        """
+        if stat.st_size < self.min_size:
+            return False
+        try:
+            with open(file_name, 'rb') as f:
+                if os.fstat(f.fileno()).st_mtime_ns != stat.st_mtime_ns:
+                    return False  # Changed since it was read.
+                sample = self._sample_hash(f, stat.st_size)
+            self._write(self._path(file_name), stat, sample, lines, endings)
+            self.cleanup()
+        except OSError:
+            return False
+        return True
+
+    def _write(self, path, stat, sample, lines, endings):
+        """Write an index file atomically (see store)."""
+        _, starts, lengths = lines.index
+        os.makedirs(self.directory, exist_ok=True)
+        with open(path + '.tmp', 'wb') as cache:
+            cache.write(self._header.pack(self.MAGIC, stat.st_size, stat.st_mtime_ns, sample,
+                                          endings, len(starts)))
+            starts.tofile(cache)
+            lengths.tofile(cache)
+        os.replace(path + '.tmp', path)
+
+    def cleanup(self):
+        """Remove the least recently used indexes until the cache fits in max_size."""
+        try:
+            entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith('.idx')]
+        except FileNotFoundError:
+            return
+        entries = [(entry.stat().st_mtime_ns, entry.stat().st_size, entry.path) for entry in entries]
+        total = sum(size for (_, size, _) in entries)
+        for (_, size, path) in sorted(entries):
+            if total <= self.max_size:
+                break
+            os.remove(path)
+            total -= size
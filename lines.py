@@ -0,0 +1,702 @@
+"""Storage of the lines of buffers, and of values computed from them."""
+
+import codecs
+from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_right
+from collections.abc import MutableSequence
+from itertools import accumulate, chain, islice
+from operator import eq
+from sys import getsizeof
+
+
+def text_split(data, compact=False):
+    """Split text read from a file into lines, translating newlines as in text mode.
+
+    Args:
+        data: UTF-8 bytes.
+        compact: Whether to keep the lines encoded. (default False)
+
+    Returns:
+        List of strings, or bytes of the lines separated by b'\\n' if compact is set.
+
+    Raises:
+        UnicodeDecodeError: If the bytes are not valid UTF-8.
+    """
+    if b'\r' in data:
+        data = data.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+    if not compact:
+        return data.decode().split('\n')
+    if not data.isascii():  # Validate as data.decode() would, without building the string.
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        size = 1 << 22
+        for i in range(0, len(data), size):
+            decoder.decode(data[i: i + size])
+        decoder.decode(b'', final=True)
+    return data
+
+
+class BlockSequence(MutableSequence):
+    """Base class of sequences stored in blocks shared by their copies.
+
+    The items are kept in blocks of about block_size items. A block is a
+    tuple of columns (lists or arrays) holding one value of every item,
+    and it is never modified once built: a modification builds new blocks
+    for the items around the ones it changes. Copying a sequence thus
+    only copies its list of blocks, in O(n / block_size) for n items, and
+    modifying the copy or the original costs O(block_size) per block
+    changed, plus O(n / block_size) if the number of items changes.
+
+    Subclasses implement _columns.
+    """
+    block_size = 4096
+
+    def __init__(self):
+        """Initialize a BlockSequence object, with no items."""
+        self._blocks = []  # Tuples of columns.
+        self._firsts = []  # Index of the first item of each block.
+        self._length = 0
+
+    @abstractmethod
+    def _columns(self):
+        """Return a tuple of empty columns, holding the values of no item."""
+        return ()
+
+    def __len__(self):
+        return self._length
+
+    def _locate(self, index):
+        """Find the block of an item, or the end of the last block.
+
+        Args:
+            index: Index of the item, between 0 and len(self).
+
+        Returns:
+            (k, offset): Index of the block, and of the item in the block.
+        """
+        k = bisect_right(self._firsts, index) - 1
+        return k, index - self._firsts[k]
+
+    def _find(self, index):
+        """Find the block of an item.
+
+        Args:
+            index: Index of the item (negative indices count from the end).
+
+        Returns:
+            (block, offset): Block of the item, and index of the item in it.
+
+        Raises:
+            IndexError: If there is no such item.
+        """
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('index out of range')
+        k, offset = self._locate(index)
+        return self._blocks[k], offset
+
+    def _slices(self, start, stop):
+        """Iterate over the blocks holding a range of items.
+
+        Args:
+            start: Index of the first item.
+            stop: Index following the last item.
+
+        Returns:
+            Iterator of (block, i, j) tuples: the items from i to j of each block.
+        """
+        if start >= stop:
+            return
+        k, i = self._locate(start)
+        while start < stop:
+            block = self._blocks[k]
+            j = min(len(block[0]), i + stop - start)
+            yield block, i, j
+            start += j - i
+            k, i = k + 1, 0
+
+    def _column(self, column, start, stop):
+        """Get the values of a range of items in a column.
+
+        Args:
+            column: Index of the column.
+            start: Index of the first item.
+            stop: Index following the last item.
+
+        Returns:
+            Column (of the type of the blocks' ones) holding the values.
+        """
+        values = self._columns()[column]
+        for block, i, j in self._slices(start, stop):
+            values += block[column][i: j]
+        return values
+
+    def _splice(self, start, stop, columns):
+        """Replace a range of items with other items.
+
+        Args:
+            start: Index of the first item to replace.
+            stop: Index following the last item to replace (at least start).
+            columns: Tuple of columns (of the type of the blocks' ones) holding
+                the values of the new items, owned by the sequence afterwards.
+        """
+        size = self.block_size
+        blocks, firsts = self._blocks, self._firsts
+        if blocks:
+            k, i = self._locate(start)
+            end, j = self._locate(stop - 1) if stop > start else (k, i - 1)
+            new = tuple(first[:i] + values + last[j + 1:]
+                        for first, values, last in zip(blocks[k], columns, blocks[end]))
+            if len(new[0]) < size // 2 and end + 1 < len(blocks):  # Merge into the next block.
+                end += 1
+                new = tuple(values + following for values, following in zip(new, blocks[end]))
+            first = firsts[k]
+        else:
+            k, end, new, first = 0, -1, columns, 0
+        n = len(new[0])
+        if n > 2 * size:
+            pieces = [tuple(values[p: p + size] for values in new) for p in range(0, n, size)]
+        else:
+            pieces = [new] if n else []
+        shift = len(columns[0]) - (stop - start)
+        following = firsts[end + 1:]
+        if shift:
+            following = [f + shift for f in following]
+        firsts[k:] = list(accumulate((len(piece[0]) for piece in pieces[:-1]), initial=first))[:len(pieces)] + following
+        blocks[k: end + 1] = pieces
+        self._length += shift
+
+    def _splice_runs(self, runs):
+        """Replace several ranges of items with other items, rebuilding the
+        blocks in a single pass: faster than _splice for each range, if they
+        are more than about n / block_size.
+
+        Args:
+            runs: List of (start, stop, columns) tuples (see _splice), sorted
+                and not overlapping.
+        """
+        result = self._columns()
+        position = 0
+        for start, stop, columns in runs:
+            for c, values in enumerate(result):
+                values += self._column(c, position, start)
+                values += columns[c]
+            position = stop
+        for c, values in enumerate(result):
+            values += self._column(c, position, self._length)
+        self._blocks, self._firsts, self._length = [], [], 0
+        self._splice(0, 0, result)
+
+    def _copy_blocks(self, other):
+        """Make another sequence hold the same items, sharing the blocks."""
+        other._blocks = self._blocks.copy()
+        other._firsts = self._firsts.copy()
+        other._length = self._length
+
+    def __sizeof__(self):
+        return (object.__sizeof__(self) + getsizeof(self._blocks) + getsizeof(self._firsts)
+                + sum(getsizeof(values) for block in self._blocks for values in block))
+
+
+class BlockList(BlockSequence):
+    """Class representing a list of strings, stored in blocks shared by its
+    copies (see BlockSequence): copying it costs O(n / block_size) instead of
+    O(n), and modifying it costs O(block_size) per block changed instead of
+    moving the strings following the ones changed.
+    """
+    def __init__(self, lines=()):
+        """Initialize a BlockList object.
+
+        Args:
+            lines: Iterable of strings. (default (): no lines)
+        """
+        super().__init__()
+        self.extend(lines)
+
+    def _columns(self):
+        """Return a tuple of empty columns. Overrides BlockSequence._columns."""
+        return [],
+
+    def __getitem__(self, index):
+        if type(index) is int and 0 <= index < self._length:  # Fast path for the common case.
+            firsts = self._firsts
+            k = bisect_right(firsts, index) - 1
+            return self._blocks[k][0][index - firsts[k]]
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._length)
+            if step != 1:
+                return list(self)[index]
+            return self._column(0, start, stop)
+        block, i = self._find(index)
+        return block[0][i]
+
+    def __iter__(self):
+        return chain.from_iterable(block[0] for block in self._blocks)
+
+    def __reversed__(self):
+        return chain.from_iterable(reversed(block[0]) for block in reversed(self._blocks))
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._length)
+            if step != 1:
+                raise ValueError('extended slices are not supported')
+            self._splice(start, max(start, stop), (list(value),))
+        else:
+            block, i = self._find(index)
+            index = self._length + index if index < 0 else index
+            self._splice(index, index + 1, ([value],))
+
+    def __delitem__(self, index):
+        self[index if isinstance(index, slice) else slice(index, (index + 1) or None)] = ()
+
+    def insert(self, index, value):
+        self[index: index] = (value,)
+
+    def extend(self, lines):
+        self._splice(self._length, self._length, (list(lines),))
+
+    def replace_ranges(self, runs):
+        """Replace several ranges of lines with other lines, in a single pass
+        over the blocks (see BlockSequence._splice_runs).
+
+        Args:
+            runs: List of (start, end, lines) tuples, sorted and not overlapping:
+                the lines from start to end are replaced with lines.
+        """
+        self._splice_runs([(start, end, (list(lines),)) for start, end, lines in runs])
+
+    def copy(self):
+        """Return a shallow copy, sharing the blocks."""
+        lines = BlockList()
+        self._copy_blocks(lines)
+        return lines
+
+    def __eq__(self, other):
+        if isinstance(other, (list, BlockList)):
+            return len(self) == len(other) and all(map(eq, self, other))
+        return NotImplemented
+
+    def __repr__(self):
+        return 'BlockList({!r})'.format(list(self))
+
+
+class CompactLines(BlockSequence):
+    """Class representing a list of lines stored as UTF-8 bytes.
+
+    A list of strings costs about 60 bytes per line before any content.
+    CompactLines keeps the encoded lines in a single bytearray, indexed by
+    the offsets and the lengths of the lines, kept in blocks of arrays
+    (see BlockSequence): about 12 bytes per line. Lines are decoded only
+    when accessed, so indexing stays O(log(n / block_size)).
+
+    The bytearray is append-only: modified lines are encoded at its end,
+    and the space of the replaced ones is reclaimed by compacting it when
+    it exceeds the space in use. Copies share the bytearray (compaction
+    creates a new one) and the blocks of the index, so copying costs
+    O(n / block_size).
+    """
+    _chunk_size = 1 << 24  # Bytes split at a time when indexing text.
+    _compact_min = 1 << 20  # Unused bytes tolerated regardless of the size.
+
+    def __init__(self, lines=()):
+        """Initialize a CompactLines object.
+
+        Args:
+            lines: Iterable of strings (without newlines). (default (): no lines)
+        """
+        super().__init__()
+        self._data = bytearray()
+        self._garbage = 0
+        lines = list(lines)
+        if lines:
+            self.extend_bytes('\n'.join(lines).encode())
+
+    def _columns(self):
+        """Return a tuple of empty columns: offsets and lengths of the lines.
+        Overrides BlockSequence._columns.
+        """
+        return array('Q'), array('I')
+
+    @classmethod
+    def from_bytes(cls, data, terminated=False):
+        """Build a CompactLines object from UTF-8 text, without decoding it.
+
+        Args:
+            data: Bytes-like object containing lines separated by b'\\n'.
+            terminated: Whether data ends with a newline (see extend_bytes). (default False)
+
+        Returns:
+            CompactLines object.
+        """
+        lines = cls()
+        lines.extend_bytes(data, terminated)
+        return lines
+
+    @classmethod
+    def from_index(cls, data, starts, lengths):
+        """Build a CompactLines object from UTF-8 text and its line index.
+
+        Args:
+            data: bytearray containing the text.
+            starts: array('Q') of the offsets of the lines in data.
+            lengths: array('I') of the lengths of the lines.
+
+        Returns:
+            CompactLines object using data as storage.
+        """
+        lines = cls()
+        lines._data = data
+        lines._splice(0, 0, (starts, lengths))
+        return lines
+
+    @property
+    def data(self):
+        """bytearray storing the lines (read-only, see from_index)."""
+        return self._data
+
+    @property
+    def index(self):
+        """(data, starts, lengths): Storage and a copy of the line index (read-only, see from_index)."""
+        return (self._data, *self.index_range(0, self._length))
+
+    def index_range(self, start, end):
+        """Get the index of a range of lines.
+
+        Args:
+            start: Index of the first line.
+            end: Index following the last line.
+
+        Returns:
+            (starts, lengths): array('Q') of the offsets of the lines in the
+                storage, and array('I') of their lengths.
+        """
+        return self._column(0, start, end), self._column(1, start, end)
+
+    def size(self, start, end):
+        """Return the number of bytes of a range of lines, without newlines.
+
+        Args:
+            start: Index of the first line.
+            end: Index following the last line.
+        """
+        return sum(sum(block[1][i: j]) for block, i, j in self._slices(start, end))
+
+    def extend_bytes(self, data, terminated=False):
+        """Append lines from UTF-8 text, without decoding it.
+        Until lines are modified, the storage holds the text appended
+        as is, so offsets in the storage are offsets in the text.
+
+        Args:
+            data: Bytes-like object containing lines separated by b'\\n'
+                (an empty one contains an empty line).
+            terminated: Whether data ends with a newline, which is stored
+                but does not start a new line. (default False)
+        """
+        position = len(self._data)
+        self._data += data
+        self._index(position, len(self._data) - terminated)
+
+    def extend_index(self, data, starts, lengths, offset=0):
+        """Append lines from UTF-8 text and their index, without decoding or indexing it.
+
+        Args:
+            data: Bytes-like object containing the lines.
+            starts: array('Q') of the offsets of the lines, in the text data was taken from.
+            lengths: array('I') of the lengths of the lines.
+            offset: Offset of data in the text data was taken from. (default 0)
+        """
+        shift = len(self._data) - offset
+        self._data += data
+        if shift:
+            starts = array('Q', [start + shift for start in starts])
+        self._splice(self._length, self._length, (starts, lengths))
+
+    def _index(self, position, size):
+        """Index the lines stored between two offsets of the storage.
+        Splits the text one chunk at a time, to bound the memory used.
+
+        Args:
+            position: Offset in the storage where the first line starts.
+            size: Offset in the storage where the last line ends.
+        """
+        data = self._data
+        while True:
+            end = data.find(b'\n', position + self._chunk_size, size)
+            end = size if end < 0 else end
+            lengths = array('I', map(len, data[position: end].split(b'\n')))
+            starts = array('Q', accumulate((n + 1 for n in islice(lengths, len(lengths) - 1)), initial=position))
+            self._splice(self._length, self._length, (starts, lengths))
+            if end == size:
+                break
+            position = end + 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._length)
+            if step != 1:
+                return [self._line(i) for i in range(start, stop, step)]
+            return list(self.iter_range(start, stop))
+        return self._line(index)
+
+    def _line(self, index):
+        """Decode a line.
+
+        Args:
+            index: Index of the line (negative indices count from the end).
+
+        Returns:
+            String containing the line.
+        """
+        (starts, lengths), i = self._find(index)
+        start = starts[i]
+        return self._data[start: start + lengths[i]].decode()
+
+    def __iter__(self):
+        return self.iter_range(0, self._length)
+
+    def iter_range(self, start, end):
+        """Iterate over a range of lines, decoding them one at a time.
+        The range is located when the iteration starts: later modifications
+        of the lines do not affect it.
+
+        Args:
+            start: Index of the first line.
+            end: Index following the last line.
+
+        Returns:
+            Iterator of strings.
+        """
+        data = self._data
+        for (starts, lengths), i, j in list(self._slices(start, end)):
+            for offset, length in zip(starts[i: j], lengths[i: j]):
+                yield data[offset: offset + length].decode()
+
+    def to_bytes(self, start=0, end=None):
+        """Get the text of a range of lines as UTF-8, without decoding it.
+
+        Args:
+            start: Index of the first line. (default 0)
+            end: Index following the last line. (default None: the number of lines)
+
+        Returns:
+            bytearray containing the lines separated by b'\\n'.
+        """
+        data, text = self._data, bytearray()
+        for k, ((starts, lengths), i, j) in enumerate(self._slices(start, len(self) if end is None else end)):
+            if k:
+                text += b'\n'
+            text += b'\n'.join(data[offset: offset + length] for offset, length in zip(starts[i: j], lengths[i: j]))
+        return text
+
+    def _append(self, lines):
+        """Encode lines at the end of the storage.
+
+        Args:
+            lines: Iterable of strings.
+
+        Returns:
+            (starts, lengths): Arrays locating the encoded lines.
+        """
+        starts, lengths = array('Q'), array('I')
+        data = self._data
+        for line in lines:
+            encoded = line.encode()
+            starts.append(len(data))
+            lengths.append(len(encoded))
+            data += encoded
+        return starts, lengths
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._length)
+            if step != 1:
+                raise ValueError('extended slices are not supported')
+            stop = max(start, stop)
+            columns = self._append(value)
+        else:
+            self._find(index)
+            start = self._length + index if index < 0 else index
+            stop = start + 1
+            columns = self._append((value,))
+        self._garbage += self.size(start, stop)
+        self._splice(start, stop, columns)
+        self._compact_check()
+
+    def __delitem__(self, index):
+        self[index if isinstance(index, slice) else slice(index, (index + 1) or None)] = ()
+
+    def insert(self, index, value):
+        self[index: index] = (value,)
+
+    def replace_ranges(self, runs):
+        """Replace several ranges of lines with other lines, in a single pass
+        over the blocks of the index (see BlockSequence._splice_runs).
+
+        Args:
+            runs: List of (start, end, lines) tuples, sorted and not overlapping:
+                the lines from start to end are replaced with lines.
+        """
+        self._garbage += sum(self.size(start, end) for start, end, _ in runs)
+        self._splice_runs([(start, end, self._append(lines)) for start, end, lines in runs])
+        self._compact_check()
+
+    def copy(self):
+        """Return a shallow copy, sharing the storage and the blocks of the index."""
+        lines = CompactLines()
+        lines._data = self._data
+        lines._garbage = self._garbage
+        self._copy_blocks(lines)
+        return lines
+
+    def _compact_check(self):
+        """Compact the storage if most of it is unused."""
+        if self._garbage > self._compact_min and self._garbage > len(self._data) - self._garbage:
+            self.compact()
+
+    def compact(self):
+        """Move the lines to a new storage holding only the bytes in use."""
+        empty = not self._length
+        self._data = self.to_bytes()
+        self._blocks, self._firsts, self._length = [], [], 0
+        self._garbage = 0
+        if not empty:
+            self._index(0, len(self._data))
+
+    def __sizeof__(self):
+        return super().__sizeof__() + getsizeof(self._data)
+
+
+def lines_renumber(changes):
+    """Get a function renumbering lines after ranges of lines have been replaced.
+
+    Args:
+        changes: List of (line, old_count, new_count) tuples (see Buffer._windows_lines_change).
+
+    Returns:
+        Function taking the index of a line before the changes, and returning
+        (line, replaced): the index of the same line after them, and False,
+        or the index of a line of its replacement (the line following it,
+        if it was deleted) and True.
+    """
+    starts, ends, shifts = [], [], []
+    shift = 0
+    for line, old, new in changes:
+        starts.append(line - shift)
+        ends.append(line - shift + old)
+        shift += new - old
+        shifts.append(shift)
+
+    def renumber(line):
+        k = bisect_right(starts, line) - 1
+        if k < 0:
+            return line, False
+        if line >= ends[k]:
+            return line + shifts[k], False
+        start, _, new = changes[k]
+        return start + min(line - starts[k], max(new - 1, 0)), True
+
+    return renumber
+
+
+class LineMemo(ABC):
+    """Class representing values computed from the lines of a buffer, cached per line.
+
+    A value is computed when first needed and kept until its line is
+    updated. The owner of the cache forwards the notifications of the
+    buffer: inserting or deleting lines only renumbers the cached values.
+    Values are kept with the text they were computed from, and only used
+    for the same text, as the lines following an updated one may be looked
+    up before they are renumbered. The least recently used values are
+    discarded beyond max_entries.
+
+    Subclasses implement _compute.
+
+    Attributes:
+        max_entries: Maximum number of lines whose values are kept.
+    """
+    def __init__(self, max_entries=4096):
+        """Initialize a LineMemo object.
+
+        Args:
+            max_entries: Maximum number of lines whose values are kept. (default 4096)
+        """
+        self.max_entries = max_entries
+        self._entries = dict()  # Line -> (text, value), least recently used first.
+
+    def get(self, lines, line):
+        """Get the value of a line, computing it if needed.
+
+        Args:
+            lines: Sequence of strings.
+            line: Index of the line.
+
+        Returns:
+            Value computed from the line.
+        """
+        text = lines[line]
+        entry = self._entries.pop(line, None)
+        if entry is None or entry[0] != text:  # Strings compare by identity first: O(1) for list storage.
+            entry = text, self._compute(lines, line)
+            if len(self._entries) >= self.max_entries:
+                del self._entries[next(iter(self._entries))]
+        self._entries[line] = entry
+        return entry[1]
+
+    @abstractmethod
+    def _compute(self, lines, line):
+        """Compute the value of a line.
+
+        Args:
+            lines: Sequence of strings.
+            line: Index of the line.
+
+        Returns:
+            Value of the line.
+        """
+
+    def clear(self):
+        """Discard the values of all the lines."""
+        self._entries.clear()
+
+    def line_update(self, line):
+        """Discard the value of an updated line.
+
+        Args:
+            line: Index of the line.
+        """
+        self._entries.pop(line, None)
+
+    def lines_insert(self, line, count):
+        """Renumber the lines following inserted ones.
+
+        Args:
+            line: Index of the first inserted line.
+            count: Number of inserted lines.
+        """
+        self._entries = {(i + count if i >= line else i): entry for i, entry in self._entries.items()}
+
+    def lines_delete(self, line, count):
+        """Discard the values of deleted lines and renumber the following ones.
+
+        Args:
+            line: Index of the first deleted line.
+            count: Number of deleted lines.
+        """
+        self._entries = {(i - count if i >= line else i): entry for i, entry in self._entries.items()
+                         if not line <= i < line + count}
+
+    def lines_change(self, changes):
+        """Discard the values of replaced lines and renumber the following ones.
+
+        Args:
+            changes: List of (line, old_count, new_count) tuples (see Buffer._windows_lines_change).
+        """
+        renumber = lines_renumber(changes)
+        entries = dict()
+        for i, entry in self._entries.items():
+            line, replaced = renumber(i)
+            if not replaced:
+                entries[line] = entry
+        self._entries = entries
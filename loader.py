@@ -0,0 +1,231 @@
+"""Progressive loading of files on a worker thread."""
+
+import os
+from bisect import bisect_left
+from hashlib import blake2b
+from queue import Empty, Full, Queue
+from threading import Event, Thread
+
+from compress import CompressedFile, codec
+from lines import text_split
+
+
+class Loader:
+    """Class reading a file on a worker thread, in batches of complete lines.
+
+    The worker reads (and decompresses) the file in large chunks, splits
+    them into lines and queues the batches, which the thread owning the
+    buffer takes with get(). The first chunk is small, so the first lines
+    are ready as soon as possible. The queue is bounded, so the worker
+    never gets far ahead of the buffer.
+
+    In compact mode, the index of the lines can be read from a cache (see
+    LineIndexCache): the batches then carry their part of it, and the
+    text is neither scanned for newlines nor validated. If the index turns
+    out not to match the text, it is removed from the cache and the file
+    is read again from the beginning.
+
+    Attributes:
+        stat: os.stat_result of the file when it was opened.
+        hashes: Hashes of the chunks of the file's content (see Buffer.hash_chunks),
+            complete when the last batch has been taken. None if not requested.
+        translated: Whether carriage returns have been translated to newlines so far.
+        cached: Whether the index of the lines was read from the cache,
+            set before the first batch (of the last reading of the file).
+    """
+    first_size = 1 << 16
+    chunk_size = 1 << 22
+
+    def __init__(self, file_name, compact=False, hash_size=None, cache=None):
+        """Initialize a Loader object and start reading the file.
+
+        Args:
+            file_name: Path of the file to load.
+            compact: Whether the lines are kept encoded (see lines.text_split). (default False)
+            hash_size: Size of the chunks of the content to hash. (default None: no hashes)
+            cache: LineIndexCache object where to look for the index of the
+                lines, in compact mode. (default None: no cache)
+
+        Raises:
+            OSError: If the file cannot be opened.
+        """
+        self._file = open(file_name, 'rb')
+        self._first = True
+        self.stat = os.fstat(self._file.fileno())
+        self.hashes = [] if hash_size else None
+        self.translated = False
+        self.cached = False
+
+        self._file_name = file_name
+        self._cache = cache if compact else None
+        self._compressed = CompressedFile(file_name) if codec(file_name) else None
+        self._compact = compact
+        self._hash_size = hash_size
+        self._hash = None
+        self._read = 0
+        self._queue = Queue(maxsize=4)
+        self._stopped = Event()
+        Thread(target=self._run, name='load ' + file_name, daemon=True).start()
+
+    @property
+    def progress(self):
+        """Fraction of the file read by the worker, between 0 and 1 (read-only)."""
+        return self._read / self.stat.st_size if self.stat.st_size else 1.0
+
+    def _chunks(self):
+        """Read the (decompressed) content of the file, one chunk at a time."""
+        with self._file:
+            if self._compressed:
+                for chunk in self._compressed.chunks():
+                    self._read = self._compressed.position
+                    yield chunk
+                return
+            size = self.first_size
+            while True:
+                chunk = self._file.read(size)
+                if not chunk:
+                    return
+                self._read += len(chunk)
+                yield chunk
+                size = self.chunk_size
+
+    def _hash_update(self, chunk):
+        """Hash a chunk of the content, in pieces of hash_size bytes."""
+        view = memoryview(chunk)
+        while view:
+            if self._hash is None:
+                self._hash, self._hashed = blake2b(digest_size=16), 0
+            n = min(len(view), self._hash_size - self._hashed)
+            self._hash.update(view[:n])
+            self._hashed += n
+            view = view[n:]
+            if self._hashed == self._hash_size:
+                self.hashes.append(self._hash.digest())
+                self._hash = None
+
+    def _run(self):
+        """Read the file and queue the batches of lines (worker thread)."""
+        try:
+            index = self._cache.load(self._file_name, self.stat) if self._cache else None
+            if index is not None:
+                self.cached = True
+                if self._run_indexed(*index):
+                    return
+                self._restart()
+            tail = b''
+            for chunk in self._chunks():
+                if self._stopped.is_set():
+                    return
+                if self._hash_size:
+                    self._hash_update(chunk)
+                self.translated = self.translated or b'\r' in chunk
+                data = tail + chunk
+                end = data.rfind(b'\n') + 1
+                tail = data[end:]
+                if end:
+                    # Newlines are translated before removing the one ending the last
+                    # line, as it could follow a carriage return. Compact lines keep it,
+                    # so their storage holds the text as is (see CompactLines.extend_bytes).
+                    lines = text_split(data[:end], self._compact)
+                    self._put(lines if self._compact else lines[:-1], False)
+            if self._hash:
+                self.hashes.append(self._hash.digest())
+            self._put(text_split(tail, self._compact), True)
+        except Exception as error:
+            self._put(error, True)
+
+    def _run_indexed(self, starts, lengths, endings):
+        """Read the file and queue the batches of lines, with their part of
+        the cached index (worker thread, see LineIndexCache.load).
+
+        Returns:
+            False if the index does not match the text, True otherwise.
+        """
+        tail = b''
+        position = line = 0  # Offset in the translated text, and index of the first line of the next batch.
+        for chunk in self._chunks():
+            if self._stopped.is_set():
+                return True
+            if self._hash_size:
+                self._hash_update(chunk)
+            data = tail + chunk
+            end = data.rfind(b'\n') + 1
+            tail = data[end:]
+            if end:
+                text = data[:end]
+                if endings == self._cache.TRANSLATED:
+                    text = text.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+                # The lines of the batch are those starting before its end. Counting
+                # its newlines (much faster than splitting it) detects a newline added
+                # or removed in a part of the file not sampled (see LineIndexCache).
+                n = bisect_left(starts, position + len(text), line)
+                if (n == line or starts[n-1] + lengths[n-1] != position + len(text) - 1
+                        or text.count(b'\n') != n - line):
+                    return False
+                self._put((text, starts[line: n], lengths[line: n], position), False)
+                position += len(text)
+                line = n
+        if self._hash:
+            self.hashes.append(self._hash.digest())
+        if endings == self._cache.TRANSLATED:
+            tail = tail.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+        if len(starts) - line != tail.count(b'\n') + 1:
+            return False
+        self._put((tail, starts[line:], lengths[line:], position), True)
+        return True
+
+    def _restart(self):
+        """Discard the cached index found out of date, and prepare to read
+        the file again from the beginning, indexing it (worker thread).
+        The size and modification time of the file matched, so it is
+        assumed to be the same file (see LineIndexCache).
+        """
+        self._cache.invalidate(self._file_name)
+        self._file = open(self._file_name, 'rb')
+        self.cached = False
+        if self.hashes:
+            self.hashes.clear()
+        self._hash = None
+        self._read = 0
+        self._first = True
+
+    def _put(self, batch, final):
+        """Queue a batch, waiting for space unless the loading is stopped."""
+        while not self._stopped.is_set():
+            try:
+                self._queue.put((batch, final, self._first), timeout=0.1)
+                self._first = False
+                return
+            except Full:
+                pass
+
+    def get(self, block=False):
+        """Take the next batch of lines.
+
+        Args:
+            block: Whether to wait for a batch if none is ready. (default False)
+
+        Returns:
+            (lines, final, first): List of strings (or bytes of lines separated
+                by b'\\n', if compact, ending with a newline unless final, or
+                (bytes, starts, lengths, offset) with the cached index of the
+                lines, see CompactLines.extend_index), whether it is the last
+                batch, and whether it is the first one, replacing the lines
+                of the previous ones if the file is read again.
+            None: If no batch is ready.
+
+        Raises:
+            Exception: Error raised by the worker while reading the file.
+        """
+        try:
+            item = self._queue.get(block)
+        except Empty:
+            return None
+        batch, final, first = item
+        if isinstance(batch, Exception):
+            raise batch
+        return batch, final, first
+
+    def stop(self):
+        """Stop reading the file."""
+        self._stopped.set()
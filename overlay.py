@@ -0,0 +1,381 @@
+"""Ranges of text shown with attributes, anchored to the text as it is edited."""
+
+import random
+
+
+class Overlay:
+    """Class representing a range of text shown with attributes
+    (a compiler error, a covered line...). Overlays are created by
+    OverlayTree.add, and their positions follow the edits of the text.
+
+    Attributes:
+        attributes: (colors, properties) tuple of the characters in the range.
+        data: Object associated with the overlay (a message...), or None.
+        priority: Overlays with a higher priority are shown above the others.
+    """
+    def __init__(self, start, end, attributes, data=None, priority=0):
+        """Initialize an Overlay object. See OverlayTree.add."""
+        self.attributes = attributes
+        self.data = data
+        self.priority = priority
+
+        # Node of the tree: the lines of the positions in the subtree are
+        # missing the _shift of the ancestors, applied when they are visited.
+        self._start = start
+        self._end = end
+        self._max_end = end
+        self._shift = 0
+        self._left = None
+        self._right = None
+        self._parent = None
+        self._weight = random.random()
+        self._tree = None
+
+    def _lines_shift(self):
+        """Get the lines not yet added to the positions by the ancestors."""
+        shift, node = 0, self._parent
+        while node:
+            shift += node._shift
+            node = node._parent
+        return shift
+
+    @property
+    def start(self):
+        """Position (line, column) of the first character of the range (read-only)."""
+        return self._start[0] + self._lines_shift(), self._start[1]
+
+    @property
+    def end(self):
+        """Position (line, column) following the last character of the range (read-only)."""
+        return self._end[0] + self._lines_shift(), self._end[1]
+
+
+def _shift(node, lines):
+    """Move the positions of a subtree by a number of lines."""
+    node._start = node._start[0] + lines, node._start[1]
+    node._end = node._end[0] + lines, node._end[1]
+    node._max_end = node._max_end[0] + lines, node._max_end[1]
+    node._shift += lines
+
+
+def _push(node):
+    """Apply the shift of a node to its children."""
+    if node._shift:
+        if node._left:
+            _shift(node._left, node._shift)
+        if node._right:
+            _shift(node._right, node._shift)
+        node._shift = 0
+
+
+def _pull(node):
+    """Update a node from its children."""
+    max_end = node._end
+    for child in (node._left, node._right):
+        if child:
+            child._parent = node
+            if child._max_end > max_end:
+                max_end = child._max_end
+    node._max_end = max_end
+
+
+def _split(node, position):
+    """Split a tree into the nodes starting before position, and the others.
+
+    Returns:
+        (before, after) tuple of trees (None if empty).
+    """
+    if node is None:
+        return None, None
+    _push(node)
+    if node._start < position:
+        node._right, after = _split(node._right, position)
+        _pull(node)
+        return node, after
+    before, node._left = _split(node._left, position)
+    _pull(node)
+    return before, node
+
+
+def _merge(before, after):
+    """Merge two trees, the nodes of before starting before those of after."""
+    if before is None:
+        return after
+    if after is None:
+        return before
+    if before._weight > after._weight:
+        _push(before)
+        before._right = _merge(before._right, after)
+        _pull(before)
+        return before
+    _push(after)
+    after._left = _merge(before, after._left)
+    _pull(after)
+    return after
+
+
+def _ends_map(node, position, function):
+    """Map the ends following position in a tree."""
+    if node is None or node._max_end <= position:
+        return
+    _push(node)
+    _ends_map(node._left, position, function)
+    _ends_map(node._right, position, function)
+    if node._end > position:
+        node._end = function(node._end)
+    _pull(node)
+
+
+def _line_map(node, position, line_end, function, starts):
+    """Map the starts and the ends following position on its line, keeping their order.
+    The starts at position are mapped too if starts is True, with the ends of empty overlays.
+    """
+    if node is None or node._max_end < position or (node._max_end == position and not starts):
+        return
+    _push(node)
+    _line_map(node._left, position, line_end, function, starts)
+    if node._start < line_end:  # Otherwise, the right subtree starts on the following lines.
+        _line_map(node._right, position, line_end, function, starts)
+        if node._start > position or (starts and node._start == position):
+            node._start = function(node._start)
+    if position < node._end < line_end:
+        node._end = function(node._end)
+    elif node._end < node._start:  # Empty overlay whose start moved.
+        node._end = node._start
+    _pull(node)
+
+
+def _positions_map(node, function):
+    """Map the starts and the ends of a tree, keeping their order."""
+    if node is None:
+        return
+    _push(node)
+    _positions_map(node._left, function)
+    _positions_map(node._right, function)
+    node._start = function(node._start)
+    node._end = function(node._end)
+    _pull(node)
+
+
+class OverlayTree:
+    """Class representing the overlays of a buffer.
+
+    The tree is a listener of the buffer. The overlays are stored in a
+    treap ordered by start position, where every node keeps the furthest
+    end in its subtree: the overlays intersecting a range are found in
+    O(log n + k). An edit only maps the positions on its lines, and shifts
+    the lines of the following overlays at once, in O(log n): the shift is
+    applied to the nodes below when they are visited.
+
+    Text inserted at the start or at the end of an overlay is not part of
+    it (an empty overlay moves after the inserted text), and deleting its
+    text leaves an empty overlay, which is not shown.
+    """
+    def __init__(self, buffer):
+        """Initialize an OverlayTree object and link it to the buffer.
+
+        Args:
+            buffer: Buffer object whose text the overlays are anchored to.
+        """
+        self._buffer = buffer
+        self._root = None
+        self._count = 0
+
+        buffer.listener_link(self)
+
+    def __len__(self):
+        return self._count
+
+    def add(self, start, end, attributes, data=None, priority=0):
+        """Add an overlay.
+
+        Args:
+            start: Position (line, column) of the first character of the range.
+            end: Position (line, column) following the last character of the range.
+            attributes: (colors, properties) tuple of the characters in the range.
+            data: Object associated with the overlay. (default None)
+            priority: Overlays with a higher priority are shown above the others. (default 0)
+
+        Returns:
+            Overlay object.
+
+        Raises:
+            ValueError: If end is before start.
+        """
+        start, end = tuple(start), tuple(end)
+        if end < start:
+            raise ValueError('overlay ending before its start')
+        overlay = Overlay(start, end, attributes, data, priority)
+        overlay._tree = self
+        before, after = _split(self._root, start)
+        self._root = self._root_set(_merge(_merge(before, overlay), after))
+        self._count += 1
+        self._lines_redraw(start[0], end[0])
+        return overlay
+
+    def remove(self, overlay):
+        """Remove an overlay.
+
+        Args:
+            overlay: Overlay object returned by add.
+
+        Raises:
+            ValueError: If the overlay is not in the tree.
+        """
+        if overlay._tree is not self:
+            raise ValueError('overlay not in the tree')
+        ancestors = []
+        node = overlay._parent
+        while node:
+            ancestors.append(node)
+            node = node._parent
+        for node in reversed(ancestors):
+            _push(node)
+        _push(overlay)
+        child = _merge(overlay._left, overlay._right)
+        parent = overlay._parent
+        if parent is None:
+            self._root = self._root_set(child)
+        else:
+            if parent._left is overlay:
+                parent._left = child
+            else:
+                parent._right = child
+            for node in ancestors:
+                _pull(node)
+        overlay._left = overlay._right = overlay._parent = overlay._tree = None
+        overlay._max_end = overlay._end
+        self._count -= 1
+        self._lines_redraw(overlay._start[0], overlay._end[0])
+
+    def clear(self):
+        """Remove all the overlays."""
+        nodes = [self._root] if self._root else []
+        while nodes:
+            node = nodes.pop()
+            nodes.extend(child for child in (node._left, node._right) if child)
+            node._left = node._right = node._parent = node._tree = None
+        self._root = None
+        self._count = 0
+        self._lines_redraw(0, len(self._buffer.lines) - 1)
+
+    def find(self, start, end):
+        """Find the overlays intersecting a range of text.
+
+        Args:
+            start: Position (line, column) of the first character of the range.
+            end: Position (line, column) following the last character of the range.
+
+        Returns:
+            List of (start, end, overlay) tuples, sorted by start.
+        """
+        found = []
+        # Iterative in-order traversal, skipping the subtrees ending before start.
+        node = self._root
+        stack = []
+        while stack or node:
+            if node and node._max_end > start:
+                _push(node)
+                stack.append(node)
+                node = node._left
+                continue
+            if not stack:
+                break
+            node = stack.pop()
+            if node._start >= end:
+                break
+            if node._end > start and node._start < node._end:
+                found.append((node._start, node._end, node))
+            node = node._right
+        return found
+
+    def _root_set(self, node):
+        """Detach a node from its former parent, to make it the root."""
+        if node:
+            node._parent = None
+        return node
+
+    def _lines_redraw(self, first, last):
+        """Draw again the lines of an overlay added or removed."""
+        self._buffer._windows_lines_redraw(first, last - first + 1)
+
+    def _edit(self, position, end, function, shift, starts=False):
+        """Map the positions following an edit. The windows are notified of
+        the edit afterwards (see Buffer.listener_link): the lines it changed
+        are drawn again with the overlays moved.
+
+        Args:
+            position: Position (line, column) of the edit.
+            end: Last position changed by the edit (the end of the deleted text,
+                or the position of the insertion).
+            function: Function mapping the positions following position.
+            shift: Number of lines added (or removed) by the edit.
+            starts: Whether the starts at position are mapped: text inserted
+                at the start of an overlay is not part of it. (default False)
+        """
+        if self._root is None:
+            return
+        if not shift and end[0] == position[0]:  # Only the positions on the line of the edit move.
+            _line_map(self._root, position, (position[0] + 1, 0), function, starts)
+            return
+        # Overlays starting before the edit, and ending after it...
+        before, after = _split(self._root, position if starts else (position[0], position[1] + 1))
+        _ends_map(before, position, function)
+        # ...starting on its lines, mapped one by one...
+        middle, after = _split(after, (end[0] + 1, 0))
+        _positions_map(middle, function)
+        # ...and following it: only their lines change.
+        if after and shift:
+            _shift(after, shift)
+        self._root = self._root_set(_merge(_merge(before, middle), after))
+
+    def _text_insert(self, line, column, text):
+        """Move the overlays following the inserted text. See Buffer._listeners_insert."""
+        newlines = text.count('\n')
+        last = len(text) - text.rfind('\n') - 1
+
+        def function(position):
+            if position[0] != line:
+                return position[0] + newlines, position[1]
+            if newlines:
+                return line + newlines, position[1] - column + last
+            return line, position[1] + last
+
+        self._edit((line, column), (line, column), function, newlines, starts=True)
+
+    def _text_delete(self, line, column, text):
+        """Move the overlays following the deleted text. See Buffer._listeners_delete."""
+        newlines = text.count('\n')
+        end = (line + newlines, len(text) - text.rfind('\n') - 1 if newlines else column + len(text))
+
+        def function(position):
+            if position <= end:
+                return line, column
+            if position[0] == end[0]:
+                return line, column + position[1] - end[1]
+            return position[0] - newlines, position[1]
+
+        self._edit((line, column), end, function, -newlines)
+
+    def _text_reset(self, lines, range=None):
+        """Remove all the overlays, as the text they were on was replaced, or
+        only move those of a range of lines replaced to the end of the new
+        lines, as deleting and inserting them would. See Buffer._listeners_reset.
+        """
+        if range is None:
+            self.clear()
+            return
+        start, end, count = range
+        shift = count - (end - start)
+        lines = self._buffer.lines
+        if count:
+            last = start + count - 1, len(lines[start + count - 1])
+        else:
+            last = (start, 0) if start < len(lines) else (start - 1, len(lines[start - 1]))
+
+        def function(position):
+            if position[0] < end:
+                return last
+            return position[0] + shift, position[1]
+
+        self._edit((start, 0), (end, 0), function, shift, starts=True)
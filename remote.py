@@ -0,0 +1,189 @@
+"""Protocol between the editor server and its clients, over a Unix socket."""
+
+import json
+import os
+import socket
+import stat
+import struct
+import tempfile
+
+
+def socket_path():
+    """Get the default path of the server's socket, in the user's runtime directory
+    (or a private directory created in the temporary directory if there is none).
+
+    Returns:
+        Path of the socket.
+
+    Raises:
+        OSError: If the private directory cannot be created, or is not private.
+    """
+    directory = os.environ.get('XDG_RUNTIME_DIR')
+    if directory:
+        return os.path.join(directory, 'yugen-{}.sock'.format(os.getuid()))
+    return os.path.join(private_directory(), 'yugen.sock')
+
+
+def private_directory():
+    """Get the user's private directory in the temporary directory, creating
+    it if needed. The temporary directory is writable by everybody, so the
+    directory is only used if it belongs to the user, and only they can
+    access it: anyone else could otherwise replace the socket by their own.
+
+    Returns:
+        Path of the directory.
+
+    Raises:
+        OSError: If the directory cannot be created, or is not private.
+    """
+    uid = os.getuid()
+    directory = os.path.join(tempfile.gettempdir(), 'yugen-{}'.format(uid))
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+    status = os.lstat(directory)  # Not stat: a symbolic link is rejected.
+    if not stat.S_ISDIR(status.st_mode) or status.st_uid != uid or status.st_mode & 0o077:
+        raise PermissionError('{} is not a private directory of the user'.format(directory))
+    return directory
+
+
+def connect(path=None):
+    """Connect to the editor server. The server must run as the same user:
+    its windows show the user's files, and the keys typed are sent to it.
+
+    Args:
+        path: Path of the server's socket. (default None: socket_path())
+
+    Returns:
+        Connection object.
+
+    Raises:
+        OSError: If no server is listening on the socket, or if it runs
+            as another user.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path if path else socket_path())
+        if hasattr(socket, 'SO_PEERCRED'):  # Linux only.
+            credentials = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize('3i'))
+            _, uid, _ = struct.unpack('3i', credentials)
+            if uid != os.getuid():
+                raise PermissionError('the server runs as another user (uid {})'.format(uid))
+    except OSError:
+        sock.close()
+        raise
+    return Connection(sock)
+
+
+def attributes_encode(attributes):
+    """Encode the attributes of the characters of a line as runs of equal attributes.
+
+    Args:
+        attributes: List of (colors, properties) tuples, one for each character.
+
+    Returns:
+        List of [count, colors, properties] lists.
+    """
+    runs = []
+    previous = None
+    for attribute in attributes:
+        if attribute == previous:
+            runs[-1][0] += 1
+        else:
+            runs.append([1, *attribute])
+            previous = attribute
+    return runs
+
+
+def attributes_decode(runs):
+    """Decode the attributes encoded by attributes_encode.
+
+    Args:
+        runs: List of [count, colors, properties] lists.
+
+    Returns:
+        List of (colors, properties) tuples, one for each character.
+    """
+    attributes = []
+    for count, colors, properties in runs:
+        attributes.extend([(tuple(colors) if isinstance(colors, list) else colors, properties)] * count)
+    return attributes
+
+
+class Connection:
+    """Class representing one end of a connection between the editor server and a client.
+
+    Messages are lists of JSON values, sent one per line. The socket is
+    non-blocking: the messages sent are buffered until the socket can be
+    written (see flush), and those received are returned once complete.
+    """
+    def __init__(self, sock):
+        """Initialize a Connection object.
+
+        Args:
+            sock: Connected socket object.
+        """
+        sock.setblocking(False)
+        self._socket = sock
+        self._received = b''         # Start of the next message.
+        self._sending = bytearray()  # Messages not written yet.
+
+    def fileno(self):
+        """Get the file descriptor of the socket, to wait for it with selectors."""
+        return self._socket.fileno()
+
+    @property
+    def sending(self):
+        """Whether messages are waiting for the socket to be written (read-only)."""
+        return bool(self._sending)
+
+    def send(self, message):
+        """Send a message, once the messages before it are written.
+
+        Args:
+            message: List of JSON serializable values, starting with the message type.
+        """
+        self._sending += json.dumps(message, separators=(',', ':')).encode('ascii')
+        self._sending += b'\n'
+
+    def flush(self):
+        """Write as much of the messages sent as the socket accepts.
+
+        Returns:
+            True if all the messages were written, False otherwise.
+
+        Raises:
+            OSError: If the connection was closed by the other end.
+        """
+        if self._sending:
+            try:
+                del self._sending[:self._socket.send(self._sending)]
+            except (BlockingIOError, InterruptedError):
+                pass
+        return not self._sending
+
+    def receive(self):
+        """Read the messages available on the socket.
+
+        Returns:
+            List of the messages received (empty if none is complete yet).
+            None: If the connection was closed by the other end.
+
+        Raises:
+            ValueError: If a message is not valid JSON.
+        """
+        try:
+            data = self._socket.recv(1 << 16)
+        except (BlockingIOError, InterruptedError):
+            return []
+        except ConnectionResetError:
+            return None
+        if not data:
+            return None
+        *lines, self._received = (self._received + data).split(b'\n')
+        return [json.loads(line) for line in lines]
+
+    def close(self):
+        """Close the connection."""
+        self._socket.close()
@@ -0,0 +1,209 @@
+"""Editor server, sharing the buffers of the files between the clients attached to it."""
+
+import os
+import selectors
+import socket
+
+from buffer_manager import BufferManager
+from editor import Editor
+from key import Key
+from remote import Connection, socket_path
+from ui_remote import RemoteUI
+
+
+class Server:
+    """Class representing a long-lived editor process, serving clients over a Unix socket.
+
+    Every client gets its own Editor, with its windows drawn on a RemoteUI,
+    but the editors share the server's BufferManager: a file opened by
+    several clients is loaded once, and reopening it is instant as long
+    as its buffer is kept. The clients and the idle housekeeping of the
+    editors are handled in a single loop, waiting on the sockets with
+    selectors.
+
+    Messages from the clients:
+        ['hello', n_lines, n_columns, file_name]: Attach, with the size of
+            the screen and the absolute path of the file to open (or None).
+        ['size', n_lines, n_columns]: The screen was resized.
+        ['key', key, ctrl, meta]: A key was pressed (see Key).
+    The server sends the drawing of the windows (see RemoteUI), and
+    closes the connection when the client's editor quits. Errors only
+    affect the client causing them: a command failing is reported in the
+    client's status window, and a malformed message closes its connection.
+
+    Attributes:
+        path: Path of the socket.
+        buffer_manager: BufferManager object shared by the editors.
+        idle_timeout: Seconds without messages after which the editors are
+            considered idle and perform their housekeeping.
+        load_timeout: Seconds between the batches of lines appended to
+            buffers whose files are being loaded.
+    """
+    def __init__(self, path=None, buffer_manager=None):
+        """Initialize a Server object.
+
+        Args:
+            path: Path of the socket. (default None: socket_path())
+            buffer_manager: BufferManager object. (default None: create a new one)
+        """
+        self.path = path if path else socket_path()
+        self.buffer_manager = buffer_manager if buffer_manager else BufferManager()
+        self.idle_timeout = 1.0
+        self.load_timeout = 0.02
+
+        self._socket = None
+        self._selector = selectors.DefaultSelector()
+        self._clients = dict()  # Connection -> Editor (None until the client says hello).
+
+    def listen(self):
+        """Create the socket and start accepting clients. A socket left by
+        a server which is not running anymore is replaced.
+
+        Raises:
+            OSError: If another server is listening on the socket.
+        """
+        if os.path.exists(self.path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.path)
+            except ConnectionRefusedError:
+                os.unlink(self.path)
+            else:
+                raise OSError('server already listening on {}'.format(self.path))
+            finally:
+                probe.close()
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        umask = os.umask(0o177)  # Only the user can connect.
+        try:
+            self._socket.bind(self.path)
+        finally:
+            os.umask(umask)
+        self._socket.listen()
+        self._socket.setblocking(False)
+        self._selector.register(self._socket, selectors.EVENT_READ)
+
+    def run(self):
+        """Serve the clients until interrupted, then close the server."""
+        if self._socket is None:
+            self.listen()
+        try:
+            while True:
+                self.step()
+        finally:
+            self.close()
+
+    def step(self, timeout=None):
+        """Wait for messages from the clients and handle them, then send them
+        the windows drawn. If none arrives before the timeout, the editors
+        perform their housekeeping instead.
+
+        Args:
+            timeout: Maximum number of seconds to wait.
+                (default None: load_timeout while files are being loaded, idle_timeout otherwise)
+        """
+        if timeout is None:
+            loading = any(buffer.loading for buffer in self.buffer_manager)
+            timeout = self.load_timeout if loading else self.idle_timeout
+        events = self._selector.select(timeout)
+        if not events:
+            for editor in list(self._clients.values()):
+                if editor:
+                    editor._idle()
+        for key, mask in events:
+            if key.fileobj is self._socket:
+                self._accept()
+            elif mask & selectors.EVENT_READ:
+                self._receive(key.fileobj)
+        for connection, editor in list(self._clients.items()):
+            if editor:
+                editor._render()
+            self._flush(connection)
+
+    def close(self):
+        """Detach the clients, and remove the socket."""
+        for connection in list(self._clients):
+            self._client_close(connection)
+        if self._socket:
+            self._selector.unregister(self._socket)
+            self._socket.close()
+            self._socket = None
+            os.unlink(self.path)
+
+    def clients(self):
+        """Return the number of clients attached."""
+        return len(self._clients)
+
+    def _accept(self):
+        """Accept a new client."""
+        try:
+            sock, _ = self._socket.accept()
+        except (BlockingIOError, InterruptedError):
+            return
+        connection = Connection(sock)
+        self._clients[connection] = None
+        self._selector.register(connection, selectors.EVENT_READ)
+
+    def _receive(self, connection):
+        """Handle the messages received from a client."""
+        try:
+            messages = connection.receive()
+        except ValueError:
+            messages = None
+        if messages is None:
+            self._client_close(connection)
+            return
+        for message in messages:
+            try:
+                self._message_handle(connection, message)
+            except (SystemExit, Exception):  # The editor quit, or a malformed message: only this client is closed.
+                self._client_close(connection)
+                return
+
+    def _message_handle(self, connection, message):
+        """Handle a message from a client (see the messages above)."""
+        kind, arguments = message[0], message[1:]
+        editor = self._clients[connection]
+        if kind == 'hello' and editor is None:
+            n_lines, n_columns, file_name = arguments
+            editor = Editor(RemoteUI(connection, n_lines, n_columns), self.buffer_manager)
+            self._clients[connection] = editor
+            if file_name:
+                try:
+                    editor.file_open(file_name)
+                except OSError as error:
+                    editor.message_show('cannot open {}: {}'.format(file_name, error.strerror or error))
+        elif kind == 'size' and editor:
+            editor._ui.size_set(*arguments)
+        elif kind == 'key' and editor:
+            editor._ui.key_put(Key(*arguments))
+            key = editor.window_focused._ui_window.key_get()
+            while key is not None:
+                try:
+                    editor.key_handle(key)
+                except Exception as error:  # Reported to this client only, the others are not affected.
+                    editor.message_show('{}: {}'.format(type(error).__name__, error))
+                key = editor.window_focused._ui_window.key_get()
+        else:
+            raise ValueError(kind)
+
+    def _flush(self, connection):
+        """Write the messages sent to a client, waiting for its socket to be writable if needed."""
+        try:
+            done = connection.flush()
+        except OSError:
+            self._client_close(connection)
+            return
+        events = selectors.EVENT_READ if done else selectors.EVENT_READ | selectors.EVENT_WRITE
+        if self._selector.get_key(connection).events != events:
+            self._selector.modify(connection, events)
+
+    def _client_close(self, connection):
+        """Detach a client, writing the pending journal records (see Editor.quit)
+        and releasing the buffers of its editor.
+        """
+        editor = self._clients.pop(connection, None)
+        if editor:
+            editor._idle()
+            editor.close()
+        self._selector.unregister(connection)
+        connection.close()
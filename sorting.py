@@ -0,0 +1,84 @@
+"""Sorting of lines, spilling sorted runs to temporary files when they are too many."""
+
+import re
+from heapq import merge
+from itertools import groupby
+from tempfile import TemporaryFile
+
+_line_overhead = 56  # Approximate bytes of a str object, beyond its characters, and of its reference.
+_write_lines = 4096  # Lines joined into a single write.
+_number = re.compile(r'\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)')
+
+
+def number_key(text):
+    """Get the number a string starts with (after blanks), as compared by sort -n.
+
+    Args:
+        text: String.
+
+    Returns:
+        The number as a float, 0.0 if the string does not start with one.
+    """
+    match = _number.match(text)
+    return float(match.group(1)) if match else 0.0
+
+
+def _run_write(lines, key, reverse):
+    """Sort lines and write them to a temporary file, one per line.
+
+    Returns:
+        Generator of the lines read back from the file, which is closed when exhausted.
+    """
+    lines.sort(key=key, reverse=reverse)
+    file = TemporaryFile('w+', encoding='utf-8', errors='surrogatepass', newline='\n')
+    for i in range(0, len(lines), _write_lines):
+        file.write('\n'.join(lines[i: i + _write_lines]))
+        file.write('\n')
+    file.seek(0)
+
+    def run():
+        with file:
+            for line in file:
+                yield line[:-1]
+
+    return run()
+
+
+def lines_sort(lines, key=None, reverse=False, unique=False, run_size=None):
+    """Sort lines, using a bounded amount of memory. The lines are split into
+    runs of about run_size bytes, sorted one at a time: if there are several,
+    they are written to temporary files, and merged as they are read back.
+    The sort is stable.
+
+    Args:
+        lines: Iterable of strings (without newlines).
+        key: Function taking a line and returning its sort key. (default None: the line)
+        reverse: Whether to sort in decreasing order. (default False)
+        unique: Whether to keep only the first of the lines with the same key. (default False)
+        run_size: Approximate number of bytes of the lines sorted in memory at once.
+            (default None: all the lines)
+
+    Returns:
+        Iterator of the sorted lines.
+    """
+    runs = []
+    if run_size is None:
+        run = list(lines)
+    else:
+        run, size = [], 0
+        for line in lines:
+            run.append(line)
+            size += len(line) + _line_overhead
+            if size >= run_size:
+                runs.append(_run_write(run, key, reverse))
+                run, size = [], 0
+    if runs:
+        if run:
+            runs.append(_run_write(run, key, reverse))
+        result = merge(*runs, key=key, reverse=reverse)
+    else:
+        run.sort(key=key, reverse=reverse)
+        result = iter(run)
+    if unique:
+        result = (next(group) for _, group in groupby(result, key))
+    return result
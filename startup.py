@@ -0,0 +1,59 @@
+"""Measurement of the editor's startup time."""
+
+from contextlib import contextmanager
+from time import perf_counter
+
+
+class StartupProfile:
+    """Class recording the duration of the phases of the editor's startup.
+
+    The clock starts when the object is created, so it should be created
+    as early as possible.
+
+    Attributes:
+        budget: Maximum acceptable startup time, in seconds.
+    """
+    def __init__(self, budget=0.05):
+        """Initialize a StartupProfile object.
+
+        Args:
+            budget: Maximum acceptable startup time, in seconds. (default 0.05)
+        """
+        self.budget = budget
+        self._start = self._end = perf_counter()
+        self._phases = list()
+
+    @contextmanager
+    def phase(self, name):
+        """Context manager measuring the duration of a startup phase.
+
+        Args:
+            name: Name of the phase.
+        """
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self._end = perf_counter()
+            self._phases.append((name, self._end - start))
+
+    @property
+    def phases(self):
+        """List of (name, seconds) tuples, one for each completed phase (read-only)."""
+        return self._phases
+
+    @property
+    def total(self):
+        """Seconds elapsed from the creation of the profile to the end of the last phase (read-only)."""
+        return self._end - self._start
+
+    def over_budget(self):
+        """Return True if the startup took longer than the budget, False otherwise."""
+        return self.total > self.budget
+
+    def report(self):
+        """Return a human readable report of the startup phases."""
+        lines = ['{:<20}{:>8.1f} ms'.format(name, t * 1000) for (name, t) in self._phases]
+        lines.append('{:<20}{:>8.1f} ms (budget {:.1f} ms{})'.format(
+            'total', self.total * 1000, self.budget * 1000, ', EXCEEDED' if self.over_budget() else ''))
+        return '\n'.join(lines)
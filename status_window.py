@@ -18,6 +18,16 @@ class StatusWindow(Window):
 
     def update(self):
         line, column = self._editor.window_current.cursor
-        file_name = self._editor.window_current._buffer.file_name
-        self._buffer.content = '{:<15}{}'.format('({}, {})'.format(line+1, column), file_name)
+        buffer = self._editor.window_current._buffer
+        flags = ' [+]' if buffer.modified else ''
+        flags += ' [changed on disk]' if buffer.file_changed else ''
+        flags += ' [loading {:.0%}]'.format(buffer.load_progress) if buffer.loading else ''
+        flags += ' [writing]' if buffer.writing else ''
+        flags += ' [{}]'.format(type(buffer.file_error).__name__) if buffer.file_error else ''
+        flags += ' [recording]' if self._editor.macro_recording else ''
+        if self._editor.macro_report:
+            iterations, seconds = self._editor.macro_report
+            flags += ' [replayed {} times, {:.0f}/s]'.format(iterations, iterations / max(seconds, 1e-6))
+        flags += ' [{}]'.format(self._editor.message) if self._editor.message else ''
+        self._buffer.content = '{:<15}{}{}'.format('({}, {})'.format(line+1, column), buffer.file_name, flags)
         self._update()
@@ -0,0 +1,62 @@
+"""Tests of the streaming access to compressed files."""
+
+import gzip
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from buffer import Buffer
+from compress import CompressedFile
+
+
+class CompressedFileTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        rng = random.Random(0)
+        self.data = bytes(rng.randrange(4) + 97 for _ in range(50000))
+        self.path = os.path.join(self.directory, 'file.gz')
+        with open(self.path, 'wb') as f:
+            f.write(gzip.compress(self.data[:30000]) + gzip.compress(self.data[30000:]))  # Two members.
+        for patch in (mock.patch.object(CompressedFile, 'read_size', 1000),
+                      mock.patch.object(CompressedFile, 'checkpoint_interval', 5000)):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_chunks(self):
+        compressed = CompressedFile(self.path)
+        self.assertEqual(b''.join(compressed.chunks()), self.data)
+        self.assertGreater(len(compressed.checkpoints), 5)
+
+    def test_read(self):
+        """Reading from an offset resumes from the nearest checkpoint before it."""
+        compressed = CompressedFile(self.path)
+        self.assertEqual(compressed.read(49000, 2000), self.data[49000:])
+        checkpoints = compressed.checkpoints
+        for offset in (0, 1, 4999, 5000, 29999, 30000, 30001, 45000, 49999, 50000):
+            self.assertEqual(compressed.read(offset, 777), self.data[offset: offset + 777])
+        self.assertEqual(compressed.checkpoints, checkpoints)
+        start = max(position for (position, output) in checkpoints if output <= 45000)
+        compressed.read(45000, 10)
+        self.assertGreater(start, 0)
+        self.assertLessEqual(compressed.position - start, 2 * CompressedFile.read_size)
+
+    def test_write(self):
+        """Compressed copies are written in another thread, reporting their errors."""
+        buffer = Buffer('line 1\nline 2é\n')
+        buffer.file_write(os.path.join(self.directory, 'copy.txt.gz'))
+        self.assertTrue(buffer.writing)
+        buffer._write_wait()
+        self.assertIsNone(buffer.file_error)
+        with gzip.open(os.path.join(self.directory, 'copy.txt.gz'), 'rt') as f:
+            self.assertEqual(f.read(), buffer.content)
+        buffer.file_write(os.path.join(self.directory, 'missing', 'copy.txt.gz'))
+        buffer._write_wait()
+        self.assertIsInstance(buffer.file_error, FileNotFoundError)
+
+
+if __name__ == '__main__':
+    unittest.main()
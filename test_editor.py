@@ -0,0 +1,59 @@
+"""Tests of the editor commands, through the keys bound to them."""
+
+import unittest
+
+from editor import Editor
+from key import Key
+from ui_remote import RemoteUI
+
+
+class Connection:
+    """Connection to no client, discarding the messages sent."""
+    def send(self, message):
+        pass
+
+
+class MacroTest(unittest.TestCase):
+    def setUp(self):
+        self.editor = Editor(RemoteUI(Connection(), 24, 80))
+        self.addCleanup(self.editor.close)
+        self.buffer = self.editor.window_current.buffer
+        self.buffer.content = ''
+
+    def press(self, keys):
+        for key in keys.split():
+            self.editor.key_handle(Key(key))
+
+    def type(self, text):
+        for char in text:
+            self.editor.key_handle(Key(ord(char)))
+
+    def test_replay(self):
+        self.press('C-x ( a b C-x )')
+        self.press('C-x e')
+        self.assertEqual(self.buffer.content, 'abab')
+        self.assertEqual(self.editor.macro_report[0], 1)
+
+    def test_replay_count(self):
+        """C-x E prompts for the arguments of the replay in the command window."""
+        self.press('C-x ( a C-x )')
+        self.press('C-x S-e')
+        self.assertIs(self.editor.window_focused, self.editor._command_window)
+        self.type('3)')
+        self.press('C-j')
+        self.assertEqual(self.buffer.content, 'aaaa')
+        self.assertIs(self.editor.window_focused, self.editor.window_current)
+
+    def test_replay_pattern(self):
+        self.press('C-x ( x C-x )')
+        self.buffer.content = 'ab\nb\nac'
+        self.press('C-x S-e')
+        self.type("pattern='^a')")
+        self.press('C-j')
+        self.assertEqual(self.buffer.content, 'xab\nb\nxac')
+        self.buffer.history.undo()  # All the replays at once.
+        self.assertEqual(self.buffer.content, 'ab\nb\nac')
+
+
+if __name__ == '__main__':
+    unittest.main()
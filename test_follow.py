@@ -0,0 +1,57 @@
+"""Tests of the following of growing files."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from buffer import Buffer
+from journal import Journal
+
+
+class FollowTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, 'file.log')
+        self.append('line 0\nline 1\n')
+        self.buffer = Buffer()
+        self.buffer.file_open(self.path)
+        self.addCleanup(self.buffer.close)
+
+    def append(self, text):
+        with open(self.path, 'a') as f:
+            f.write(text)
+
+    def test_append(self):
+        """The text appended to the file is appended to the buffer, which is not modified."""
+        b = self.buffer
+        b.follow(max_lines=3)
+        self.append('line 2\nline 3\n')
+        b._idle()
+        self.assertEqual(list(b.lines), ['line 2', 'line 3', ''])
+        self.assertFalse(b.modified)
+
+    def test_stop(self):
+        """Once stopped, the changes to the file and the edits are detected again."""
+        b = self.buffer
+        b.follow(max_lines=3)
+        self.append('line 2\n')
+        b._idle()
+        b.follow_stop()
+        self.assertFalse(b.modified)
+        self.append('line 3\n')
+        b._idle()  # Reloaded, as it was not modified.
+        self.assertEqual(list(b.lines), ['line 0', 'line 1', 'line 2', 'line 3', ''])
+        b.text_insert('edited ', 0, 0)
+        self.assertTrue(b.modified)
+        b.close()
+        self.assertTrue(os.path.exists(Journal.path(self.path)))
+        recovered = Buffer()
+        recovered.file_open(self.path)
+        self.addCleanup(recovered.close)
+        self.assertEqual(recovered.lines[0], 'edited line 0')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+"""Tests of the undo/redo history: coalescing, groups and the memory bound."""
+
+import random
+import unittest
+
+from buffer import Buffer
+from test_journal import random_edit
+
+
+def type_text(buffer, text, line=0, column=0):
+    """Insert a text one character at a time, as typed."""
+    for char in text:
+        buffer.char_insert(char, line, column)
+        column += 1
+
+
+class HistoryTest(unittest.TestCase):
+    def setUp(self):
+        self.buffer = Buffer()
+        self.history = self.buffer.history_enable()
+
+    def undo_all(self):
+        """Undo all the steps, returning the content of the buffer after each one."""
+        contents = []
+        while self.history.can_undo():
+            self.history.undo()
+            contents.append(self.buffer.content)
+        return contents
+
+    def test_coalesce_words(self):
+        type_text(self.buffer, 'hello big world')
+        self.assertEqual(self.undo_all(), ['hello big ', 'hello ', ''])
+
+    def test_coalesce_limit(self):
+        self.history.coalesce_limit = 4
+        type_text(self.buffer, 'abcdefghij')
+        self.assertEqual(self.undo_all(), ['abcdefgh', 'abcd', ''])
+
+    def test_coalesce_deletions(self):
+        type_text(self.buffer, 'one two')
+        self.history.clear()
+        for column in range(7, 2, -1):  # Backspace over 'two', the space, and 'e'.
+            self.buffer.char_delete(0, column - 1)
+        self.buffer.char_delete(0, 0)  # Delete forward elsewhere.
+        self.assertEqual(self.undo_all(), ['on', 'one', 'one two'])
+
+    def test_no_coalesce_across_lines(self):
+        type_text(self.buffer, 'ab')
+        self.buffer.line_break(0, 2)
+        type_text(self.buffer, 'cd', line=1)
+        self.assertEqual(self.undo_all(), ['ab\n', 'ab', ''])
+
+    def test_amend(self):
+        type_text(self.buffer, 'word')
+        with self.buffer.batch(amend=True):
+            self.buffer.text_insert('!', 0, 4)
+        with self.buffer.batch():
+            self.buffer.text_insert('?', 0, 5)
+            self.buffer.text_insert('?', 0, 6)
+        self.assertEqual(self.undo_all(), ['word!', ''])
+
+    def test_redo_forgotten(self):
+        type_text(self.buffer, 'abc')
+        self.history.undo()
+        self.assertTrue(self.history.can_redo())
+        self.buffer.text_insert('x', 0, 0)
+        self.assertFalse(self.history.can_redo())
+
+    def test_memory_bound(self):
+        self.history.max_memory = 2000
+        for i in range(100):
+            self.buffer.text_insert('line {}\n'.format(i), i, 0)
+        self.assertLessEqual(self.history.memory, 2000)
+        steps = self.undo_all()
+        self.assertLess(len(steps), 100)
+        self.assertTrue(steps[-1].startswith('line 0\n'))
+
+    def test_random_undo_redo(self):
+        """Undoing and redoing random modifications goes through the same versions of the text."""
+        rng = random.Random(1)
+        for compact in (False, True):
+            for _ in range(20):
+                self.buffer = Buffer('\n'.join('line {} b a'.format(i) for i in range(20)))
+                self.buffer.compact = compact
+                self.buffer.rewrite_reset_size = rng.choice([0, 1 << 24])
+                self.history = self.buffer.history_enable()
+                contents = [self.buffer.content]
+                for _ in range(15):
+                    random_edit(self.buffer, rng)
+                    if self.buffer.content != contents[-1]:
+                        contents.append(self.buffer.content)
+                self.assertEqual(self.undo_all(), contents[-2::-1])
+                while self.history.can_redo():
+                    self.history.redo()
+                self.assertEqual(self.buffer.content, contents[-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
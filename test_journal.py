@@ -0,0 +1,104 @@
+"""Tests of the crash-recovery journal: replaying it recovers the modifications."""
+
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from buffer import Buffer
+from journal import Journal
+
+
+def random_edit(buffer, rng):
+    """Make a random modification of a buffer."""
+    lines = buffer.lines
+    line = rng.randrange(len(lines))
+    column = rng.randrange(len(lines[line]) + 1)
+    choice = rng.randrange(5)
+    if choice == 0:
+        buffer.text_insert(rng.choice(['x', 'é', 'ab\ncd', '\n', '日本']), line, column)
+    elif choice == 1:
+        end_line = rng.randrange(line, min(line + 3, len(lines)))
+        end_column = rng.randrange(column if end_line == line else 0, len(lines[end_line]) + 1)
+        buffer.text_delete(line, column, end_line, end_column)
+    elif choice == 2:
+        end = rng.randrange(line, len(lines) + 1)
+        buffer.lines_replace(line, end, ['r{}'.format(i) for i in range(rng.randrange(3))])
+    elif choice == 3:
+        buffer.replace(rng.choice(['a', r'\d', 'b\nc']), rng.choice(['', 'Z', 'y\ny']))
+    else:
+        buffer.lines_sort(range=(line, rng.randrange(line, len(lines) + 1)))
+
+
+class JournalTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'file.txt')
+        with open(self.path, 'w') as f:
+            f.write('\n'.join('line {} a b c'.format(i) for i in range(50)))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def reopen(self):
+        buffer = Buffer()
+        buffer.file_open(self.path)
+        self.addCleanup(buffer.close)
+        return buffer
+
+    def test_random_replay(self):
+        """Replay the journal of random modifications over the file, in both storage modes."""
+        rng = random.Random(0)
+        for compact in (False, True):
+            for _ in range(20):
+                buffer = self.reopen()
+                buffer.compact = compact
+                buffer.rewrite_reset_size = 0  # Record the line operations as ranges of lines.
+                for _ in range(30):
+                    random_edit(buffer, rng)
+                buffer.close()
+                self.assertEqual(self.reopen().content, buffer.content)
+                os.remove(Journal.path(self.path))
+
+    def test_reset(self):
+        buffer = self.reopen()
+        buffer.text_insert('hello', 0, 0)
+        buffer.content = 'replaced\ntext'
+        buffer.text_insert('!', 1, 4)
+        buffer.close()
+        self.assertEqual(self.reopen().content, 'replaced\ntext!')
+
+    def test_truncated_record(self):
+        """A record cut by a crash is ignored, the previous ones are replayed."""
+        buffer = self.reopen()
+        buffer.text_insert('first', 0, 0)
+        buffer.text_insert('second', 1, 0)
+        buffer.close()
+        with open(Journal.path(self.path), 'r+b') as journal:
+            journal.truncate(os.path.getsize(Journal.path(self.path)) - 1)
+        self.assertEqual(self.reopen().lines[:2], ['firstline 0 a b c', 'line 1 a b c'])
+
+    def test_file_changed(self):
+        """A journal of another version of the file is kept aside, not replayed."""
+        buffer = self.reopen()
+        buffer.text_insert('lost', 0, 0)
+        buffer.close()
+        with open(self.path, 'w') as f:
+            f.write('changed')
+        self.assertEqual(self.reopen().content, 'changed')
+        self.assertTrue(os.path.exists(Journal.path(self.path) + '~'))
+
+    def test_write_error(self):
+        """Editing goes on without the journal if it cannot be written."""
+        buffer = self.reopen()
+        shutil.rmtree(self.directory)
+        buffer.text_insert('x' * Journal.flush_size, 0, 0)
+        buffer.text_insert('y', 0, 0)
+        self.assertIsNone(buffer.journal)
+        self.assertIsInstance(buffer.file_error, OSError)
+        self.assertTrue(buffer.lines[0].startswith('yx'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+"""Tests of the keymaps: prefix tries of key sequences, with inheritance."""
+
+import random
+import unittest
+
+from key import Key
+from keymap import Keymap
+
+
+class KeymapTest(unittest.TestCase):
+    def setUp(self):
+        self.called = []
+
+    def command(self, name):
+        return lambda: self.called.append(name)
+
+    def press(self, keymap, keys):
+        """Press the keys of a sequence, returning whether each was handled."""
+        return [keymap.key_handle(Key(key)) for key in keys.split()]
+
+    def test_sequences(self):
+        keymap = Keymap({'C-x C-s': self.command('save'), 'C-x C-c': self.command('quit'),
+                         'a': self.command('a')})
+        self.assertEqual(self.press(keymap, 'C-x C-s a'), [True, True, True])
+        self.assertEqual(self.called, ['save', 'a'])
+        self.assertFalse(keymap.pending)
+        self.press(keymap, 'C-x')
+        self.assertTrue(keymap.pending)
+
+    def test_broken_sequence(self):
+        """A key breaking a pending sequence is discarded, the next ones are handled."""
+        keymap = Keymap({'C-x C-s': self.command('save'), 'a': self.command('a')})
+        self.assertEqual(self.press(keymap, 'C-x a a b'), [True, True, True, False])
+        self.assertEqual(self.called, ['a'])
+
+    def test_timeout(self):
+        keymap = Keymap({'C-x C-s': self.command('save'), 'C-s': self.command('search')}, timeout=0)
+        self.press(keymap, 'C-x C-s')
+        self.assertEqual(self.called, ['search'])
+
+    def test_rebind(self):
+        keymap = Keymap({'C-x C-s': self.command('save'), 'C-x C-c': self.command('quit')})
+        keymap.bind('C-x', self.command('x'))  # Replaces the sequences it prefixes.
+        self.assertNotIn('C-x C-s', keymap)
+        keymap['C-x C-f'] = self.command('find')  # Replaces the binding of its prefix.
+        self.assertIsInstance(keymap['C-x'], dict)
+        del keymap['C-x C-f']
+        self.assertNotIn('C-x', keymap)
+        with self.assertRaises(KeyError):
+            del keymap['C-x']
+        keymap.bind('C-x', self.command('x'))
+        self.assertNotIn('C-x C-s', keymap)  # Extends a bound sequence.
+        with self.assertRaises(KeyError):
+            del keymap['C-x C-s']
+        with self.assertRaises(ValueError):
+            keymap.bind('', self.command('empty'))
+
+    def test_inheritance(self):
+        parent = Keymap({'C-x C-s': self.command('save'), 'C-x C-c': self.command('quit'),
+                         'b': self.command('b')})
+        child = Keymap({'C-x C-c': self.command('close'), 'C-x k': self.command('kill')}, parent)
+        self.press(child, 'C-x C-c C-x C-s C-x k b')
+        self.assertEqual(self.called, ['close', 'save', 'kill', 'b'])
+        parent.bind('b', self.command('B'))  # Seen by the children.
+        parent.bind('C-x C-c', self.command('exit'))  # Overridden.
+        self.press(child, 'b C-x C-c')
+        self.assertEqual(self.called[-2:], ['B', 'close'])
+        self.press(parent, 'C-x C-c')
+        self.assertEqual(self.called[-1], 'exit')
+
+    def test_random_bindings(self):
+        """Compare the lookups with a dictionary of the sequences bound, and their prefixes."""
+        rng = random.Random(0)
+        keys = ['a', 'b', 'C-x', 'M-c']
+        for _ in range(50):
+            parent, reference = Keymap(), [{}, {}]
+            child = Keymap(parent=parent)
+            for _ in range(30):
+                level = rng.randrange(2)
+                keymap, bound = (parent, child)[level], reference[level]
+                sequence = tuple(rng.choice(keys) for _ in range(rng.randrange(1, 4)))
+                if rng.random() < 0.3 and sequence in bound:
+                    keymap.unbind(' '.join(sequence))
+                    del bound[sequence]
+                else:
+                    keymap.bind(' '.join(sequence), sequence)
+                    # A binding replaces the ones of its prefixes, and those it prefixes.
+                    for other in list(bound):
+                        if other[:len(sequence)] == sequence or sequence[:len(other)] == other:
+                            del bound[other]
+                    bound[sequence] = sequence
+                merged = dict(reference[0])
+                for sequence, command in reference[1].items():
+                    for other in list(merged):
+                        if other[:len(sequence)] == sequence or sequence[:len(other)] == other:
+                            del merged[other]
+                    merged[sequence] = command
+                for sequence in {s[:n] for s in merged for n in range(1, len(s) + 1)} | set(merged):
+                    target = child.lookup(' '.join(sequence))
+                    if sequence in merged:
+                        self.assertEqual(target, merged[sequence])
+                    else:
+                        self.assertIsInstance(target, dict)
+                for sequence, command in reference[0].items():
+                    self.assertEqual(parent.lookup(' '.join(sequence)), command)
+
+
+if __name__ == '__main__':
+    unittest.main()
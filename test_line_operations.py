@@ -0,0 +1,127 @@
+"""Tests of the operations on ranges of lines, against sorted and re."""
+
+import random
+import re
+import unittest
+
+from buffer import Buffer
+from sorting import number_key
+
+WORDS = ['', 'a', 'B', 'b', '10', '9', ' 2.5', '-3', '1e2', 'x y', 'é', 'a\tb c']
+
+
+class LineOperationsTest(unittest.TestCase):
+    def buffers(self, lines):
+        """Create buffers containing lines: in list mode, and in compact mode
+        with the ranges streamed and sorted in many runs merged from files.
+        """
+        buffer = Buffer('\n'.join(lines))
+        compact = Buffer('\n'.join(lines))
+        compact.compact = True
+        compact.rewrite_reset_size = 0
+        compact.sort_run_size = 300
+        return buffer, compact
+
+    def random_test(self, operation, reference, changed=False):
+        """Compare an operation on random ranges of random lines with a reference
+        function on the list of the lines of the range, and the count it returns
+        with the number of lines removed (or changed).
+        """
+        rng = random.Random(0)
+        for _ in range(100):
+            lines = [rng.choice(WORDS) + rng.choice(WORDS) for _ in range(rng.randrange(1, 80))]
+            start = rng.randrange(len(lines))
+            end = rng.randrange(start, len(lines) + 1)
+            expected = reference(lines[start: end])
+            result = lines[:start] + expected + lines[end:]
+            for buffer in self.buffers(lines):
+                buffer.history_enable()
+                count = operation(buffer, (start, end))
+                self.assertEqual(list(buffer.lines), result or [''])
+                if changed:
+                    self.assertEqual(count, sum(map(str.__ne__, expected, lines[start: end])))
+                else:
+                    self.assertEqual(count, end - start - len(expected))
+                if buffer.history.can_undo():
+                    buffer.history.undo()
+                self.assertEqual(list(buffer.lines), lines)
+
+    def test_sort(self):
+        def sort(buffer, range):
+            return buffer.lines_sort(range=range)
+        self.random_test(sort, sorted)
+
+    def test_sort_options(self):
+        def sort(buffer, range):
+            return buffer.lines_sort(key=str.lower, numeric=True, reverse=True, range=range)
+        self.random_test(sort, lambda lines: sorted(lines, key=lambda line: number_key(line.lower()), reverse=True))
+
+    def test_sort_unique(self):
+        def sort(buffer, range):
+            return buffer.lines_sort(key=str.lower, unique=True, range=range)
+
+        def reference(lines):
+            result = []
+            for line in sorted(lines, key=str.lower):
+                if not result or result[-1].lower() != line.lower():
+                    result.append(line)
+            return result
+        self.random_test(sort, reference)
+
+    def test_unique(self):
+        def unique(buffer, range):
+            return buffer.lines_unique(range=range)
+        self.random_test(unique, lambda lines: list(dict.fromkeys(lines)))
+
+    def test_filter(self):
+        for pattern in (r'a', r'^\d+$', r'[éB]'):
+            def keep(buffer, range):
+                return buffer.lines_filter(pattern, range=range)
+
+            def remove(buffer, range):
+                return buffer.lines_filter(re.compile(pattern), keep=False, range=range)
+            self.random_test(keep, lambda lines: [line for line in lines if re.search(pattern, line)])
+            self.random_test(remove, lambda lines: [line for line in lines if not re.search(pattern, line)])
+
+    def test_columns(self):
+        def columns(buffer, range):
+            return buffer.lines_columns([1, -1], range=range)
+
+        def reference(lines):
+            result = []
+            for line in lines:
+                fields = line.split()
+                result.append(' '.join(fields[i] for i in (1, -1) if -len(fields) <= i < len(fields)))
+            return result
+        self.random_test(columns, reference, changed=True)
+
+    def test_columns_separator(self):
+        def columns(buffer, range):
+            return buffer.lines_columns([0, 2], separator='\t', range=range)
+        self.random_test(columns, lambda lines: ['\t'.join(line.split('\t')[i] for i in (0, 2)
+                                                           if i < len(line.split('\t'))) for line in lines],
+                         changed=True)
+
+    def test_whole_buffer(self):
+        for buffer in self.buffers(['b', 'a', 'b', 'c']):
+            self.assertEqual(buffer.lines_filter('x'), 4)
+            self.assertEqual(list(buffer.lines), [''])
+            self.assertEqual(buffer.lines_filter('x'), 1)
+            self.assertEqual(list(buffer.lines), [''])
+
+    def test_overlays_kept(self):
+        """The overlays outside the range replaced are kept, those in it move to its end."""
+        lines = ['line {}'.format(i) for i in range(10, 0, -1)]
+        for buffer in self.buffers(lines):
+            tree = buffer.overlays_enable()
+            before = tree.add((1, 0), (1, 4), None)
+            inside = tree.add((4, 0), (4, 4), None)
+            after = tree.add((9, 2), (9, 4), None)
+            self.assertEqual(buffer.lines_filter('1', keep=False, range=(2, 8)), 0)
+            buffer.lines_filter('[57]', keep=False, range=(2, 8))
+            self.assertEqual([(overlay.start, overlay.end) for overlay in (before, inside, after)],
+                             [((1, 0), (1, 4)), ((5, 6), (5, 6)), ((7, 2), (7, 4))])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+"""Tests of the storages of the lines, against plain lists."""
+
+import random
+import unittest
+from array import array
+from unittest import mock
+
+from lines import BlockList, BlockSequence, CompactLines
+
+WORDS = ['', 'a', 'bc', 'déf', '日本語', 'x' * 20]
+
+
+class LinesTest(unittest.TestCase):
+    def setUp(self):
+        # Small blocks and storages, to split, merge and compact them often.
+        for patch in (mock.patch.object(BlockSequence, 'block_size', 4),
+                      mock.patch.object(CompactLines, '_compact_min', 64)):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def check(self, lines, reference):
+        self.assertEqual(len(lines), len(reference))
+        self.assertEqual(list(lines), reference)
+        self.assertEqual(list(reversed(lines)), reference[::-1])
+        self.assertEqual([lines[i] for i in range(-len(reference), len(reference))], reference * 2)
+        if isinstance(lines, CompactLines):
+            self.assertEqual(lines.to_bytes(), '\n'.join(reference).encode())
+
+    def random_test(self, cls):
+        """Apply the same random operations to lines and a list, and their copies."""
+        rng = random.Random(0)
+        for _ in range(20):
+            reference = [rng.choice(WORDS) for _ in range(rng.randrange(30))]
+            lines = cls(reference)
+            copies = []
+            for _ in range(100):
+                n = len(reference)
+                start = rng.randrange(n + 1)
+                end = rng.randrange(start, n + 1)
+                new = [rng.choice(WORDS) for _ in range(rng.randrange(10))]
+                choice = rng.randrange(7)
+                if choice == 0:
+                    lines[start: end] = reference[start: end] = new
+                elif choice == 1 and n:
+                    index = rng.randrange(-n, n)
+                    lines[index] = reference[index] = new[0] if new else 'z'
+                elif choice == 2:
+                    del lines[start: end]
+                    del reference[start: end]
+                elif choice == 3:
+                    lines.insert(start, 'ins')
+                    reference.insert(start, 'ins')
+                elif choice == 4:
+                    lines.extend(new)
+                    reference.extend(new)
+                elif choice == 5:
+                    runs = sorted({rng.randrange(n + 1) for _ in range(6)})
+                    runs = [(a, b, [rng.choice(WORDS)]) for a, b in zip(runs[::2], runs[1::2])]
+                    lines.replace_ranges(runs)
+                    for a, b, replacement in reversed(runs):
+                        reference[a: b] = replacement
+                else:
+                    copies.append((lines.copy(), list(reference)))
+                self.assertEqual(lines[start: end], reference[start: end])
+            self.check(lines, reference)
+            for copy, copied in copies:
+                self.check(copy, copied)
+
+    def test_block_list(self):
+        self.random_test(BlockList)
+
+    def test_compact_lines(self):
+        self.random_test(CompactLines)
+
+    def test_errors(self):
+        for lines in (BlockList(['a', 'b']), CompactLines(['a', 'b'])):
+            with self.assertRaises(IndexError):
+                lines[2]
+            with self.assertRaises(IndexError):
+                lines[-3]
+            self.assertEqual(lines[::-1], ['b', 'a'])
+        self.assertEqual(BlockList(['a', 'b']), ['a', 'b'])  # Compares as the list it replaces.
+        self.assertNotEqual(BlockList(['a', 'b']), ['a', 'c'])
+
+    def test_from_bytes(self):
+        for text in ('', 'a', 'a\n', '\n\n', 'é\nb\n\nc', 'x\n' * 50):
+            data = text.encode()
+            self.check(CompactLines.from_bytes(data), text.split('\n'))
+            if text.endswith('\n'):
+                self.check(CompactLines.from_bytes(data, terminated=True), text.split('\n')[:-1])
+
+    def test_index(self):
+        lines = CompactLines(WORDS * 5)
+        lines[3: 10] = ['new', 'lines']
+        data, starts, lengths = lines.index
+        self.check(CompactLines.from_index(data, starts, lengths), list(lines))
+        copy = CompactLines.from_index(data, starts, lengths)
+        copy.extend_index(b'12\n345', array('Q', [2, 5]), array('I', [2, 3]), offset=2)  # From b'..12\n345'.
+        self.check(copy, list(lines) + ['12', '345'])
+
+    def test_range(self):
+        reference = [WORDS[i % len(WORDS)] for i in range(40)]
+        lines = CompactLines(reference)
+        lines[5: 7] = ['changed']
+        reference[5: 7] = ['changed']
+        for start, end in ((0, 0), (0, 39), (3, 17), (38, 39)):
+            self.assertEqual(list(lines.iter_range(start, end)), reference[start: end])
+            self.assertEqual(lines.to_bytes(start, end), '\n'.join(reference[start: end]).encode())
+            self.assertEqual(lines.size(start, end), len(''.join(reference[start: end]).encode()))
+
+    def test_compact(self):
+        lines = CompactLines(['line {}'.format(i) for i in range(20)])
+        copy = lines.copy()
+        for i in range(20):
+            lines[i] = 'changed {}'.format(i)
+        self.assertLess(len(lines.data), 2 * len(lines.to_bytes()) + 64)
+        self.assertEqual(list(copy), ['line {}'.format(i) for i in range(20)])
+        lines.compact()
+        self.assertEqual(len(lines.data), len(lines.to_bytes()))
+        self.check(lines, ['changed {}'.format(i) for i in range(20)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+"""Tests of the progressive loading of files, against reading them at once."""
+
+import gzip
+import os
+import random
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from buffer import Buffer
+from line_cache import LineIndexCache
+from loader import Loader
+
+
+class LoaderTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        # Tiny chunks, so that lines, newlines and characters are split between them.
+        for patch in (mock.patch.object(Loader, 'first_size', 7), mock.patch.object(Loader, 'chunk_size', 13)):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def write(self, text, name='file.txt'):
+        path = os.path.join(self.directory, name)
+        with (gzip.open if name.endswith('.gz') else open)(path, 'wb') as f:
+            f.write(text.encode())
+        return path
+
+    def open(self, path, progressive, compact):
+        buffer = Buffer()
+        buffer.line_cache = None
+        buffer.load_size = 0 if progressive else 1 << 30
+        buffer.compact_size = 0 if compact else 1 << 30
+        buffer.file_open(path, journal=False)
+        self.addCleanup(buffer.close)
+        return buffer
+
+    def test_random_files(self):
+        """Load random files progressively, in both storage modes."""
+        rng = random.Random(0)
+        pieces = ['a', 'bc ', '\n', '\r\n', '\r', 'é', '日本', '😀', '']
+        for _ in range(30):
+            path = self.write(''.join(rng.choice(pieces) for _ in range(rng.randrange(200))))
+            expected = self.open(path, progressive=False, compact=False).content
+            for compact in (False, True):
+                buffer = self.open(path, progressive=True, compact=compact)
+                buffer._load_finish()
+                self.assertEqual(buffer.content, expected)
+                self.assertFalse(buffer.modified)
+                self.assertIsNone(buffer.file_error)
+
+    def test_first_lines(self):
+        """Only the first lines are loaded before returning, the others while idle."""
+        path = self.write(''.join('line {}\n'.format(i) for i in range(1000)))
+        buffer = self.open(path, progressive=True, compact=False)
+        self.assertTrue(buffer.loading)
+        self.assertLess(len(buffer.lines), 1000)
+        self.assertEqual(buffer.lines[0], 'line 0')
+        while buffer.loading:
+            buffer._load_step(block=True)
+        self.assertEqual(len(buffer.lines), 1001)
+        self.assertEqual(buffer.load_progress, 1.0)
+
+    def test_edit_while_loading(self):
+        path = self.write(''.join('line {}\n'.format(i) for i in range(1000)))
+        for compact in (False, True):
+            buffer = self.open(path, progressive=True, compact=compact)
+            buffer.history_enable()
+            buffer.text_insert('edited ', 0, 0)
+            buffer._load_finish()
+            self.assertTrue(buffer.modified)
+            self.assertEqual(buffer.lines[0], 'edited line 0')
+            self.assertEqual(buffer.lines[999], 'line 999')
+            buffer.history.undo()
+            self.assertEqual(buffer.lines[0], 'line 0')
+
+    def test_compressed(self):
+        text = ''.join('line {} é\n'.format(i) for i in range(500))
+        path = self.write(text, 'file.txt.gz')
+        for compact in (False, True):
+            buffer = self.open(path, progressive=False, compact=compact)
+            buffer._load_finish()
+            self.assertEqual(buffer.content, text)
+
+    def test_invalid_utf8(self):
+        """A decoding error stops the loading, keeping the lines loaded."""
+        path = os.path.join(self.directory, 'file.txt')
+        with open(path, 'wb') as f:
+            f.write(b'valid line\n' * 10 + b'\xff\n' + b'more\n' * 10)
+        for compact in (False, True):
+            buffer = self.open(path, progressive=True, compact=compact)
+            buffer._load_finish()
+            self.assertIsInstance(buffer.file_error, UnicodeDecodeError)
+            self.assertEqual(buffer.lines[0], 'valid line')
+
+    def test_cache_out_of_date(self):
+        """A cached index not matching the file, changed in bytes not sampled
+        without changing its size or modification time, is discarded.
+        """
+        path = self.write(''.join('line {}\n'.format(i) for i in range(300)))
+        cache = LineIndexCache(os.path.join(self.directory, 'cache'), min_size=0)
+        with mock.patch.object(LineIndexCache, '_sample_size', 16):
+            buffer = self.open(path, progressive=True, compact=True)
+            buffer.line_cache = cache
+            buffer.file_open(path, journal=False)
+            buffer._load_finish()
+            for thread in threading.enumerate():
+                if thread.name.startswith('cache '):
+                    thread.join()
+            stat = os.stat(path)
+            self.assertIsNotNone(cache.load(path, stat))
+
+            with open(path, 'r+b') as f:
+                f.seek(1000)
+                data = f.read(20)
+                f.seek(1000)
+                f.write(data.replace(b'\n', b' '))
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            self.assertIsNotNone(cache.load(path, os.stat(path)))
+            buffer.file_open(path, journal=False)
+            buffer._load_finish()
+            with open(path) as f:
+                self.assertEqual(buffer.content, f.read())
+            self.assertIsNone(buffer.file_error)
+            self.assertFalse(buffer.modified)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+"""Tests of the overlays following the edits of the text."""
+
+import random
+import unittest
+
+from buffer import Buffer
+
+
+def offset(lines, position):
+    """Get the offset of a position in the text of lines joined with newlines."""
+    return sum(len(text) + 1 for text in lines[:position[0]]) + position[1]
+
+
+class OverlayTest(unittest.TestCase):
+    def test_insert_at_start(self):
+        buffer = Buffer('hello world')
+        overlay = buffer.overlays_enable().add((0, 6), (0, 11), None)
+        buffer.text_insert('XX', 0, 6)
+        self.assertEqual((overlay.start, overlay.end), ((0, 8), (0, 13)))
+        buffer.text_insert('a\nb', 0, 8)
+        self.assertEqual((overlay.start, overlay.end), ((1, 1), (1, 6)))
+
+    def test_insert_at_end(self):
+        buffer = Buffer('hello world')
+        overlay = buffer.overlays_enable().add((0, 0), (0, 5), None)
+        buffer.text_insert('XX', 0, 5)
+        buffer.text_insert('a\nb', 0, 5)
+        self.assertEqual((overlay.start, overlay.end), ((0, 0), (0, 5)))
+
+    def test_insert_in_empty(self):
+        buffer = Buffer('hello world')
+        overlay = buffer.overlays_enable().add((0, 5), (0, 5), None)
+        buffer.text_insert('XX', 0, 5)
+        self.assertEqual((overlay.start, overlay.end), ((0, 7), (0, 7)))
+        buffer.text_insert('a\nb', 0, 7)
+        self.assertEqual((overlay.start, overlay.end), ((1, 1), (1, 1)))
+
+    def test_random_edits(self):
+        """Compare the overlays with their offsets in the text, moved by every edit."""
+        rng = random.Random(0)
+        for _ in range(100):
+            buffer = Buffer('\n'.join('abcdefgh' for _ in range(5)))
+            tree = buffer.overlays_enable()
+            overlays = {}
+            for _ in range(10):
+                line = rng.randrange(5)
+                start, end = sorted(rng.randrange(9) for _ in range(2))
+                overlay = tree.add((line, start), (line, end), None)
+                overlays[overlay] = [offset(buffer.lines, overlay.start), offset(buffer.lines, overlay.end)]
+            for _ in range(20):
+                lines = buffer.lines
+                line = rng.randrange(len(lines))
+                column = rng.randrange(len(lines[line]) + 1)
+                position = offset(lines, (line, column))
+                if rng.random() < 0.5:
+                    text = rng.choice(['x', 'xy', '\n', 'x\ny', 'x\n\ny'])
+                    buffer.text_insert(text, line, column)
+                    for start_end in overlays.values():
+                        start, end = start_end
+                        start_end[0] = start + len(text) if start >= position else start
+                        start_end[1] = end + len(text) if end > position or start >= position else end
+                else:
+                    end_line = rng.randrange(line, len(lines))
+                    end_column = rng.randrange(column if end_line == line else 0, len(lines[end_line]) + 1)
+                    stop = offset(lines, (end_line, end_column))
+                    buffer.text_delete(line, column, end_line, end_column)
+                    for start_end in overlays.values():
+                        start_end[:] = [position if position <= p <= stop else p - (stop - position) if p > stop else p
+                                        for p in start_end]
+                for overlay, (start, end) in overlays.items():
+                    self.assertEqual([offset(buffer.lines, overlay.start), offset(buffer.lines, overlay.end)],
+                                     [start, end])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+"""Tests of the editor server: errors only affect the client causing them, and
+only the user can attach to it."""
+
+import argparse
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from key import Key
+from remote import connect, socket_path
+from server import Server
+from yugen import arguments_parse
+
+
+class ServerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.server = Server(os.path.join(self.directory.name, 'yugen.sock'))
+        self.server.listen()
+
+    def tearDown(self):
+        self.server.close()
+        self.directory.cleanup()
+
+    def attach(self, file_name=None):
+        connection = connect(self.server.path)
+        connection.send(['hello', 24, 80, file_name])
+        connection.flush()
+        self.step()
+        return connection
+
+    def step(self):
+        for _ in range(3):
+            self.server.step(0.01)
+
+    def received(self, connection):
+        messages = []
+        while True:
+            received = connection.receive()
+            if not received:
+                return messages if received is not None else None
+            messages.extend(received)
+
+    def status(self, connection):
+        editor = self.server._clients[self.server_connection(connection)]
+        return editor._status_window.buffer.lines[0]
+
+    def server_connection(self, connection):
+        """Get the server's end of a client's connection, attached in the same order."""
+        return list(self.server._clients)[self.connections.index(connection)]
+
+    def test_missing_file(self):
+        first = self.attach()
+        second = self.attach(os.path.join(self.directory.name, 'missing', 'file.txt'))
+        self.connections = [first, second]
+        self.assertEqual(self.server.clients(), 2)
+        self.assertIn('cannot open', self.status(second))
+        self.assertIsNotNone(self.received(first))
+
+    def test_failing_command(self):
+        first = self.attach()
+        second = self.attach()
+        self.connections = [first, second]
+        editor = self.server._clients[self.server_connection(second)]
+        editor.key_bindings.bind(Key('C-t'), lambda: 1 / 0)
+        key = Key('C-t')
+        second.send(['key', key.key, key.ctrl, key.meta])
+        second.flush()
+        self.step()
+        self.assertEqual(self.server.clients(), 2)
+        self.assertIn('ZeroDivisionError', self.status(second))
+
+    def test_malformed_message(self):
+        first = self.attach()
+        second = self.attach()
+        second.send(['key', 'not a key', None])
+        second.flush()
+        self.step()
+        self.assertEqual(self.server.clients(), 1)
+        self.assertIsNone(self.received(second))
+        self.assertIsNotNone(self.received(first))
+
+
+class SocketPathTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        patches = [mock.patch.dict(os.environ), mock.patch.object(tempfile, 'tempdir', self.directory.name)]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        os.environ.pop('XDG_RUNTIME_DIR', None)
+        self.addCleanup(self.directory.cleanup)
+
+    def test_private_directory(self):
+        path = socket_path()
+        status = os.stat(os.path.dirname(path))
+        self.assertEqual(os.path.dirname(os.path.dirname(path)), self.directory.name)
+        self.assertEqual(status.st_uid, os.getuid())
+        self.assertEqual(status.st_mode & 0o777, 0o700)
+        self.assertEqual(socket_path(), path)
+
+    def test_directory_not_private(self):
+        directory = os.path.dirname(socket_path())
+        os.chmod(directory, 0o777)
+        with self.assertRaises(PermissionError):
+            socket_path()
+        os.rmdir(directory)
+        os.symlink(self.directory.name, directory)
+        with self.assertRaises(PermissionError):
+            socket_path()
+
+    def test_runtime_directory(self):
+        os.environ['XDG_RUNTIME_DIR'] = self.directory.name
+        self.assertEqual(os.path.dirname(socket_path()), self.directory.name)
+
+
+class ArgumentsTest(unittest.TestCase):
+    def test_fast_path(self):
+        for argv in (['--client', 'file.txt'], ['--client', '--socket', 'yugen.sock', 'file.txt'],
+                     ['--socket=yugen.sock', '--client', '--', 'file.txt']):
+            args = arguments_parse(argv)
+            self.assertNotIsInstance(args, argparse.Namespace)
+            self.assertTrue(args.client)
+            self.assertEqual(args.file, 'file.txt')
+        self.assertEqual(arguments_parse(['--', '--client']).file, '--client')
+        self.assertEqual(arguments_parse(['--startup-budget=20']).startup_budget, 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+"""Tests of the column maps of lines, against the widths of their characters."""
+
+import random
+import unittest
+
+from width import char_width, line_columns
+
+
+def widths(text, tab_size):
+    """Get the number of screen cells of each character of a line, one at a time."""
+    result = []
+    screen = 0
+    flag = False  # Whether the previous character starts a flag.
+    for column, char in enumerate(text):
+        if char == '\t':
+            width = tab_size - screen % tab_size
+        elif column and text[column-1] == '\u200d' and not char.isascii():
+            width = 0
+        elif '\U0001f1e6' <= char <= '\U0001f1ff':
+            width = 0 if flag else 2
+        else:
+            width = char_width(char) or (0 if column else 1)
+        flag = '\U0001f1e6' <= char <= '\U0001f1ff' and width == 2
+        result.append(width)
+        screen += width
+    return result
+
+
+class WidthTest(unittest.TestCase):
+    def check(self, text, tab_size=8):
+        column_map = line_columns(text, tab_size)
+        cells = widths(text, tab_size)
+        starts = [sum(cells[:column]) for column in range(len(text) + 1)]
+        if column_map is None:
+            self.assertEqual(starts, list(range(len(text) + 1)))
+            return
+        self.assertEqual(column_map.width, starts[-1])
+        self.assertEqual([column_map.screen(column) for column in range(len(text) + 1)], starts)
+        boundaries = [column == len(text) or cells[column] > 0 for column in range(len(text) + 1)]
+        self.assertEqual([column_map.boundary(column) for column in range(len(text))], boundaries[:-1])
+        for screen in range(starts[-1] + 3):
+            expected = max(column for column in range(len(text) + 1) if boundaries[column] and starts[column] <= screen)
+            self.assertEqual(column_map.column(screen), expected, (text, screen))
+        for start in range(len(text) + 1):
+            end = min(len(text), start + 5)
+            self.assertEqual(column_map.cells(start, end), [starts[c] - starts[start] for c in range(start, end + 1)])
+
+    def test_examples(self):
+        self.assertIsNone(line_columns('plain ascii'))
+        self.assertEqual(line_columns('a\tb').width, 9)
+        self.assertEqual(line_columns('a\tb', 4).width, 5)
+        self.assertEqual(line_columns('日本').width, 4)
+        self.assertEqual(line_columns('e\u0301').width, 1)  # Combining mark.
+        self.assertEqual(line_columns('🇫🇷🇩🇪').width, 4)  # Two flags.
+        self.assertEqual(line_columns('👩\u200d👩\u200d👧').width, 2)  # Joined emoji.
+        self.assertEqual(line_columns('\x01').width, 2)  # Shown as ^A.
+        for text in ('a\tb', '日本\t語', 'e\u0301\u0302x', '🇫🇷🇩🇪🇫', '\u0301a', '👍🏽!'):
+            self.check(text)
+
+    def test_random_lines(self):
+        rng = random.Random(0)
+        chars = ['a', ' ', '\t', '日', '\u0301', '\u200d', '👩', '🇫', '🇷', '\x01', '\xad', '\u200b', '🏽']
+        for _ in range(500):
+            self.check(''.join(rng.choice(chars) for _ in range(rng.randrange(12))), rng.choice([1, 4, 8]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,16 +1,39 @@
 """Implementation of editor's text windows."""
 
 import re
+from bisect import bisect_left
 
 from attribute import Color, Property
+from fold import IndentIndex
 from key import Key
+from keymap import Keymap
+from lines import lines_renumber
 from window import Window
+from wrap import row_index
+
+
+# Background of the lines changed compared to the file, indexed by LineChange.
+_change_colors = (None, Color.DarkGreen, Color.NavyBlue, Color.DarkRed)
 
 
 class TextWindow(Window):
     """Class representing a window for text editing.
 
-    It supports a cursor and the modification of text.
+    It supports a cursor and the modification of text. The cursor moves
+    by grapheme clusters, and vertical motions keep it in the same screen
+    column. In wrap mode, they move it by rows instead of lines.
+
+    Additional cursors can be added, at the matches of a pattern or on
+    a range of lines: insertions, deletions and line breaks then take
+    place at every cursor, as a single modification of the buffer.
+
+    Blocks of indented lines can be folded (see IndentIndex): vertical
+    motions skip the folded lines, and moving the cursor to a folded line
+    unfolds it. The header of a fold is underlined.
+
+    If the buffer is compared with its file (see Buffer.diff_enable),
+    the lines added or modified are shown on a colored background, and
+    the first character following deleted lines on a red one.
     """
     def __init__(self, *args, **kwargs):
         """Initialize a TextWindow object.
@@ -18,22 +41,43 @@ class TextWindow(Window):
         See parent constructor (Window.__init__) for details.
         """
         self.__cursor = (0, 0)
-        self._target_column = 0
+        self._target_column = 0   # Screen column of vertical motions.
+        self._completions = None  # State of the last completion, to cycle through them.
+        self._cursors = []        # Positions of the additional cursors, sorted.
+        self._indents = IndentIndex()
 
         super().__init__(*args, **kwargs)
 
-        self.key_bindings = {
+        self.key_bindings = Keymap({
             Key('C-j'): self.line_break,
             Key('M-i'): self.cursor_up,
             Key('M-k'): self.cursor_down,
             Key('M-j'): self.cursor_back,
             Key('M-l'): self.cursor_forward,
+            Key('M-u'): self.cursor_word_back,
+            Key('M-o'): self.cursor_word_forward,
+            Key('M-S-u'): self.cursor_subword_back,
+            Key('M-S-o'): self.cursor_subword_forward,
+            Key('M-S-i'): self.cursor_paragraph_back,
+            Key('M-S-k'): self.cursor_paragraph_forward,
             Key('DEL'): self.char_delete_before,
             Key('DC'):  self.char_delete,
             Key('C-d'): self.char_delete,
             Key('M-b'): self.cursor_begin,
             Key('M-e'): self.cursor_end,
-        }
+            Key('M-/'): self.complete,
+            Key('C-g'): self.cursors_clear,
+            'C-x w': self.wrap_toggle,
+            'C-x f': self.fold_toggle,
+            'C-x S-f': self.unfold_all,
+            Key('C-z'): self.undo,
+            Key('M-z'): self.redo,
+        }, parent=self._editor.key_bindings)
+
+    @Window.buffer.setter
+    def buffer(self, buffer):
+        Window.buffer.fset(self, buffer)
+        buffer.history_enable()
 
     def _format(self, line):
         """Format a line of the buffer for visualization.
@@ -54,15 +98,123 @@ class TextWindow(Window):
         for m in re.finditer(r"def\b", content):
             attributes[m.start(): m.end()] = [((Color.LightRed, Color.Black), Property.Default)] * len(m.group())
 
+        # Overlays on the line, the higher priorities above the others.
+        overlays = self._buffer.overlays
+        if overlays:
+            found = overlays.find((line, 0), (line + 1, 0))
+            for start, end, overlay in sorted(found, key=lambda span: span[2].priority):
+                last = min(end[1], len(content)) if end[0] == line else len(content)
+                first = min(start[1] if start[0] == line else 0, last)
+                attributes[first: last] = [overlay.attributes] * (last - first)
+
+        # Change compared to the file.
+        diff = self._buffer.diff
+        change = diff.line_change(line) if diff else 0
+        if change:
+            from diff import LineChange  # Loaded with the diff (see Buffer.diff_enable).
+            background = _change_colors[change]
+            changed = attributes[:1] if change == LineChange.Deleted else attributes
+            changed = [((Color.White if colors == Color.Defaults else colors[0], background), properties)
+                       for colors, properties in changed]
+            attributes[:len(changed)] = changed
+
+        # Header of a fold.
+        if self._folds.hidden(line + 1) and not self._folds.hidden(line):
+            attributes = [(colors, properties | Property.Underlined) for colors, properties in attributes]
+
+        # Additional cursors (not shown at the end of their line).
+        i = bisect_left(self._cursors, (line, 0))
+        while i < len(self._cursors) and self._cursors[i][0] == line:
+            column = self._cursors[i][1]
+            if column < len(attributes):
+                attributes[column] = attributes[column][0], Property.Reversed
+            i += 1
+
         return content, attributes
 
     def _update(self):
         """Reload the window from its associated buffer.
         Overrides Window._update.
         """
+        self._cursors = []
+        self._indents.clear()
         super()._update()
         self.cursor_begin()
 
+    def _line_update(self, line):
+        """Update a buffer line, keeping the cursor on its character in wrap mode,
+        where the rows of the following lines may move. Overrides Window._line_update.
+        """
+        super()._line_update(line)
+        self._indents.line_update(self._buffer.lines, line)
+        # Lines following an updated one may be about to be inserted or deleted.
+        if self._wrap and line <= self.__cursor[0] < len(self._buffer.lines):
+            self.cursor = self.__cursor
+
+    def _lines_insert(self, line, count):
+        """Insert consecutive new buffer lines, keeping the cursor on its line.
+        Overrides Window._lines_insert.
+        """
+        super()._lines_insert(line, count)
+        self._indents.lines_insert(self._buffer.lines, line, count)
+        if self.__cursor[0] >= line:
+            self.cursor = self.__cursor[0] + count, self.__cursor[1]
+        if self._cursors:
+            self._cursors_renumber([(line, 0, count)])
+
+    def _lines_delete(self, line, count):
+        """Delete consecutive buffer lines, keeping the cursor on its line
+        (or where the deleted lines were). Overrides Window._lines_delete.
+        """
+        super()._lines_delete(line, count)
+        self._indents.lines_delete(self._buffer.lines, line, count)
+        cursor_line, column = self.__cursor
+        if cursor_line >= line + count:
+            self.cursor = cursor_line - count, column
+        elif cursor_line >= line:
+            self.cursor = self._position_renumber(lines_renumber([(line, count, 0)]), cursor_line, column)
+        if self._cursors:
+            self._cursors_renumber([(line, count, 0)])
+
+    def _lines_change(self, changes):
+        """Replace ranges of buffer lines, keeping the cursors on their lines
+        (or on the lines replacing them). Overrides Window._lines_change.
+        """
+        super()._lines_change(changes)
+        self._indents.lines_change(self._buffer.lines, changes)
+        self.cursor = self._position_renumber(lines_renumber(changes), *self.__cursor)
+        if self._cursors:
+            self._cursors_renumber(changes)
+
+    def _position_renumber(self, renumber, line, column):
+        """Get the position of a character after lines have been replaced.
+
+        Args:
+            renumber: Function renumbering the lines (see lines.lines_renumber).
+            line: Index of the character's line before the replacement.
+            column: Index of the character's column.
+
+        Returns:
+            (line, column): Position of the character, or of the same column
+                in the line replacing its line (at most the end of it).
+        """
+        line, replaced = renumber(line)
+        if replaced:
+            line = min(line, len(self._buffer.lines) - 1)
+            column = min(column, len(self._buffer.lines[line]))
+        return line, column
+
+    def _cursors_renumber(self, changes):
+        """Move the additional cursors after lines have been replaced.
+
+        Args:
+            changes: List of (line, old_count, new_count) tuples (see Buffer._windows_lines_change).
+        """
+        renumber = lines_renumber(changes)
+        cursors = {self._position_renumber(renumber, *cursor) for cursor in self._cursors}
+        cursors.discard(self.__cursor)
+        self._cursors = sorted(cursors)
+
     @property
     def cursor(self):
         """Position of the cursor."""
@@ -71,29 +223,274 @@ class TextWindow(Window):
     @cursor.setter
     def cursor(self, cursor):
         self.__cursor = cursor
-        self._ui_window.cursor = cursor[0], cursor[1]
+        line, column = cursor
+        if self._folds.hidden(line):
+            self.unfold(line)
+        if self._wrap:
+            self._wrap_cursor(line, column)
+            return
+        row = self._shown_index(line)
+        if row < 0:
+            self.top = line
+        elif row >= self.n_lines:
+            self.top = self._folds.line(self._folds.index(line) - self.n_lines + 1)
+        self._ui_window.cursor = self._shown_index(line), self._screen_column(line, column)
+
+    def _wrap_cursor(self, line, column):
+        """Show the cursor, scrolling the viewport if needed, in wrap mode."""
+        n_lines = self.n_lines
+        bounds = self._wrap.bounds(self._buffer.lines, line)
+        row = row_index(bounds, column)
+        screen_row = self._wrap_row(line, column)
+        if screen_row is None:
+            screen_row = -1 if line < self._top else n_lines
+        if screen_row < 0:
+            self._wrap_scroll(line, row, 0)
+        elif screen_row >= n_lines:
+            self._wrap_scroll(line, row, n_lines - 1)
+        screen = self._screen_column(line, column) - self._screen_column(line, bounds[row])
+        self._ui_window.cursor = self._wrap_row(line, column), min(screen, self._ui_window.n_columns - 1)
+
+    def _target_update(self):
+        """Set the target column of vertical motions to the cursor's screen column
+        (relative to its row, in wrap mode).
+        """
+        line, column = self.__cursor
+        screen = self._screen_column(line, column)
+        if self._wrap:
+            bounds = self._wrap.bounds(self._buffer.lines, line)
+            screen -= self._screen_column(line, bounds[row_index(bounds, column)])
+        self._target_column = screen
+
+    @property
+    def cursors(self):
+        """Positions of the additional cursors, sorted (read-only)."""
+        return list(self._cursors)
+
+    def _cursors_set(self, cursors):
+        """Replace the additional cursors, and redraw the window to show them.
+
+        Args:
+            cursors: Iterable of positions. The main cursor's is ignored.
+        """
+        cursors = set(cursors)
+        cursors.discard(self.__cursor)
+        self._cursors = sorted(cursors)
+        self._redraw()
+
+    def cursors_add_matches(self, pattern):
+        """Add a cursor at the beginning of every match of a regular expression.
+
+        Args:
+            pattern: Regular expression, matched in each line.
+
+        Returns:
+            Number of additional cursors.
+        """
+        regex = re.compile(pattern)
+        matches = ((line, m.start()) for line, text in enumerate(self._buffer.lines) for m in regex.finditer(text))
+        self._cursors_set([*self._cursors, *matches])
+        return len(self._cursors)
+
+    def cursors_add_lines(self, start, end):
+        """Add a cursor on every line of a range, at the target column of vertical motions.
+
+        Args:
+            start: Index of the first line.
+            end: Index following the last line.
+
+        Returns:
+            Number of additional cursors.
+        """
+        lines = range(max(start, 0), min(end, len(self._buffer.lines)))
+        self._cursors_set([*self._cursors, *((line, self._buffer_column(line, self._target_column)) for line in lines)])
+        return len(self._cursors)
+
+    def cursors_clear(self):
+        """Remove the additional cursors."""
+        if self._cursors:
+            self._cursors_set([])
+
+    def _cursors_edit(self, edit):
+        """Make an edit at every cursor as a single modification of the buffer
+        (see Buffer.text_edit), and move each cursor after the text of its edit.
+
+        Args:
+            edit: Function taking the line and column of a cursor, and returning
+                the (line, column, end_line, end_column, text) edit to make there,
+                or None if there is none.
+        """
+        lines = self._buffer.lines
+        line, column = self.__cursor
+        primary = line, min(column, len(lines[line]))
+        cursors = sorted({(line, min(column, len(lines[line]))) for line, column in self._cursors} | {primary})
+        edits = [edit(*cursor) or (*cursor, *cursor, '') for cursor in cursors]
+        index = bisect_left(cursors, primary)
+        self._cursors = []  # Moved below, not by the notification of the modification.
+        with self.drawing_suspended():
+            ends = self._buffer.text_edit(edits)
+            self.cursor = ends[index]
+            self._cursors = sorted(set(ends) - {ends[index]})
+            self._target_update()
+
+    def _folds_update(self):
+        """Draw the viewport again after the folds changed, moving the cursor
+        to the header of the fold hiding it. Overrides Window._folds_update.
+        """
+        super()._folds_update()
+        line, column = self.__cursor
+        header = self._folds.visible(line)
+        if header != line:
+            line, column = header, min(column, len(self._buffer.lines[header]))
+        self.cursor = line, column
+
+    def fold_toggle(self):
+        """Fold the block of the cursor's line, or else the innermost block
+        containing it. If the cursor's line is the header of a fold, unfold it.
+        """
+        line = self.__cursor[0]
+        if self.unfold(line + 1):
+            return
+        lines = self._buffer.lines
+        end = self._indents.block_end(lines, line)
+        if end == line + 1:
+            line = self._indents.block_start(lines, line)
+            if line is None:
+                return
+            end = self._indents.block_end(lines, line)
+        self.fold(line + 1, end)
+
+    def fold_depth(self, depth=0):
+        """Fold the blocks whose header is inside depth other blocks, unfolding the others.
+
+        Args:
+            depth: Number of blocks containing the headers. (default 0: the outermost blocks)
+        """
+        self._folds.ranges = self._indents.blocks(self._buffer.lines, depth)
+        self._folds_update()
+
+    def wrap_toggle(self):
+        """Switch between wrapping long lines and scrolling horizontally."""
+        self.wrap = not self.wrap
+        self.cursor = self.__cursor
+        self._target_update()
+
+    def resize(self, line, column, n_lines, n_columns):
+        """Move and resize the window, keeping the cursor visible.
+        Overrides Window.resize.
+        """
+        super().resize(line, column, n_lines, n_columns)
+        self.cursor = self.__cursor
 
     def cursor_up(self):
-        """Move the cursor up one line to reach the target column."""
-        cursor = self._buffer.char_above(self.cursor[0], self._target_column)
+        """Move the cursor up one line (one row, in wrap mode) to reach the target column."""
+        if self._wrap:
+            cursor = self._row_char(*self.cursor, -1)
+        else:
+            line = self._folds.previous(self.cursor[0])
+            cursor = (line, self._buffer_column(line, self._target_column)) if line >= 0 else None
         self.cursor = cursor if cursor else self.cursor
 
     def cursor_down(self):
-        """Move the cursor down one line to reach the target column."""
-        cursor = self._buffer.char_below(self.cursor[0], self._target_column)
+        """Move the cursor down one line (one row, in wrap mode) to reach the target column."""
+        if self._wrap:
+            cursor = self._row_char(*self.cursor, 1)
+        else:
+            line = self._folds.next(self.cursor[0])
+            cursor = (line, self._buffer_column(line, self._target_column)) if line < len(self._buffer.lines) else None
         self.cursor = cursor if cursor else self.cursor
 
+    def _row_char(self, line, column, offset):
+        """Get the coordinates of the character at the target column of
+        the row above or below the given character's, in wrap mode.
+
+        Args:
+            line: Index of the character's line.
+            column: Index of the character's column.
+            offset: -1 for the row above, 1 for the row below.
+
+        Returns:
+            (line, column): Coordinates of the character.
+            None: If there are no rows above (or below).
+        """
+        lines = self._buffer.lines
+        bounds = self._wrap.bounds(lines, line)
+        row = row_index(bounds, column) + offset
+        if row < 0:
+            if line == 0:
+                return None
+            line = self._folds.previous(line)
+            bounds = self._wrap.bounds(lines, line)
+            row = len(bounds) - 2
+        elif row >= len(bounds) - 1:
+            line = self._folds.next(line)
+            if line == len(lines):
+                return None
+            bounds = self._wrap.bounds(lines, line)
+            row = 0
+        # The start of the next row is not in this one, unless it is the end of the line.
+        end = bounds[row+1] - (row + 2 < len(bounds))
+        column = self._buffer_column(line, self._screen_column(line, bounds[row]) + self._target_column)
+        return line, min(column, max(end, bounds[row]))
+
+    def _boundary(self, line, column):
+        """Check whether a position is between grapheme clusters (see ColumnMap.boundary)."""
+        columns = self._columns.column_map(self._buffer.lines, line)
+        return columns.boundary(column) if columns else True
+
     def cursor_back(self):
-        """Move the cursor back by one character and reset the target column."""
+        """Move the cursor back by one grapheme cluster and reset the target column."""
         cursor = self._buffer.char_before(*self.cursor)
+        while cursor and not self._boundary(*cursor):
+            cursor = self._buffer.char_before(*cursor)
         self.cursor = cursor if cursor else self.cursor
-        self._target_column = self.cursor[1]
+        self._target_update()
 
     def cursor_forward(self):
-        """Move the cursor forward by one character and reset the target column."""
+        """Move the cursor forward by one grapheme cluster and reset the target column."""
         cursor = self._buffer.char_after(*self.cursor)
+        while cursor and not self._boundary(*cursor):
+            cursor = self._buffer.char_after(*cursor)
         self.cursor = cursor if cursor else self.cursor
-        self._target_column = self.cursor[1]
+        self._target_update()
+
+    def cursor_word_back(self, subword=False):
+        """Move the cursor to the beginning of the current or previous word
+        and reset the target column.
+
+        Args:
+            subword: Whether to split words into subwords. (default False)
+        """
+        self.cursor = self._buffer.word_before(*self.cursor, subword) or (0, 0)
+        self._target_update()
+
+    def cursor_word_forward(self, subword=False):
+        """Move the cursor to the end of the current or next word
+        and reset the target column.
+
+        Args:
+            subword: Whether to split words into subwords. (default False)
+        """
+        self.cursor = self._buffer.word_after(*self.cursor, subword) or self._buffer.end
+        self._target_update()
+
+    def cursor_subword_back(self):
+        """Move the cursor to the beginning of the current or previous subword."""
+        self.cursor_word_back(subword=True)
+
+    def cursor_subword_forward(self):
+        """Move the cursor to the end of the current or next subword."""
+        self.cursor_word_forward(subword=True)
+
+    def cursor_paragraph_back(self):
+        """Move the cursor to the beginning of the current or previous paragraph."""
+        self.cursor = self._buffer.paragraph_before(self.cursor[0])
+        self._target_update()
+
+    def cursor_paragraph_forward(self):
+        """Move the cursor to the end of the current or next paragraph."""
+        self.cursor = self._buffer.paragraph_after(self.cursor[0])
+        self._target_update()
 
     def cursor_begin(self):
         """Move the cursor to the beginning of the buffer."""
@@ -110,13 +507,29 @@ class TextWindow(Window):
         Args:
             char: Charactere to insert.
         """
+        if self._cursors:
+            self._cursors_edit(lambda line, column: (line, column, line, column, char))
+            return
         self._buffer.char_insert(char, *self.cursor)
         self.cursor_forward()
 
+    def _char_delete_edit(self, line, column):
+        """Get the edit deleting the character at a position (see _cursors_edit)."""
+        after = self._buffer.char_after(line, column)
+        return (line, column, *after, '') if after else None
+
+    def _char_delete_before_edit(self, line, column):
+        """Get the edit deleting the character preceding a position (see _cursors_edit)."""
+        before = self._buffer.char_before(line, column)
+        return (*before, line, column, '') if before else None
+
     def char_delete(self):
         """Delete the character at the current position, updating
         the buffer and the cursor accordingly.
         """
+        if self._cursors:
+            self._cursors_edit(self._char_delete_edit)
+            return
         try:
             self._buffer.char_delete(*self.cursor)
             self.cursor = self.cursor[0], min(self.cursor[1], len(self._buffer.lines[self.cursor[0]]))
@@ -127,6 +540,9 @@ class TextWindow(Window):
         """Delete the character at the preceding position, updating
         the buffer and the cursor accordingly.
         """
+        if self._cursors:
+            self._cursors_edit(self._char_delete_before_edit)
+            return
         before = self._buffer.char_before(*self.cursor)
         if before:
             self._buffer.char_delete(*before)
@@ -134,11 +550,66 @@ class TextWindow(Window):
 
     def line_break(self):
         """Break a line in two lines at the current position."""
+        if self._cursors:
+            self._cursors_edit(lambda line, column: (line, column, line, column, '\n'))
+            return
         self._buffer.line_break(*self.cursor)
         self.cursor = self._buffer.char_after(*self.cursor)
 
+    def complete(self):
+        """Complete the word before the cursor with the most frequent word
+        of the open buffers starting with it. Repeating the completion
+        replaces it with the next most frequent word, and eventually
+        restores the original word: the successive completions are
+        undone as a single step.
+        """
+        line, column = self.cursor
+        cycling = bool(self._completions) and self._completions[:2] == (self._buffer.version, self.cursor)
+        if cycling:
+            _, _, start, words, i = self._completions
+            i = (i + 1) % len(words)
+        else:
+            match = re.search(r'\w+$', self._buffer.lines[line][:column])
+            if not match:
+                return
+            prefix = match.group()
+            words = [prefix] + self._editor.complete(prefix)
+            start, i = column - len(prefix), 1
+            if len(words) == 1:
+                return
+
+        with self._buffer.batch(amend=cycling):
+            if column > start:
+                self._buffer.text_delete(line, start, line, column)
+            self._buffer.text_insert(words[i], line, start)
+        self.cursor = line, start + len(words[i])
+        self._target_update()
+        self._completions = self._buffer.version, self.cursor, start, words, i
+
+    def undo(self):
+        """Undo the last group of modifications, moving the cursor where they took place."""
+        history = self._buffer.history
+        if history is None:  # Disabled (see Buffer.follow).
+            return
+        cursor = history.undo()
+        if cursor:
+            self.cursor = cursor
+            self._target_update()
+
+    def redo(self):
+        """Redo the last undone group of modifications, moving the cursor after them."""
+        history = self._buffer.history
+        if history is None:  # Disabled (see Buffer.follow).
+            return
+        cursor = history.redo()
+        if cursor:
+            self.cursor = cursor
+            self._target_update()
+
     def key_handle(self, key):
         """Try to handle the given keypress.
+        Key bindings (including the inherited editor ones) take priority
+        over the insertion of printable characters.
 
         Args:
             key: Key object representing the keys pressed.
@@ -146,11 +617,9 @@ class TextWindow(Window):
         Returns:
             True if handled, False otherwise.
         """
+        if self.key_bindings.key_handle(key):
+            return True
         if key.is_printable():
             self.char_insert(key.char())
-        else:
-            try:
-                self.key_bindings[key]()
-            except KeyError:
-                return False
-        return True
+            return True
+        return False
@@ -4,7 +4,12 @@ from abc import ABC, abstractmethod, abstractproperty
 
 
 class UIWindow(ABC):
-    """Class representing a window in the user interface toolkit."""
+    """Class representing a window in the user interface toolkit.
+
+    Attributes:
+        wrap: Whether the lines drawn are wrapped to the window's width,
+            so the window never scrolls horizontally.
+    """
 
     def __init__(self, ui, line, column, n_lines, n_columns):
         """Initialize an UIWindow object.
@@ -24,10 +29,21 @@ class UIWindow(ABC):
 
         self._cursor_show = False
         self._cursor = (0, 0)
+        self.wrap = False
+
+    @property
+    def n_lines(self):
+        """Window's height (read-only)."""
+        return self._n_lines
+
+    @property
+    def n_columns(self):
+        """Window's width (read-only)."""
+        return self._n_columns
 
     @property
     def cursor(self):
-        """Position of the cursor."""
+        """Position of the cursor, relative to the window's first line."""
         return self._cursor
 
     @cursor.setter
@@ -53,47 +69,73 @@ class UIWindow(ABC):
         return
 
     @abstractmethod
-    def line_update(self, line, content, attributes):
+    def line_update(self, line, content, attributes, cells=None):
         """Update a line.
+        Tabs are shown as spaces up to the screen column of the next
+        character, and characters taking no screen columns are shown
+        with the character they follow.
 
         Args:
-            line: Index of the line to be updated.
+            line: Index of the line (in the window) to be updated.
             content: New content of the line.
             attributes: List of attributes, one for each char in content.
+            cells: List of the screen columns of the chars in content, followed
+                by the width of the line. (default None: one column per char)
         """
         return
 
     @abstractmethod
-    def line_insert(self, line, content, attributes):
-        """Insert a line.
+    def lines_insert(self, line, count):
+        """Insert empty lines, moving the following ones down.
+        The lines moved past the bottom of the window are discarded.
 
         Args:
-            line: Index of the line to be inserted.
-            content: New content of the line.
-            attributes: List of attributes, one for each char in content.
+            line: Index of the first line to be inserted.
+            count: Number of lines to insert.
         """
         return
 
     @abstractmethod
-    def line_delete(self, line):
-        """Delete a line.
+    def lines_delete(self, line, count):
+        """Delete lines, moving the following ones up.
+        Empty lines appear at the bottom of the window.
 
         Args:
-            line: Index of the line to be deleted.
+            line: Index of the first line to be deleted.
+            count: Number of lines to delete.
         """
         return
 
+    @abstractmethod
+    def resize(self, line, column, n_lines, n_columns):
+        """Move and resize the window. Its content is discarded.
+
+        Args:
+            line: Index of the vertical position of the window in the UI.
+            column: Index of the horizontal position of the window in the UI.
+            n_lines: Window's height.
+            n_columns: Window's width.
+        """
+        self._line = line
+        self._column = column
+        self._n_lines = n_lines
+        self._n_columns = n_columns
+
     @abstractmethod
     def refresh(self):
         """Refresh the content of the window."""
         return
 
     @abstractmethod
-    def key_get(self):
+    def key_get(self, timeout=None):
         """Wait for a keypress from inside the window and return it.
 
+        Args:
+            timeout: Maximum number of seconds to wait. (default None: wait indefinitely)
+
         Returns:
             Key object representing the keypress.
+            None: If no key was pressed before the timeout.
         """
         return
 
@@ -121,6 +163,13 @@ class UI(ABC):
         """Refresh the UI."""
         return
 
+    @abstractmethod
+    def resize(self):
+        """Update the size of the UI after the screen was resized,
+        and clear it before the windows are rearranged.
+        """
+        return
+
     @abstractmethod
     def window_create(self, line, column, n_lines, n_columns):
         """Create a new window.
@@ -132,3 +181,11 @@ class UI(ABC):
             n_columns: Window's width.
         """
         return
+
+    def window_destroy(self, window):
+        """Destroy a window.
+
+        Args:
+            window: UIWindow object returned by window_create.
+        """
+        self._ui_windows.remove(window)
@@ -18,7 +18,6 @@ class CursesWindow(UIWindow):
         self._window = curses.newpad(self._n_lines, self._n_columns)
         self._window.keypad(True)
 
-        self._scroll_lines = 0
         self._scroll_columns = 0
         self._drawn_cursor = None
 
@@ -29,59 +28,92 @@ class CursesWindow(UIWindow):
     @cursor.setter
     def cursor(self, cursor):
         UIWindow.cursor.fset(self, cursor)
-        line, column = cursor
+        column = cursor[1]
 
-        if line >= self._scroll_lines + self._n_lines:
-            self._scroll_lines += line - (self._scroll_lines + self._n_lines) + 1
-        elif line < self._scroll_lines:
-            self._scroll_lines -= self._scroll_lines - line
-
-        if column >= self._scroll_columns + self._n_columns:
+        if self.wrap:
+            self._scroll_columns = 0
+        elif column >= self._scroll_columns + self._n_columns:
             self._scroll_columns += column - (self._scroll_columns + self._n_columns) + 1
         elif column < self._scroll_columns:
             self._scroll_columns -= self._scroll_columns - column
 
+    def resize(self, line, column, n_lines, n_columns):
+        super().resize(line, column, n_lines, n_columns)
+        self._window = curses.newpad(self._n_lines, self._n_columns)
+        self._window.keypad(True)
+        self._scroll_columns = 0
+        self._drawn_cursor = None
+
     def refresh(self):
-        if self._drawn_cursor:
-            attr = self._window.inch(*self._drawn_cursor) & ~0xFF & ~curses.A_REVERSE
-            self._window.chgat(self._drawn_cursor[0], self._drawn_cursor[1], 1, attr)
+        self.__cursor_erase()
         if self._cursor_show:
+            self.__check_size(*self._cursor)
             self._drawn_cursor = self._cursor
             attr = (self._window.inch(*self._drawn_cursor) & ~0xFF) | curses.A_REVERSE
             self._window.chgat(self._cursor[0], self._cursor[1], 1, attr)
-        self._window.noutrefresh(self._scroll_lines, self._scroll_columns,
+        self._window.noutrefresh(0, self._scroll_columns,
                                  self._line, self._column, self._line + self._n_lines-1, self._column + self._n_columns-1)
 
+    def __cursor_erase(self):
+        """Remove the highlighting of the cursor drawn by the last refresh."""
+        if self._drawn_cursor:
+            attr = self._window.inch(*self._drawn_cursor) & ~0xFF & ~curses.A_REVERSE
+            self._window.chgat(self._drawn_cursor[0], self._drawn_cursor[1], 1, attr)
+            self._drawn_cursor = None
+
     def attributes_set(self, colors, properties):
         self._window.bkgd(' ', self._ui.color_pair(colors) | properties)
 
     def __check_size(self, line, length):
+        """Widen the pad to hold length columns. Its height is always the window's."""
         height, width = self._window.getmaxyx()
-        if line >= height:
-            height *= 2
         if length >= width:
-            width *= 2
-        self._window.resize(height, width)
+            self._window.resize(height, max(width * 2, length + 1))
 
-    def line_update(self, line, content, attributes):
-        self.__check_size(line, len(content))
+    def line_update(self, line, content, attributes, cells=None):
+        if line >= self._n_lines:
+            return
+        self.__check_size(line, cells[-1] if cells else len(content))
         self._window.move(line, 0)
-        for column, (char, attribute) in enumerate(zip(content, attributes)):
-            self._window.addstr(line, column, char, self._ui.color_pair(attribute[0]) | attribute[1])
+        if cells is None:
+            for column, (char, attribute) in enumerate(zip(content, attributes)):
+                self._window.addstr(line, column, char, self._ui.color_pair(attribute[0]) | attribute[1])
+        else:
+            self.__cells_draw(line, content, attributes, cells)
         self._window.clrtoeol()
 
-    def line_insert(self, line, content, attributes):
-        self.__check_size(line, len(content))
+    def __cells_draw(self, line, content, attributes, cells):
+        """Draw the characters of a line at their screen columns (see UIWindow.line_update).
+        The characters taking no columns are drawn in one string with the
+        one they follow, so they combine with it.
+        """
+        i, n = 0, len(content)
+        while i < n:
+            j = i + 1
+            while j < n and cells[j+1] == cells[j]:
+                j += 1
+            width = cells[j] - cells[i]
+            text = ' ' * width if content[i] == '\t' else content[i:j]
+            if width:
+                self._window.addstr(line, cells[i], text, self._ui.color_pair(attributes[i][0]) | attributes[i][1])
+            i = j
+
+    def lines_insert(self, line, count):
+        self.__cursor_erase()
         self._window.move(line, 0)
-        self._window.insertln()
-        self.line_update(line, content, attributes)
+        self._window.insdelln(count)
 
-    def line_delete(self, line):
+    def lines_delete(self, line, count):
+        self.__cursor_erase()
         self._window.move(line, 0)
-        self._window.deleteln()
+        self._window.insdelln(-count)
 
-    def key_get(self):
+    def key_get(self, timeout=None):
+        self._window.timeout(-1 if (timeout is None) else int(timeout * 1000))
         key1 = self._window.getch()
+        if key1 == -1:
+            return None
+        self._window.timeout(-1)
         key2 = self._window.getch() if (key1 == ascii.ESC) else None
 
         meta = (key1 == ascii.ESC)
@@ -113,6 +145,11 @@ class Curses(UI):
     def max_columns(self):
         return curses.COLS
 
+    def resize(self):
+        curses.update_lines_cols()
+        self._screen.erase()  # Clear the gaps between windows.
+        self._screen.noutrefresh()
+
     def refresh(self):
         for window in self._ui_windows:
             window.refresh()
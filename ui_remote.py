@@ -0,0 +1,160 @@
+"""Implementation of the user interface of the clients of the editor server."""
+
+from collections import deque
+
+from remote import attributes_encode
+from ui import UI, UIWindow
+
+_blank = ('', [], None)  # Content, attributes and cells of an empty row.
+
+
+class RemoteUIWindow(UIWindow):
+    """Class representing a window drawn by a client of the editor server.
+    See parent class UIWindow for details.
+
+    The window keeps the rows drawn, and those last sent to the client:
+    refreshing it only sends the rows that differ, with the attributes
+    of their characters encoded as runs (see attributes_encode). Lines
+    inserted and deleted are sent as such, so the client moves the rows
+    it has instead of receiving them again.
+    """
+    def __init__(self, ui, line, column, n_lines, n_columns, window_id):
+        """Initialize a RemoteUIWindow object.
+
+        Args:
+            ui: RemoteUI object representing the user interface.
+            line: Index of the vertical position of the window in the UI.
+            column: Index of the horizontal position of the window in the UI.
+            n_lines: Window's height.
+            n_columns: Window's width.
+            window_id: Integer identifying the window in the messages to the client.
+        """
+        super().__init__(ui, line, column, n_lines, n_columns)
+        self._id = window_id
+        self._rows = [_blank] * n_lines  # Rows drawn.
+        self._sent = [_blank] * n_lines  # Rows shown by the client.
+        self._sent_cursor = None         # (cursor, shown, wrap) last sent.
+
+    def attributes_set(self, colors, properties):
+        self._ui._send(['attributes', self._id, colors, properties])
+
+    def line_update(self, line, content, attributes, cells=None):
+        if line < self._n_lines:
+            self._rows[line] = (content, attributes_encode(attributes), cells)
+
+    def lines_insert(self, line, count):
+        for rows in (self._rows, self._sent):
+            rows[line: line] = [_blank] * count
+            del rows[self._n_lines:]
+        self._ui._send(['insert', self._id, line, count])
+
+    def lines_delete(self, line, count):
+        for rows in (self._rows, self._sent):
+            del rows[line: line + count]
+            rows.extend([_blank] * (self._n_lines - len(rows)))
+        self._ui._send(['delete', self._id, line, count])
+
+    def resize(self, line, column, n_lines, n_columns):
+        super().resize(line, column, n_lines, n_columns)
+        self._rows = [_blank] * n_lines
+        self._sent = [_blank] * n_lines
+        self._sent_cursor = None
+        self._ui._send(['resize', self._id, line, column, n_lines, n_columns])
+
+    def refresh(self):
+        sent = self._sent
+        for row, content in enumerate(self._rows):
+            if content != sent[row]:
+                sent[row] = content
+                self._ui._send(['line', self._id, row, *content])
+        cursor = (self._cursor, self._cursor_show, self.wrap)
+        if cursor != self._sent_cursor:
+            self._sent_cursor = cursor
+            self._ui._send(['cursor', self._id, *self._cursor, self._cursor_show, self.wrap])
+
+    def key_get(self, timeout=None):
+        """Get the next key received from the client. The keys are received
+        by the server (see RemoteUI.key_put): the timeout is ignored.
+        """
+        return self._ui._key_get()
+
+
+class RemoteUI(UI):
+    """Class representing the user interface of a client of the editor server.
+
+    Nothing is drawn by the server: the windows send what they draw to
+    the client through its connection, and the client draws it with its
+    own toolkit (see Client). The messages are only sent when the UI is
+    refreshed, if something changed.
+    """
+    def __init__(self, connection, n_lines, n_columns):
+        """Initialize a RemoteUI object.
+
+        Args:
+            connection: Connection object to the client.
+            n_lines: Height of the client's screen.
+            n_columns: Width of the client's screen.
+        """
+        super().__init__()
+        self._connection = connection
+        self._max_lines = n_lines
+        self._max_columns = n_columns
+        self._keys = deque()
+        self._windows_created = 0
+        self._changed = False  # Whether messages were sent since the last refresh.
+
+    @property
+    def max_lines(self):
+        return self._max_lines
+
+    @property
+    def max_columns(self):
+        return self._max_columns
+
+    def size_set(self, n_lines, n_columns):
+        """Set the size of the client's screen, after it was resized.
+
+        Args:
+            n_lines: Height of the screen.
+            n_columns: Width of the screen.
+        """
+        self._max_lines = n_lines
+        self._max_columns = n_columns
+
+    def key_put(self, key):
+        """Queue a key received from the client, returned by the key_get method of the windows.
+
+        Args:
+            key: Key object.
+        """
+        self._keys.append(key)
+
+    def _key_get(self):
+        """Get the next key queued, or None."""
+        return self._keys.popleft() if self._keys else None
+
+    def _send(self, message):
+        """Send a message to the client."""
+        self._connection.send(message)
+        self._changed = True
+
+    def refresh(self):
+        for window in self._ui_windows:
+            window.refresh()
+        if self._changed:
+            self._connection.send(['refresh'])
+            self._changed = False
+
+    def resize(self):
+        self._send(['clear'])
+
+    def window_create(self, line, column, n_lines, n_columns):
+        window = RemoteUIWindow(self, line, column, n_lines, n_columns, self._windows_created)
+        self._windows_created += 1
+        self._ui_windows.append(window)
+        self._send(['create', window._id, line, column, n_lines, n_columns])
+        return window
+
+    def window_destroy(self, window):
+        super().window_destroy(window)
+        self._send(['destroy', window._id])
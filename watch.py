@@ -0,0 +1,114 @@
+"""Detection of changes to files on disk."""
+
+import os
+import struct
+
+
+class FileWatcher:
+    """Class watching a file for changes.
+
+    On Linux the file is watched with inotify, so checking for changes
+    costs one non-blocking read and the file is not touched unless an
+    event was received. Elsewhere (or if inotify is not available)
+    the file's metadata is polled.
+    """
+    _event = struct.Struct('iIII')  # Watch descriptor, mask, cookie, length of the name.
+
+    # IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVE_SELF | IN_DELETE_SELF
+    _mask = 0x002 | 0x004 | 0x008 | 0x800 | 0x400
+    _watch_lost = 0x800 | 0x400 | 0x8000  # IN_MOVE_SELF | IN_DELETE_SELF | IN_IGNORED
+
+    def __init__(self, file_name, stat=None):
+        """Initialize a FileWatcher object.
+
+        Args:
+            file_name: Path of the file to watch.
+            stat: os.stat_result of the version of the file known to the caller.
+                (default None: current version)
+        """
+        self._file_name = file_name
+        self._stat = stat if stat else self._stat_get()
+        self._fd = None
+        self._watching = False
+        self._unchecked = True  # Changes before the watch was added are not notified.
+        try:
+            self._inotify_init()
+        except (OSError, AttributeError):
+            self._fd = None
+
+    @property
+    def stat(self):
+        """os.stat_result of the file at the last check, or None if missing (read-only)."""
+        return self._stat
+
+    def _stat_get(self):
+        try:
+            return os.stat(self._file_name)
+        except FileNotFoundError:
+            return None
+
+    def _inotify_init(self):
+        """Initialize inotify and watch the file."""
+        import ctypes
+        self._libc = ctypes.CDLL(None, use_errno=True)
+        fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self._fd = fd
+        self._inotify_watch()
+
+    def _inotify_watch(self):
+        """Watch the file (again, if it was replaced)."""
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(self._file_name), self._mask)
+        self._watching = wd >= 0
+
+    def _inotify_events(self):
+        """Consume the pending inotify events.
+
+        Returns:
+            True if some event concerning the file was received, False otherwise.
+        """
+        events = False
+        while True:
+            try:
+                data = os.read(self._fd, 4096)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset < len(data):
+                _, mask, _, length = self._event.unpack_from(data, offset)
+                offset += self._event.size + length
+                events = True
+                if mask & self._watch_lost:
+                    self._watching = False
+
+    @staticmethod
+    def identity(stat):
+        """Return a tuple identifying a version of a file from its os.stat_result (or None)."""
+        return stat and (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def check(self):
+        """Check whether the file has changed since the last check.
+
+        Returns:
+            True if the file changed (see the stat property), False otherwise.
+        """
+        if self._fd is not None:
+            events = self._inotify_events()
+            if not self._watching:
+                self._inotify_watch()
+            elif not (events or self._unchecked):
+                return False
+            self._unchecked = False
+
+        stat = self._stat_get()
+        if self.identity(stat) == self.identity(self._stat):
+            return False
+        self._stat = stat
+        return True
+
+    def close(self):
+        """Stop watching the file."""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
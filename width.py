@@ -0,0 +1,207 @@
+"""Display width of text: tabs, wide characters and grapheme clusters."""
+
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+
+from lines import LineMemo
+
+_special = re.compile(r'[^\x20-\x7e]')  # Characters that may not be one cell wide.
+
+
+def char_width(char):
+    """Get the number of screen cells of a character shown on its own.
+    Tabs are not handled, as their width depends on their column.
+
+    Args:
+        char: String of one character.
+
+    Returns:
+        0 for combining marks and invisible format characters,
+        2 for wide (East Asian) characters and control characters
+        (shown as ^X), 1 otherwise.
+    """
+    if ' ' <= char <= '~':
+        return 1
+    # Deferred import: ASCII lines, the most common, need no character database.
+    import unicodedata
+    category = unicodedata.category(char)
+    if category == 'Cc':
+        return 2
+    if category in ('Mn', 'Me') or (category == 'Cf' and char != '\xad'):
+        return 0
+    if '\U0001f3fb' <= char <= '\U0001f3ff':  # Skin tone modifiers, joining the preceding emoji.
+        return 0
+    return 2 if unicodedata.east_asian_width(char) in ('W', 'F') else 1
+
+
+def line_columns(text, tab_size=8):
+    """Map the columns of a line to screen columns.
+    Tabs are expanded to the next multiple of tab_size, and grapheme
+    clusters are shown in the cell(s) of their first character: combining
+    marks, emoji joined by a zero width joiner, and the second half
+    of a regional indicator pair (a flag) take no cells.
+
+    Args:
+        text: String containing the line.
+        tab_size: Number of columns between tab stops. (default 8)
+
+    Returns:
+        ColumnMap object.
+        None: If every character takes one cell: the screen columns
+            are the columns of the line.
+    """
+    if text.isascii() and text.isprintable():
+        return None
+    positions, offsets = array('I'), array('i')
+    offset = 0
+    flag_end = -1  # Column following a regional indicator starting a flag.
+    for m in _special.finditer(text):
+        column = m.start()
+        char = text[column]
+        if char == '\t':
+            width = tab_size - (column + offset) % tab_size
+        elif column and text[column-1] == '\u200d' and not char.isascii():  # Joined emoji.
+            width = 0
+        elif '\U0001f1e6' <= char <= '\U0001f1ff':  # Regional indicator.
+            width = 0 if column == flag_end else 2
+            flag_end = column + 1 if width else -1
+        else:
+            width = char_width(char) or (0 if column else 1)  # Combining marks need a character to combine with.
+        if width != 1:
+            offset += width - 1
+            positions.append(column)
+            offsets.append(offset)
+    return ColumnMap(len(text), positions, offsets) if positions else None
+
+
+class ColumnMap:
+    """Class representing the screen columns of the characters of a line.
+
+    Only the characters not one cell wide are stored, with the total
+    offset of the screen columns following them: columns are mapped with
+    a binary search, and the map of a line with a few special characters
+    is a few bytes (see line_columns).
+
+    Attributes:
+        length: Number of characters in the line.
+    """
+    def __init__(self, length, positions, offsets):
+        """Initialize a ColumnMap object.
+
+        Args:
+            length: Number of characters in the line.
+            positions: array('I') of the columns of the characters not one cell wide, sorted.
+            offsets: array('i') of the offset of the screen columns following each of them.
+        """
+        self.length = length
+        self._positions = positions
+        self._offsets = offsets
+        self._after = array('I', [column + 1 + offset for column, offset in zip(positions, offsets)])
+
+    @property
+    def width(self):
+        """Number of screen cells of the line (read-only)."""
+        return self.length + self._offsets[-1]
+
+    def screen(self, column):
+        """Get the screen column of a character.
+
+        Args:
+            column: Index of the character's column (the length for the end of the line).
+
+        Returns:
+            Index of the screen column.
+        """
+        k = bisect_left(self._positions, column)
+        return column + (self._offsets[k-1] if k else 0)
+
+    def column(self, screen):
+        """Get the last character starting at or before a screen column.
+        It never is inside a grapheme cluster.
+
+        Args:
+            screen: Index of the screen column.
+
+        Returns:
+            Index of the character's column (the length for the end of the line).
+        """
+        k = bisect_right(self._after, screen)
+        if k:
+            column = self._positions[k-1] + 1 + screen - self._after[k-1]
+        else:
+            column = screen
+        limit = self._positions[k] if k < len(self._positions) else self.length
+        return max(min(column, limit), 0)
+
+    def boundary(self, column):
+        """Check whether a column is between grapheme clusters.
+
+        Args:
+            column: Index of the column.
+
+        Returns:
+            False if the character at column takes no cells, True otherwise.
+        """
+        k = bisect_left(self._positions, column)
+        if k == len(self._positions) or self._positions[k] != column:
+            return True
+        return self._offsets[k] != (self._offsets[k-1] if k else 0) - 1
+
+    def cells(self, start, end):
+        """Get the screen columns of a range of characters, relative to the first one.
+
+        Args:
+            start: Index of the first character's column.
+            end: Index following the last character's column.
+
+        Returns:
+            List of the screen columns of the characters, followed by the
+            screen column of end: end - start + 1 columns.
+        """
+        positions, offsets = self._positions, self._offsets
+        k = bisect_left(positions, start)
+        offset = offsets[k-1] if k else 0
+        base = start + offset
+        cells = []
+        column = start
+        while True:
+            stop = min(positions[k], end) if k < len(positions) else end
+            cells.extend(range(column + offset - base, stop + offset - base + 1))
+            if stop == end:
+                return cells
+            offset = offsets[k]
+            column = stop + 1
+            k += 1
+
+
+class ColumnCache(LineMemo):
+    """Class representing the column maps of the lines of a buffer (see LineMemo).
+
+    Attributes:
+        tab_size: Number of columns between tab stops.
+    """
+    def __init__(self, tab_size=8, max_entries=4096):
+        """Initialize a ColumnCache object.
+
+        Args:
+            tab_size: Number of columns between tab stops. (default 8)
+            max_entries: Maximum number of lines whose maps are kept. (default 4096)
+        """
+        super().__init__(max_entries)
+        self.tab_size = tab_size
+
+    def column_map(self, lines, line):
+        """Get the column map of a line (see line_columns).
+
+        Args:
+            lines: Sequence of strings.
+            line: Index of the line.
+
+        Returns:
+            ColumnMap object, or None if every character takes one cell.
+        """
+        return self.get(lines, line)
+
+    def _compute(self, lines, line):
+        return line_columns(lines[line], self.tab_size)
@@ -1,7 +1,13 @@
 """Implementation of editor's windows."""
 
+from contextlib import contextmanager
+
 from buffer import Buffer
 from attribute import Color, Property
+from fold import Folds
+from lines import lines_renumber
+from width import ColumnCache
+from wrap import WrapCache, row_index
 
 
 class Window:
@@ -10,7 +16,28 @@ class Window:
     Window is a buffer displayer. Every Window is associated with
     only one Buffer object.
     Windows respond to buffer's change notifications and update
-    themselves accordingly.
+    themselves accordingly. A Window shows a viewport of the buffer,
+    n_lines lines starting from top: changes to lines outside of it
+    cost no formatting or drawing.
+
+    Characters are shown in screen columns: tabs are expanded, wide
+    characters take two columns and grapheme clusters share the columns
+    of their first character. The screen columns of the lines are cached
+    (see ColumnCache), and lines taking one column per character, such as
+    printable ASCII ones, need no mapping.
+
+    In wrap mode, lines longer than the window are wrapped into several
+    rows, and the viewport starts from a row of the top line. The rows
+    of the lines are cached (see WrapCache), and only the lines shown are
+    wrapped: the rows above the viewport are never needed.
+
+    Ranges of lines can be folded: they are hidden, and the viewport
+    shows the lines around them as consecutive lines. Hidden lines are
+    never formatted or drawn, and the rows of the lines are found with
+    a binary search on the folds (see Folds).
+
+    Drawing can be suspended during bulk modifications: the window keeps
+    following the buffer, but only draws once at the end.
     """
     def __init__(self, editor, line, column, n_lines, n_columns, buffer=None):
         """Initialize a Window object.
@@ -25,6 +52,13 @@ class Window:
         """
         self._editor = editor
         self._ui_window = editor._ui.window_create(line, column, n_lines, n_columns)
+        self._top = 0
+        self._top_row = 0   # Row of the top line shown first, in wrap mode.
+        self._columns = ColumnCache()
+        self._suspended = 0  # Depth of nested drawing_suspended contexts.
+        self._wrap = None   # WrapCache object, in wrap mode.
+        self._layout = []   # (First screen row, row bounds) of the lines shown, in wrap mode.
+        self._folds = Folds()
         self.buffer = buffer if buffer else Buffer(window=self)  # Call the setter.
 
     @property
@@ -34,6 +68,10 @@ class Window:
 
     @buffer.setter
     def buffer(self, buffer):
+        try:
+            self._buffer.window_unlink(self)
+        except AttributeError:
+            pass
         self._buffer = buffer
         self._buffer.window_link(self)
 
@@ -50,10 +88,293 @@ class Window:
         content = self._buffer.lines[line]
         return content, [(Color.Defaults, Property.Default)] * len(content)
 
+    @property
+    def top(self):
+        """Index of the first buffer line shown in the window."""
+        return self._top
+
+    @top.setter
+    def top(self, top):
+        self._scroll(top, 0)
+
+    def _scroll(self, top, top_row):
+        """Move the viewport.
+
+        Args:
+            top: Index of the first buffer line shown.
+            top_row: Index of the first row of the line shown, in wrap mode.
+        """
+        if (top, top_row) != (self._top, self._top_row):
+            self._top, self._top_row = top, top_row
+            self._redraw()
+
+    def _shown_index(self, line):
+        """Get the position of a buffer line among the lines shown from the top line.
+
+        Args:
+            line: Index of the buffer line.
+
+        Returns:
+            Number of visible lines from the top line to it (negative above
+            the top line). A hidden line is counted as the line following its fold.
+        """
+        if self._folds:
+            return self._folds.index(line) - self._folds.index(self._top)
+        return line - self._top
+
+    def _shown_line(self, index):
+        """Get the buffer line shown at a position from the top line (see _shown_index)."""
+        if self._folds:
+            return self._folds.line(self._folds.index(self._top) + index)
+        return self._top + index
+
+    @property
+    def folds(self):
+        """List of (start, end) tuples: the ranges of lines hidden, sorted (read-only)."""
+        return self._folds.ranges
+
+    def fold(self, start, end):
+        """Hide a range of lines, shown as part of the line above it.
+        The folds inside the range are merged into its fold.
+
+        Args:
+            start: Index of the first line to hide.
+            end: Index following the last line to hide.
+
+        Raises:
+            ValueError: If the range is empty, starts with the first line
+                or ends after the last one.
+        """
+        if not 0 < start < end <= len(self._buffer.lines):
+            raise ValueError('invalid range of lines')
+        self._folds.fold(start, end)
+        self._folds_update()
+
+    def unfold(self, line):
+        """Show the lines of the fold hiding a line.
+
+        Args:
+            line: Index of the line.
+
+        Returns:
+            True if the line was hidden, False otherwise.
+        """
+        if self._folds.unfold(line) is None:
+            return False
+        self._folds_update()
+        return True
+
+    def unfold_all(self):
+        """Show all the hidden lines."""
+        if self._folds:
+            self._folds.ranges = []
+            self._folds_update()
+
+    def _folds_update(self):
+        """Draw the viewport again after the folds changed, from the top line or the header hiding it."""
+        top = self._folds.visible(self._top)
+        if top != self._top:
+            self._top, self._top_row = top, 0
+        self._redraw()
+
+    @property
+    def wrap(self):
+        """Whether lines longer than the window are wrapped, instead of scrolled horizontally."""
+        return self._wrap is not None
+
+    @wrap.setter
+    def wrap(self, wrap):
+        if bool(wrap) != self.wrap:
+            self._wrap = WrapCache(self._ui_window.n_columns, self._columns) if wrap else None
+            self._top_row = 0
+            self._ui_window.wrap = bool(wrap)
+            self._redraw()
+
+    @property
+    def n_lines(self):
+        """Window's height (read-only)."""
+        return self._ui_window.n_lines
+
+    def resize(self, line, column, n_lines, n_columns):
+        """Move and resize the window.
+
+        Args:
+            line: Index of the vertical position of the window in the editor.
+            column: Index of the horizontal position of the window in the editor.
+            n_lines: Window's height.
+            n_columns: Window's width.
+        """
+        if self._wrap and n_columns != self._wrap.width:
+            # Keep the first character shown at the top.
+            start = self._layout[0][1][self._top_row] if self._layout else 0
+            self._wrap = WrapCache(n_columns, self._columns)
+            self._top_row = row_index(self._wrap.bounds(self._buffer.lines, self._top), start)
+        self._ui_window.resize(line, column, n_lines, n_columns)
+        self._redraw()
+
+    def _screen_column(self, line, column):
+        """Get the screen column of a character, from the start of its line.
+
+        Args:
+            line: Index of the character's line.
+            column: Index of the character's column.
+
+        Returns:
+            Index of the screen column.
+        """
+        columns = self._columns.column_map(self._buffer.lines, line)
+        return columns.screen(column) if columns else column
+
+    def _buffer_column(self, line, screen):
+        """Get the last character of a line starting at or before a screen column.
+
+        Args:
+            line: Index of the line.
+            screen: Index of the screen column, from the start of the line.
+
+        Returns:
+            Index of the character's column (the length of the line for its end).
+        """
+        columns = self._columns.column_map(self._buffer.lines, line)
+        if columns:
+            return columns.column(screen)
+        return max(min(screen, len(self._buffer.lines[line])), 0)
+
+    def _cells(self, line, start, end):
+        """Get the screen columns of a range of characters of a line, as drawn
+        by the user interface (see UIWindow.line_update).
+
+        Args:
+            line: Index of the line.
+            start: Index of the first character's column.
+            end: Index following the last character's column.
+
+        Returns:
+            List of the screen columns, relative to the first character.
+            None: If every character takes one column.
+        """
+        columns = self._columns.column_map(self._buffer.lines, line)
+        return columns.cells(start, end) if columns else None
+
+    @contextmanager
+    def drawing_suspended(self):
+        """Context manager suspending the drawing of the window.
+        The changes of the buffer inside it only update the state of the
+        window, which is redrawn once at the end.
+        """
+        self._suspended += 1
+        try:
+            yield
+        finally:
+            self._suspended -= 1
+            if not self._suspended:
+                self._redraw()
+
+    def _redraw(self):
+        """Draw all the lines of the viewport."""
+        if self._wrap:
+            self._wrap_layout()
+            self._wrap_draw(0)
+            return
+        for row in range(self._ui_window.n_lines):
+            self._row_draw(row)
+
+    def _wrap_layout(self):
+        """Find the rows of the lines shown in wrap mode, starting from the top line and row.
+        The first screen row of each line is the sum of the rows of the previous ones.
+        """
+        lines, n_lines = self._buffer.lines, self._ui_window.n_lines
+        bounds = self._wrap.bounds(lines, self._top)
+        self._top_row = min(self._top_row, len(bounds) - 2)
+        self._layout = []
+        line, row = self._top, -self._top_row
+        while row < n_lines and line < len(lines):
+            bounds = self._wrap.bounds(lines, line)
+            self._layout.append((row, bounds))
+            row += len(bounds) - 1
+            line = self._folds.next(line) if self._folds else line + 1
+
+    def _wrap_row(self, line, column):
+        """Get the screen row showing a character, in wrap mode.
+
+        Args:
+            line: Index of the character's line.
+            column: Index of the character's column.
+
+        Returns:
+            Index of the row, possibly outside of the window.
+            None: If the line is not in the layout of the viewport.
+        """
+        index = self._shown_index(line)
+        if 0 <= index < len(self._layout):
+            first, bounds = self._layout[index]
+            return first + row_index(bounds, column)
+        return None
+
+    def _wrap_scroll(self, line, row, screen_row):
+        """Scroll the viewport to show a row of a line on a screen row, in wrap mode.
+
+        Args:
+            line: Index of the buffer line.
+            row: Index of the row of the line.
+            screen_row: Index of the screen row where to show it.
+        """
+        while row < screen_row and line > 0:
+            screen_row -= row + 1
+            line = self._folds.previous(line)
+            row = len(self._wrap.bounds(self._buffer.lines, line)) - 2  # Last row.
+        self._scroll(line, max(row - screen_row, 0))
+
+    def _wrap_draw(self, start, end=None):
+        """Draw screen rows according to the layout, in wrap mode.
+        Lines are formatted once, whatever the number of their rows.
+
+        Args:
+            start: Index of the first screen row to draw.
+            end: Index following the last screen row to draw. (default None: bottom of the window)
+        """
+        if self._suspended:
+            return
+        n_lines = self._ui_window.n_lines
+        end = n_lines if end is None else min(end, n_lines)
+        used = 0
+        for i, (first, bounds) in enumerate(self._layout):
+            n_rows = len(bounds) - 1
+            used = first + n_rows
+            if used <= start or first >= end:
+                continue
+            line = self._shown_line(i)
+            content, attributes = self._format(line)
+            for row in range(max(start - first, 0), min(end - first, n_rows)):
+                a, b = bounds[row], bounds[row+1]
+                self._ui_window.line_update(first + row, content[a:b], attributes[a:b], self._cells(line, a, b))
+        for row in range(max(used, start), end):
+            self._ui_window.line_update(row, '', [])
+
+    def _row_draw(self, row):
+        """Draw a line of the viewport.
+
+        Args:
+            row: Index of the line in the window.
+        """
+        if self._suspended:
+            return
+        line = self._shown_line(row)
+        if line < len(self._buffer.lines):
+            content, attributes = self._format(line)
+            self._ui_window.line_update(row, content, attributes, self._cells(line, 0, len(content)))
+        else:
+            self._ui_window.line_update(row, '', [])
+
     def _update(self):
         """Reload the window from its associated buffer."""
-        for line in range(len(self._buffer.lines)):
-            self._line_update(line)
+        self._top = min(self._top, len(self._buffer.lines) - 1)
+        self._columns.clear()
+        self._folds.ranges = []
+        if self._wrap:
+            self._wrap.clear()
+            self._top_row = 0
+        self._redraw()
 
     def _line_update(self, line):
         """Update a buffer line in the user interface.
@@ -61,22 +382,149 @@ class Window:
         Args:
             line: Index of the buffer line to be updated.
         """
-        content, attributes = self._format(line)
-        self._ui_window.line_update(line, content, attributes)
+        self._columns.line_update(line)
+        if self._wrap:
+            self._wrap.line_update(line)
+        if self._folds.hidden(line):
+            return
+        index = self._shown_index(line)
+        if self._wrap:
+            if 0 <= index < len(self._layout):
+                first, bounds = self._layout[index]
+                new_bounds = self._wrap.bounds(self._buffer.lines, line)
+                if len(new_bounds) == len(bounds):
+                    self._layout[index] = first, new_bounds
+                    self._wrap_draw(max(first, 0), first + len(bounds) - 1)
+                else:  # The following lines move.
+                    self._wrap_layout()
+                    self._wrap_draw(max(first, 0))
+            return
+        if 0 <= index < self._ui_window.n_lines:
+            self._row_draw(index)
+
+    def _lines_insert(self, line, count):
+        """Insert consecutive new buffer lines in the user interface.
+        Lines inserted above the viewport move it down, so it keeps
+        showing the same lines.
+
+        Args:
+            line: Index of the first buffer line inserted.
+            count: Number of lines inserted.
+        """
+        if self._folds:
+            self._lines_follow([(line, 0, count)])
+            return
+        self._columns.lines_insert(line, count)
+        if self._wrap:
+            self._wrap.lines_insert(line, count)
+            if line < self._top:
+                self._top += count
+            elif line == self._top:
+                self._top_row = 0
+                self._redraw()
+            elif line - self._top < len(self._layout):
+                start = self._layout[line - self._top][0]
+                self._wrap_layout()
+                self._wrap_draw(start)
+            elif line - self._top == len(self._layout):  # After the last line shown.
+                first, bounds = self._layout[-1]
+                if first + len(bounds) - 1 < self._ui_window.n_lines:
+                    self._wrap_layout()
+                    self._wrap_draw(first + len(bounds) - 1)
+            return
+        row = line - self._top
+        n_lines = self._ui_window.n_lines
+        if row < 0:
+            self._top += count
+        elif row < n_lines and not self._suspended:
+            count = min(count, n_lines - row)
+            self._ui_window.lines_insert(row, count)
+            for r in range(row, row+count):
+                self._row_draw(r)
 
-    def _line_insert(self, line):
-        """Insert a new buffer line in the user interface.
+    def _lines_delete(self, line, count):
+        """Delete consecutive buffer lines from the user interface.
+        Lines deleted above the viewport move it up, so it keeps
+        showing the same lines.
 
         Args:
-            line: Index of the buffer line to be inserted.
+            line: Index of the first buffer line deleted.
+            count: Number of lines deleted.
         """
-        content, attributes = self._format(line)
-        self._ui_window.line_insert(line, content, attributes)
+        if self._folds:
+            self._lines_follow([(line, count, 0)])
+            return
+        self._columns.lines_delete(line, count)
+        if self._wrap:
+            self._wrap.lines_delete(line, count)
+            if line + count <= self._top:
+                self._top -= count
+            elif line <= self._top:
+                self._top, self._top_row = min(line, len(self._buffer.lines) - 1), 0
+                self._redraw()
+            elif line - self._top < len(self._layout):
+                start = self._layout[line - self._top][0]
+                self._wrap_layout()
+                self._wrap_draw(start)
+            return
+        row = line - self._top
+        n_lines = self._ui_window.n_lines
+        if row + count <= 0:
+            self._top -= count
+        elif row < 0:
+            self._top = line
+            self._redraw()
+        elif row < n_lines and not self._suspended:
+            count = min(count, n_lines - row)
+            self._ui_window.lines_delete(row, count)
+            for r in range(n_lines - count, n_lines):
+                self._row_draw(r)
 
-    def _line_delete(self, line):
-        """Delete a buffer line from the user interface.
+    def _lines_redraw(self, line, count):
+        """Draw buffer lines again, as the way they are shown changed (not their text).
 
         Args:
-            line: Index of the buffer line to be deleted.
+            line: Index of the first buffer line to draw.
+            count: Number of lines to draw.
+        """
+        start, end = max(self._shown_index(line), 0), max(self._shown_index(line + count), 0)
+        if self._wrap:
+            layout = self._layout[start: end]
+            if layout:
+                self._wrap_draw(max(layout[0][0], 0), layout[-1][0] + len(layout[-1][1]) - 1)
+            return
+        for row in range(start, min(end, self._ui_window.n_lines)):
+            self._row_draw(row)
+
+    def _lines_change(self, changes):
+        """Replace ranges of buffer lines in the user interface, redrawing
+        the viewport once if any of them is shown. The viewport keeps
+        showing the same lines, unless its top line is replaced.
+
+        Args:
+            changes: List of (line, old_count, new_count) tuples (see Buffer._windows_lines_change).
+        """
+        self._lines_follow(changes)
+
+    def _lines_follow(self, changes):
+        """Follow ranges of buffer lines replaced (see _lines_change).
+        Lines inserted or deleted when lines are folded are followed this way,
+        as the rows of the lines following them do not simply move.
         """
-        self._ui_window.line_delete(line)
+        self._columns.lines_change(changes)
+        if self._wrap:
+            self._wrap.lines_change(changes)
+        self._folds.lines_change(changes)
+        top, replaced = lines_renumber(changes)(self._top)
+        top = min(top, len(self._buffer.lines) - 1)
+        self._top = self._folds.visible(top)
+        if replaced or self._top != top:
+            self._top_row = 0
+            replaced = True
+        n_shown = len(self._layout) if self._wrap else self._ui_window.n_lines
+        for line, _, new in changes:
+            if self._shown_index(line) >= n_shown:
+                break
+            if replaced or line + max(new, 1) > self._top:
+                self._redraw()
+                break
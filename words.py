@@ -0,0 +1,69 @@
+"""Index of the word boundaries in lines of text."""
+
+import re
+from array import array
+from collections import OrderedDict
+
+
+class BoundaryIndex:
+    """Class representing a cache of the word boundaries of lines.
+
+    Word motions find the next boundary with a binary search in the
+    boundaries of a line, instead of examining it one character at a time.
+    The boundaries of a line are found the first time they are needed,
+    and kept with the text they were found in: an entry is only used
+    while its line is unchanged, so updating the line invalidates it.
+    The least recently used entries are discarded beyond max_entries.
+
+    Words are sequences of letters, digits and underscores. Subwords split
+    them at underscores, digits and case changes: 'HTTPServer_error2'
+    contains 'HTTP', 'Server', 'error' and '2'.
+
+    Attributes:
+        max_entries: Maximum number of lines whose boundaries are kept.
+    """
+    _patterns = {
+        False: re.compile(r'\w+'),
+        # Uppercase runs (not followed by lowercase), capitalized or lowercase runs, digits.
+        True: re.compile(r'[A-Z]+(?![^\W\d_A-Z])|[A-Z]?[^\W\d_A-Z]+|\d+'),
+    }
+
+    def __init__(self, max_entries=256):
+        """Initialize a BoundaryIndex object.
+
+        Args:
+            max_entries: Maximum number of lines whose boundaries are kept. (default 256)
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (line, subword): (text, starts, ends).
+
+    def spans(self, lines, line, subword=False):
+        """Get the boundaries of the words of a line.
+
+        Args:
+            lines: Sequence of strings.
+            line: Index of the line.
+            subword: Whether to split words into subwords. (default False)
+
+        Returns:
+            (starts, ends): Arrays of the columns where the words start and end.
+        """
+        text = lines[line]
+        key = line, subword
+        entry = self._entries.get(key)
+        if entry and entry[0] == text:  # Strings compare by identity first: O(1) for list storage.
+            self._entries.move_to_end(key)
+            return entry[1], entry[2]
+
+        spans = [m.span() for m in self._patterns[subword].finditer(text)]
+        starts = array('I', [start for start, _ in spans])
+        ends = array('I', [end for _, end in spans])
+        self._entries[key] = text, starts, ends
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return starts, ends
+
+    def clear(self):
+        """Discard all the entries."""
+        self._entries.clear()
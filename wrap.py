@@ -0,0 +1,97 @@
+"""Soft wrapping of lines into rows of limited width."""
+
+from array import array
+from bisect import bisect_right
+
+from lines import LineMemo
+
+
+def line_wrap(text, width, columns=None):
+    """Split a line into rows of at most width screen columns.
+    Rows are broken after the last space fitting in them, if any,
+    and never inside a grapheme cluster. A row holds at least one
+    cluster, even if it is wider.
+
+    Args:
+        text: String containing the line.
+        width: Maximum number of screen columns in a row.
+        columns: ColumnMap object of the line (see width.line_columns).
+            (default None: one screen column per character)
+
+    Returns:
+        array('I') of the row bounds: the columns where the rows start,
+            followed by the length of the line.
+    """
+    bounds = array('I', [0])
+    start, length = 0, len(text)
+    if columns is None:
+        while length - start > width:
+            end = start + width
+            space = text.rfind(' ', start, end)
+            start = space + 1 if space > start else end
+            bounds.append(start)
+        bounds.append(length)
+        return bounds
+
+    while columns.width - columns.screen(start) > width:
+        end = columns.column(columns.screen(start) + width)
+        if end == start:  # A cluster wider than the row.
+            end = columns.column(columns.screen(start + 1))
+        space = text.rfind(' ', start, end)
+        start = space + 1 if space > start and columns.boundary(space + 1) else end
+        bounds.append(start)
+    bounds.append(length)
+    return bounds
+
+
+def row_index(bounds, column):
+    """Get the row of a wrapped line containing a column.
+
+    Args:
+        bounds: Row bounds of the line (see line_wrap).
+        column: Index of the column (the end of the line is in the last row).
+
+    Returns:
+        Index of the row.
+    """
+    return max(bisect_right(bounds, column, 0, len(bounds) - 1) - 1, 0)
+
+
+class WrapCache(LineMemo):
+    """Class representing the rows of the lines of a buffer wrapped to a given width.
+
+    The rows of a line are computed when first needed and kept until the
+    line is updated (see LineMemo): an edit only wraps the changed line
+    again, and inserting or deleting lines only renumbers the cached ones.
+
+    Attributes:
+        width: Maximum number of screen columns in a row.
+    """
+    def __init__(self, width, columns=None, max_entries=4096):
+        """Initialize a WrapCache object.
+
+        Args:
+            width: Maximum number of screen columns in a row.
+            columns: ColumnCache object giving the screen columns of the lines.
+                (default None: one screen column per character)
+            max_entries: Maximum number of lines whose rows are kept. (default 4096)
+        """
+        super().__init__(max_entries)
+        self.width = max(width, 1)
+        self._columns = columns
+
+    def bounds(self, lines, line):
+        """Get the row bounds of a line (see line_wrap).
+
+        Args:
+            lines: Sequence of strings.
+            line: Index of the line.
+
+        Returns:
+            array('I') of the row bounds.
+        """
+        return self.get(lines, line)
+
+    def _compute(self, lines, line):
+        columns = self._columns.column_map(lines, line) if self._columns else None
+        return line_wrap(lines[line], self.width, columns)
@@ -1,14 +1,132 @@
 #!/usr/bin/env python3
 """Yugen, the subtly profound text editor."""
 
-import curses
+from startup import StartupProfile
+profile = StartupProfile()  # Start the clock before any other import.
 
-from editor import Editor
-from ui_curses import Curses
+import sys
+
+
+def arguments_parse(argv):
+    """Parse the command line arguments.
+    Common command lines are parsed by hand, as importing argparse alone
+    takes longer than the rest of the startup. argparse is used for the
+    others, to get proper help and error messages.
+
+    Args:
+        argv: List of command line arguments, excluding the program name.
+
+    Returns:
+        Namespace object with the parsed arguments.
+    """
+    from types import SimpleNamespace
+    args = SimpleNamespace(file=None, startup_profile=False, startup_budget=profile.budget * 1000,
+                           server=False, client=False, socket=None)
+    try:
+        i = 0
+        options = True  # Whether the arguments can still be options (until '--').
+        while i < len(argv):
+            argument = argv[i]
+            name, equal, value = argument.partition('=')
+            if options and name in ('--startup-budget', '--socket'):
+                if not equal:
+                    i += 1
+                    value = argv[i]
+                if name == '--socket':
+                    args.socket = value
+                else:
+                    args.startup_budget = float(value)
+            elif options and argument == '--startup-profile':
+                args.startup_profile = True
+            elif options and argument in ('--server', '--client'):
+                setattr(args, argument[2:], True)
+            elif options and argument == '--':
+                options = False
+            elif (options and argument.startswith('-') and argument != '-') or args.file is not None:
+                raise ValueError(argument)
+            else:
+                args.file = argument
+            i += 1
+        if args.server and args.client:
+            raise ValueError('--server')
+        return args
+    except (IndexError, ValueError):
+        pass
+
+    from argparse import ArgumentParser
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('file', nargs='?', help='file to open')
+    parser.add_argument('--startup-profile', action='store_true',
+                        help='report the duration of the startup phases on exit')
+    parser.add_argument('--startup-budget', type=float, default=profile.budget * 1000, metavar='MS',
+                        help='startup time budget in milliseconds (default %(default)g)')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--server', action='store_true',
+                      help='run the editor server, keeping the files open for its clients')
+    mode.add_argument('--client', action='store_true',
+                      help='attach to the editor server, opening the file there')
+    parser.add_argument('--socket', metavar='PATH',
+                        help="path of the server's socket (default in $XDG_RUNTIME_DIR or a private temporary directory)")
+    return parser.parse_args(argv)
+
+
+def main():
+    with profile.phase('arguments'):
+        args = arguments_parse(sys.argv[1:])
+        profile.budget = args.startup_budget / 1000
+
+    if args.server:
+        import signal
+        from server import Server
+        signal.signal(signal.SIGTERM, signal.default_int_handler)  # Remove the socket when terminated.
+        try:
+            server = Server(args.socket)
+            server.listen()
+            server.run()
+        except OSError as error:
+            sys.exit('yugen: {}'.format(error))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    with profile.phase('imports'):
+        import curses
+        from ui_curses import Curses
+        if args.client:
+            from client import Client
+            from remote import connect
+        else:
+            from editor import Editor
+
+    if args.client:
+        with profile.phase('connect'):
+            try:
+                connection = connect(args.socket)
+            except OSError as error:
+                sys.exit('yugen: cannot attach to the server: {}'.format(error))
+
+    def run(stdscr):
+        if args.client:
+            with profile.phase('ui init'):
+                client = Client(Curses(stdscr), connection)
+                client.attach(args.file)
+            client.run()
+            return
+        with profile.phase('ui init'):
+            editor = Editor(Curses(stdscr))
+        if args.file:
+            with profile.phase('first buffer load'):
+                editor.file_open(args.file)
+        with profile.phase('first render'):
+            editor._render()
+        editor._run(rendered=True)
+
+    try:
+        curses.wrapper(run)
+    finally:
+        if args.startup_profile:
+            print(profile.report(), file=sys.stderr)
 
 
 if __name__ == '__main__':
-    def main(stdscr):
-        editor = Editor(Curses(stdscr))
-        editor._run()
-    curses.wrapper(main)
+    main()